@@ -4,56 +4,214 @@ m3uGenius - Gradio Interface optimized for Hugging Face Spaces
 Графическая оболочка для работы с M3U плейлистами
 OPTIMIZED FOR GRADIO 4.44.1
 """
+import time
+_APP_STARTED = time.perf_counter()
+
 import gradio as gr
 import os
+import sys
+import importlib
 from pathlib import Path
-from datetime import datetime
-from reportlab.platypus import SimpleDocTemplate
-from modules.cleaner import M3UCleaner
-from modules.tester import M3UTester
-from modules.converter import M3UConverter
-from modules.merger import M3UMerger
+from modules.compression import compressed_path, available_codecs, INPUT_FILE_TYPES, PLAIN
+from modules.remote import PlaylistFetcher, parse_url_list
+from modules.delta import DeltaIndex
+from modules.jobs import JobManager, QUEUED, RUNNING, DONE, CANCELLED
+from modules.resultstore import ResultStore, prune_output_folders, create_output_folder
+from modules.profiling import StageProfiler, PROFILE_MODES, PROFILE_OFF
+from modules.epg import EPG_FILE_TYPES
+from modules.neardup import NEARDUP_MODES, NEARDUP_OFF
+from modules.hls import HLS_MODES, HLS_CHEAPEST
 
 
 OUTPUT_DIR = Path("outputs")
+DELTA_DB_PATH = Path("state/delta.sqlite")
+# Срок годности вердиктов Tester в дельта-режиме (часы): потом поток проверяется заново
+DELTA_MAX_AGE_HOURS = float(os.getenv("M3U_DELTA_MAX_AGE_HOURS", "24"))
+JOBS_DB_PATH = Path("state/jobs.sqlite")
+RESULT_STORE_DIR = OUTPUT_DIR / ".store"
 FONT_PATH = Path("ttf/DejaVuSans.ttf")
 
+# Фоновые задачи: сколько задач выполняется одновременно и общий лимит процессов FFmpeg
+MAX_JOBS = int(os.getenv("M3U_MAX_JOBS", str(max(1, (os.cpu_count() or 2) // 2))))
+FFMPEG_SLOTS = int(os.getenv("M3U_FFMPEG_SLOTS", "50"))
+
+# Кэш результатов (outputs/.store) и срок хранения папок outputs/<дата_время>
+RESULT_STORE_MAX_MB = int(os.getenv("M3U_RESULT_STORE_MAX_MB", "2048"))
+RESULT_STORE_MAX_AGE_DAYS = float(os.getenv("M3U_RESULT_STORE_MAX_AGE_DAYS", "14"))
+OUTPUT_MAX_AGE_DAYS = float(os.getenv("M3U_OUTPUT_MAX_AGE_DAYS", "7"))
+
+# Бюджет холодного старта (секунды): импорт + построение интерфейса
+STARTUP_BUDGET = float(os.getenv("M3U_STARTUP_BUDGET", "6"))
+
 # Für Hugging Face Spaces verwenden wir korrekten Adressbindung
 HF_SPACE_URL = os.getenv("SPACE_ID")  # Will be set by Hugging Face
 LOCALHOST = "127.0.0.1"
 
+_playlist_fetcher = None
+_job_manager = None
+_result_store = None
+IMPORT_TIMES = {}
+
+
+def lazy_import(module_name):
+    """Модуль вкладки (и его тяжелые зависимости) загружается при первом использовании"""
+    if module_name not in IMPORT_TIMES:
+        started = time.perf_counter()
+        importlib.import_module(module_name)
+        IMPORT_TIMES[module_name] = time.perf_counter() - started
+        print(f"⏱ {module_name} загружен за {IMPORT_TIMES[module_name] * 1000:.0f} мс")
+    return sys.modules[module_name]
+
+
+def get_playlist_fetcher():
+    """Общий HTTP клиент с пулом соединений и кэшем для плейлистов по URL"""
+    global _playlist_fetcher
+    if _playlist_fetcher is None:
+        _playlist_fetcher = PlaylistFetcher()
+    return _playlist_fetcher
+
+
+def get_job_manager():
+    """Общая очередь фоновых задач (создается при первом использовании)"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(JOBS_DB_PATH, max_jobs=MAX_JOBS, ffmpeg_slots=FFMPEG_SLOTS)
+    return _job_manager
+
+
+def get_result_store():
+    """Контентно-адресуемый кэш результатов операций"""
+    global _result_store
+    if _result_store is None:
+        _result_store = ResultStore(RESULT_STORE_DIR, max_bytes=RESULT_STORE_MAX_MB * 1024 * 1024,
+                                    max_age_days=RESULT_STORE_MAX_AGE_DAYS)
+    return _result_store
+
+
+def store_result(memo_key, files, meta):
+    """Сохраняет результат в кэш и удаляет устаревшие папки outputs"""
+    get_result_store().put(memo_key, files, meta)
+    prune_output_folders(OUTPUT_DIR, OUTPUT_MAX_AGE_DAYS)
+
+
+def resolve_input_files(files, urls_text, progress_callback=None):
+    """
+    Загруженные файлы + плейлисты, скачанные по URL (параллельно, с кэшем).
+    Возвращает (пути, [(url, ошибка), ...] для незагруженных ссылок).
+    """
+    # Gradio 4.44.1: files is already a list of file paths (strings)
+    file_paths = list(files or [])
+    failed = []
+    urls = parse_url_list(urls_text)
+    if urls:
+        paths, failed = get_playlist_fetcher().fetch_all(urls, progress_callback)
+        file_paths.extend(paths)
+    return file_paths, failed
+
 
-def create_output_folder():
-    """Создает папку с текущей датой и временем"""
-    timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    folder = OUTPUT_DIR / timestamp
-    folder.mkdir(parents=True, exist_ok=True)
-    return folder
+def format_fetch_errors(failed):
+    """Строки статистики по ссылкам, которые не удалось скачать"""
+    if not failed:
+        return ""
+    lines = "".join(f"- {url}: {error}\n" for url, error in failed)
+    return f"\n⚠️ Не загружено по URL: {len(failed)}\n{lines}"
 
 
-def cleaner_function(files, blocklist_text):
+def no_input_error(failed):
+    return "Ошибка: не выбраны файлы" + format_fetch_errors(failed)
+
+
+def format_delta_stats(stats):
+    """Строка статистики дельта-режима (пустая, если режим выключен)"""
+    delta = stats.get('delta')
+    if not delta:
+        return ""
+    return (f"\n♻️ Дельта с прошлым запуском: +{delta['added']} новых, "
+            f"~{delta['changed']} измененных, ={delta['unchanged']} без изменений, "
+            f"-{delta['removed']} удаленных, ⌛{delta.get('expired', 0)} перепроверено по сроку\n")
+
+
+def format_hls_stats(stats):
+    """Строка статистики master-плейлистов HLS (пустая, если их не было)"""
+    if not stats.get('hls_masters'):
+        return ""
+    return (f"- HLS master-плейлистов: {stats['hls_masters']} (вариантов проверено "
+            f"{stats['hls_variants_tested']}, рабочих {stats['hls_variants_working']})\n")
+
+
+def format_profile(profiler, output_folder):
+    """Сохраняет profile.json рядом с результатом и возвращает текст этапов"""
+    profile_file = profiler.save(output_folder / "profile.json")
+    return f"\n{profiler.format_text()}📈 Профиль: {profile_file}\n"
+
+
+def filter_epg(epg_file, epg_hours, playlist_file, output_folder, profiler, progress_callback=None):
+    """EPG по каналам результата: (путь или None, текст статистики)"""
+    if not epg_file:
+        return None, ""
+    with profiler.stage('epg'):
+        epg_path, epg_stats = lazy_import("modules.epg").filter_epg_for_playlists(
+            [playlist_file], epg_file, output_folder, float(epg_hours or 0), progress_callback
+        )
+    window = f", окно {float(epg_hours):g} ч" if epg_hours else ""
+    text = (f"\n📺 EPG{window}: каналов {epg_stats['channels_kept']}/{epg_stats['channels_total']}, "
+            f"передач {epg_stats['programmes_kept']}/{epg_stats['programmes_total']}\n"
+            f"💾 EPG: {epg_path}\n")
+    return str(epg_path), text
+
+
+def format_neardup_stats(stats):
+    """Строки статистики почти одинаковых каналов (Merger)"""
+    if not stats:
+        return ""
+    return (f"\n🧬 Похожие каналы: кластеров {stats['clusters']} ({stats['clustered_names']} вариантов имени), "
+            f"удалено записей {stats['removed']}, переименовано {stats['renamed']}, помечено {stats['tagged']}\n")
+
+
+def format_cache_note(cached):
+    return "\n♻️ Взято из кэша: входные файлы и параметры не изменились\n" if cached else ""
+
+
+def cleaner_function(files, blocklist_text, output_codec=PLAIN, urls_text="", profile_mode=PROFILE_OFF,
+                     epg_file=None, epg_hours=0):
     """Очистка и объединение M3U файлов"""
-    if not files:
-        return None, "Ошибка: не выбраны файлы"
-    
-    output_folder = create_output_folder()
-    cleaner = M3UCleaner()
-    
+    profiler = StageProfiler(profile_mode)
     progress_log = []
     def log_progress(msg):
         progress_log.append(msg)
     
-    # Gradio 4.44.1: files is already a list of file paths (strings)
-    file_paths = files
-    
-    result, stats = cleaner.clean_m3u(file_paths, blocklist_text, log_progress)
-    
-    if result is None:
-        return None, f"Ошибка: {stats.get('error', 'Неизвестная ошибка')}"
+    with profiler.stage('fetch'):
+        file_paths, failed = resolve_input_files(files, urls_text, log_progress)
+    if not file_paths:
+        return None, None, no_input_error(failed)
+    
+    output_folder = create_output_folder(OUTPUT_DIR)
+    
+    with profiler.stage('cache'):
+        memo_key = get_result_store().job_key(
+            "cleaner", file_paths, {'blocklist': blocklist_text, 'codec': output_codec},
+            ["modules.cleaner", "modules.compression"]
+        )
+        cached = get_result_store().fetch(memo_key, output_folder)
+    
+    if cached:
+        output_file = cached[0][0]
+        stats = cached[1]['stats']
+    else:
+        cleaner = lazy_import("modules.cleaner").M3UCleaner()
+        
+        output_file = compressed_path(output_folder / "cleaned.m3u", output_codec)
+        with profiler.capture():
+            result, stats = cleaner.clean_m3u(file_paths, output_file, blocklist_text, log_progress, profiler,
+                                              output_codec)
+        
+        if result is None:
+            return None, None, f"Ошибка: {stats.get('error', 'Неизвестная ошибка')}"
+        
+        store_result(memo_key, [output_file], {'stats': stats})
     
-    output_file = output_folder / "cleaned.m3u"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.writelines(result)
+    # EPG зависит от текущего времени (окно), поэтому фильтруется всегда, вне кэша
+    epg_path, epg_text = filter_epg(epg_file, epg_hours, output_file, output_folder, profiler)
     
     stats_text = f"""✅ Обработка завершена!
 
@@ -62,38 +220,36 @@ def cleaner_function(files, blocklist_text):
 - Заблокировано: {stats['blocked']} ({stats['blocked']/max(1,stats['total'])*100:.1f}%)
 - Дубликатов удалено: {stats['duplicates']} ({stats['duplicates']/max(1,stats['total'])*100:.1f}%)
 - Сохранено: {stats['kept']} ({stats['kept']/max(1,stats['total'])*100:.1f}%)
-
+{format_fetch_errors(failed)}{format_cache_note(cached)}{epg_text}{format_profile(profiler, output_folder)}
 💾 Сохранено: {output_file}
 """
     
-    return str(output_file), stats_text
+    return str(output_file), epg_path, stats_text
 
 
-def tester_function(files, timeout, workers):
-    """Тестирование потоков"""
-    if not files:
-        return None, "Ошибка: не выбраны файлы"
-    
-    output_folder = create_output_folder()
-    tester = M3UTester(timeout=timeout, max_workers=workers)
-    
-    progress_log = []
-    def log_progress(msg):
-        progress_log.append(msg)
-    
-    # Gradio 4.44.1: files is already a list of file paths (strings)
-    file_paths = files
+def run_tester_job(job, file_paths, timeout, workers, output_codec, delta_mode, profile_mode=PROFILE_OFF,
+                   epg_file=None, epg_hours=0, hls_mode=HLS_CHEAPEST, failed_urls=()):
+    """Тестирование потоков (выполняется как фоновая задача)"""
+    output_folder = create_output_folder(OUTPUT_DIR)
+    tester = lazy_import("modules.tester").M3UTester(
+        timeout=timeout, max_workers=workers,
+        ffmpeg_slot=job.ffmpeg_slot, cancel_event=job.cancel_event, hls_variants=hls_mode
+    )
     
-    result, stats = tester.test_playlists(file_paths, log_progress)
+    profiler = StageProfiler(profile_mode)
+    delta_index = DeltaIndex("tester", DELTA_DB_PATH, max_age=DELTA_MAX_AGE_HOURS * 3600) if delta_mode else None
+    output_file = compressed_path(output_folder / "tested_working.m3u", output_codec)
+    with profiler.capture():
+        # Рабочие потоки пишутся в файл по мере проверки (корзины по источникам)
+        result, stats = tester.test_playlists(file_paths, output_file, job.progress, delta_index, profiler, output_codec)
     
     if result is None:
-        return None, f"Ошибка: {stats.get('error', 'Неизвестная ошибка')}"
+        raise RuntimeError(stats.get('error', 'Неизвестная ошибка'))
     
-    output_file = output_folder / "tested_working.m3u"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.writelines(result)
+    epg_path, epg_text = filter_epg(epg_file, epg_hours, output_file, output_folder, profiler, job.progress)
     
-    stats_text = f"""✅ Тестирование завершено!
+    title = "⛔ Тестирование отменено (сохранены проверенные потоки)" if stats.get('cancelled') else "✅ Тестирование завершено!"
+    stats_text = f"""{title}
 
 📊 Статистика:
 - Найдено потоков: {stats['total_streams_found']}
@@ -101,124 +257,319 @@ def tester_function(files, timeout, workers):
 - Рабочих: {stats['streams_working']} ({stats['streams_working']/max(1,stats['streams_tested'])*100:.1f}%)
 - Нерабочих: {stats['streams_failed']} ({stats['streams_failed']/max(1,stats['streams_tested'])*100:.1f}%)
 - Дубликатов удалено: {stats['streams_duplicate']}
-
+- Взято из прошлого запуска: {stats['streams_reused']}
+{format_fetch_errors(failed_urls)}{format_hls_stats(stats)}{format_delta_stats(stats)}{epg_text}{format_profile(profiler, output_folder)}
 💾 Сохранено: {output_file}
 """
     
-    return str(output_file), stats_text
+    return {'outputs': [str(output_file), epg_path, stats_text]}
 
 
-def converter_function(files):
-    """Конвертация M3U в PDF/HTML/MD"""
-    if not files:
-        return None, None, None, "Ошибка: не выбраны файлы"
+def tester_function(files, timeout, workers, output_codec=PLAIN, urls_text="", delta_mode=False, profile_mode=PROFILE_OFF,
+                    epg_file=None, epg_hours=0, hls_mode=HLS_CHEAPEST):
+    """Тестирование потоков: ставит задачу в очередь и возвращает ее ID"""
+    file_paths, failed = resolve_input_files(files, urls_text)
+    if not file_paths:
+        return "", no_input_error(failed)
+    
+    job_id = get_job_manager().submit(
+        "tester", run_tester_job, file_paths, int(timeout), int(workers), output_codec, delta_mode, profile_mode,
+        epg_file, epg_hours, hls_mode, failed
+    )
+    return job_id, f"{format_queued(job_id)}{format_fetch_errors(failed)}"
+
+
+def format_queued(job_id):
+    return f"⏳ Задача {job_id} поставлена в очередь. Нажмите «Обновить статус»."
+
+
+def run_handler_job(job, handler, *args):
+    """Обработчик вкладки как фоновая задача: результат - его выходы для интерфейса"""
+    return {'outputs': list(handler(*args))}
+
+
+def submit_handler(operation, handler, *args):
+    """Ставит обработчик вкладки в общую очередь задач: (ID задачи, текст статуса)"""
+    job_id = get_job_manager().submit(operation, run_handler_job, handler, *args)
+    return job_id, format_queued(job_id)
+
+
+def job_outputs(job_id, pending):
+    """
+    Выходы вкладки по задаче: результат обработчика, когда он готов,
+    иначе pending (значения для остальных компонентов) + текст статуса
+    """
+    job = get_job_manager().status(job_id.strip()) if job_id else None
+    if job is None:
+        return (*pending, "Задача не найдена")
     
-    output_folder = create_output_folder()
-    converter = M3UConverter(str(FONT_PATH))
+    if job['status'] in (DONE, CANCELLED) and job['result']:
+        return tuple(job['result']['outputs'])
     
+    if job['status'] == QUEUED:
+        position = f" (позиция {job['queue_position']})" if job['queue_position'] else ""
+        text = f"⏳ Задача {job['id']} в очереди{position}"
+    elif job['status'] == RUNNING:
+        usage = get_job_manager().budget.usage()
+        text = (f"🔄 Задача {job['id']} выполняется с {job['started_at']}\n"
+                f"{job['progress'] or ''}\n"
+                f"FFmpeg: {usage['in_use']}/{usage['slots']} процессов, задач: {usage['jobs']}")
+    elif job['status'] == CANCELLED:
+        text = f"⛔ Задача {job['id']} отменена"
+    else:
+        text = f"❌ Задача {job['id']} завершилась с ошибкой: {job['error']}"
+    return (*pending, text)
+
+
+def job_status_function(job_id):
+    """Статус фоновой задачи: (файл результата, файл EPG, текст статуса)"""
+    return job_outputs(job_id, (None, None))
+
+
+def converter_status_function(job_id):
+    """Статус задачи Converter: (PDF, HTML, MD, группы JSON, текст статуса)"""
+    return job_outputs(job_id, (None, None, None, None))
+
+
+def merger_status_function(job_id):
+    """Статус задачи Merger: (группы, целевая, исходные, статус загрузки, результат, текст статуса)"""
+    # Пока задача идет, выбор групп в форме не сбрасывается
+    return job_outputs(job_id, (gr.update(), gr.update(), gr.update(), gr.update(), None))
+
+
+def job_cancel_function(job_id):
+    """Отмена фоновой задачи"""
+    if job_id and get_job_manager().cancel(job_id.strip()):
+        return f"⛔ Отмена задачи {job_id.strip()} запрошена"
+    return "Задача не найдена или уже завершена"
+
+
+def converter_function(files, urls_text="", profile_mode=PROFILE_OFF):
+    """Конвертация M3U в PDF/HTML/MD"""
+    profiler = StageProfiler(profile_mode)
     progress_log = []
     def log_progress(msg):
         progress_log.append(msg)
     
-    # Gradio 4.44.1: files is already a list of file paths (strings)
-    file_paths = files
-    
-    pdf_story, html_content, md_content = converter.convert_to_formats(file_paths, "playlist", log_progress)
+    with profiler.stage('fetch'):
+        file_paths, failed = resolve_input_files(files, urls_text, log_progress)
+    if not file_paths:
+        return None, None, None, None, no_input_error(failed)
     
-    pdf_file = output_folder / "playlist.pdf"
-    html_file = output_folder / "playlist.html"
-    md_file = output_folder / "playlist.md"
+    output_folder = create_output_folder(OUTPUT_DIR)
     
-    doc = SimpleDocTemplate(str(pdf_file), pagesize=(612, 792))
-    doc.build(pdf_story)
+    with profiler.stage('cache'):
+        memo_key = get_result_store().job_key(
+            "converter", file_paths, {'font': str(FONT_PATH)},
+            ["modules.converter", "modules.groupindex", "modules.compression"]
+        )
+        cached = get_result_store().fetch(memo_key, output_folder)
     
-    with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    with open(md_file, 'w', encoding='utf-8') as f:
-        f.write(md_content)
+    if cached:
+        pdf_file, html_file, md_file, groups_file = cached[0]
+    else:
+        converter = lazy_import("modules.converter").M3UConverter(str(FONT_PATH))
+        
+        pdf_file = output_folder / "playlist.pdf"
+        html_file = output_folder / "playlist.html"
+        md_file = output_folder / "playlist.md"
+        groups_file = output_folder / "playlist.groups.json"
+        
+        with profiler.capture():
+            pdf_story, html_content, md_content = converter.convert_to_formats(file_paths, "playlist", log_progress, profiler)
+            
+            converter.write_pdf(pdf_story, pdf_file)
+        
+        with profiler.stage('write'):
+            with open(html_file, 'w', encoding='utf-8') as f:
+                f.write(html_content)
+            
+            with open(md_file, 'w', encoding='utf-8') as f:
+                f.write(md_content)
+            
+            converter.group_index.save(groups_file)
+        
+        store_result(memo_key, [pdf_file, html_file, md_file, groups_file], {})
     
     stats_text = f"""✅ Конвертация завершена!
-
+{format_fetch_errors(failed)}{format_cache_note(cached)}{format_profile(profiler, output_folder)}
 💾 Сохранено:
 - PDF: {pdf_file}
 - HTML: {html_file}
 - MD: {md_file}
+- Группы (JSON для Merger): {groups_file}
 """
     
-    return str(pdf_file), str(html_file), str(md_file), stats_text
+    return str(pdf_file), str(html_file), str(md_file), str(groups_file), stats_text
+
+
+
+def analytics_function(files, urls_text="", top=50, profile_mode=PROFILE_OFF):
+    """Распределения по хостам, группам, схемам, дубликаты и покрытие атрибутов EXTINF"""
+    profiler = StageProfiler(profile_mode)
+    with profiler.stage('fetch'):
+        file_paths, failed = resolve_input_files(files, urls_text)
+    if not file_paths:
+        return None, None, no_input_error(failed)
+    
+    output_folder = create_output_folder(OUTPUT_DIR)
+    top = int(top or 0)
+    
+    with profiler.stage('cache'):
+        memo_key = get_result_store().job_key(
+            "analytics", file_paths, {'top': top},
+            ["modules.analytics", "modules.fastscan", "modules.compression"]
+        )
+        cached = get_result_store().fetch(memo_key, output_folder)
+    
+    if cached:
+        (json_file, csv_file), report = cached
+    else:
+        analytics = lazy_import("modules.analytics")
+        with profiler.capture(), profiler.stage('analyze'):
+            report = analytics.analyze_playlists(file_paths, top=top)
+        with profiler.stage('write'):
+            json_file, csv_file = analytics.save_report(report, output_folder)
+        summary = {key: report[key] for key in ('entries', 'unique_urls', 'url_duplicate_ratio',
+                                                 'name_duplicate_ratio', 'hosts_total', 'groups_total')}
+        summary['top_hosts'] = [row['value'] for row in report['hosts'][:5]]
+        summary['attributes'] = {name: row['share'] for name, row in report['attributes'].items()}
+        store_result(memo_key, [json_file, csv_file], summary)
+        report = summary
+    profiler.count('entries', report['entries'])
+    
+    coverage = ", ".join(f"{name} {share:.0%}" for name, share in report['attributes'].items())
+    stats_text = f"""✅ Анализ завершен!
 
+📊 Статистика:
+- Записей: {report['entries']}
+- Уникальных URL: {report['unique_urls']} (дубликатов {report['url_duplicate_ratio']:.1%})
+- Дубликатов по имени: {report['name_duplicate_ratio']:.1%}
+- Хостов: {report['hosts_total']}, групп: {report['groups_total']}
+- Топ хостов: {", ".join(report['top_hosts']) or "-"}
+- Атрибуты EXTINF: {coverage}
+{format_fetch_errors(failed)}{format_cache_note(cached)}{format_profile(profiler, output_folder)}
+💾 Сохранено:
+- JSON: {json_file}
+- CSV: {csv_file}
+"""
+    
+    return str(json_file), str(csv_file), stats_text
 
 
-def merger_load_groups(m3u_files, md_file):
+def merger_load_groups(m3u_files, md_file, disk_mode=False, urls_text=""):
     """Загрузка групп из MD для отображения чекбоксов"""
-    if not m3u_files or not md_file:
-        return gr.update(choices=[], value=[]), "Загрузите M3U файлы и MD файл"
+    if not (m3u_files or parse_url_list(urls_text)) or not md_file:
+        return gr.update(choices=[], value=[]), "Загрузите M3U файлы и файл групп (MD или JSON)"
     
     try:
-        # Gradio 4.44.1: md_file is already a string path
-        with open(md_file, 'r', encoding='utf-8') as f:
-            md_content = f.read()
+        # Gradio 4.44.1: md_file is already a string path (.md или .groups.json)
+        merger = lazy_import("modules.merger").M3UMerger()
+        md_groups = merger.load_group_index(md_file)
         
-        merger = M3UMerger()
-        md_groups = merger.parse_md_groups(md_content)
+        file_paths, failed = resolve_input_files(m3u_files, urls_text)
+        if not file_paths:
+            return gr.update(choices=[], value=[]), no_input_error(failed)
         
-        # Gradio 4.44.1: m3u_files is already a list of file paths (strings)
-        file_paths = m3u_files
+        if disk_mode:
+            with lazy_import("modules.mergestore").SQLiteMergeStore() as store:
+                merger.parse_m3u_files_to_store(file_paths, md_groups, store)
+                group_counts = store.group_counts()
+        else:
+            url_to_entry = merger.parse_m3u_files(file_paths, md_groups)
+            grouped = merger.rebuild_grouped_data(url_to_entry)
+            group_counts = {group: len(grouped[group]) for group in merger.get_group_list(grouped)}
         
-        url_to_entry = merger.parse_m3u_files(file_paths, md_groups)
-        grouped = merger.rebuild_grouped_data(url_to_entry)
-        
-        group_list = merger.get_group_list(grouped)
+        group_list = list(group_counts.keys())
         
         group_display = []
         for group in group_list:
-            count = len(grouped[group])
+            count = group_counts[group]
             group_display.append(f"{group} ({count} каналов)")
         
-        return gr.update(choices=group_display, value=[]), f"✅ Загружено {len(group_list)} групп"
+        return gr.update(choices=group_display, value=[]), f"✅ Загружено {len(group_list)} групп{format_fetch_errors(failed)}"
     
     except Exception as e:
         return gr.update(choices=[], value=[]), f"❌ Ошибка: {str(e)}"
 
 
-def merger_delete_groups(m3u_files, md_file, selected_groups):
+def merger_delete_groups(m3u_files, md_file, selected_groups, disk_mode=False, urls_text="", profile_mode=PROFILE_OFF,
+                         neardup_mode=NEARDUP_OFF):
     """Удаление выбранных групп"""
     if not selected_groups:
         return None, "Не выбраны группы для удаления"
     
     try:
-        # Gradio 4.44.1: md_file is already a string path
-        with open(md_file, 'r', encoding='utf-8') as f:
-            md_content = f.read()
-        
-        merger = M3UMerger()
-        md_groups = merger.parse_md_groups(md_content)
+        # Gradio 4.44.1: md_file is already a string path (.md или .groups.json)
+        profiler = StageProfiler(profile_mode)
+        merger = lazy_import("modules.merger").M3UMerger()
+        with profiler.stage('load_groups'):
+            md_groups = merger.load_group_index(md_file)
         
-        # Gradio 4.44.1: m3u_files is already a list of file paths (strings)
-        file_paths = m3u_files
-        
-        url_to_entry = merger.parse_m3u_files(file_paths, md_groups)
-        grouped = merger.rebuild_grouped_data(url_to_entry)
+        with profiler.stage('fetch'):
+            file_paths, failed = resolve_input_files(m3u_files, urls_text)
+        if not file_paths:
+            return None, no_input_error(failed)
         
         groups_to_delete = [g.split(' (')[0] for g in selected_groups]
-        grouped = merger.delete_groups(grouped, groups_to_delete)
         
-        output_folder = create_output_folder()
+        output_folder = create_output_folder(OUTPUT_DIR)
         output_file = output_folder / "merged_deleted.m3u"
         
-        result = merger.write_m3u(grouped)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.writelines(result)
+        with profiler.stage('cache'):
+            memo_key = get_result_store().job_key(
+                "merger_delete", file_paths + [md_file],
+                {'delete': sorted(groups_to_delete), 'disk_mode': bool(disk_mode), 'neardup': neardup_mode},
+                ["modules.merger", "modules.mergestore", "modules.groupindex", "modules.fastscan", "modules.compression",
+                 "modules.neardup"]
+            )
+            cached = get_result_store().fetch(memo_key, output_folder)
+        
+        neardup_stats = None
+        if cached:
+            group_counts = cached[1]['group_counts']
+            neardup_stats = cached[1].get('neardup')
+        else:
+            with profiler.capture():
+                if disk_mode:
+                    with lazy_import("modules.mergestore").SQLiteMergeStore() as store:
+                        merger.parse_m3u_files_to_store(file_paths, md_groups, store, profiler=profiler)
+                        with profiler.stage('delete'):
+                            store.delete_groups(groups_to_delete)
+                        # После удаления/объединения: решения о дубликатах - по итоговым группам
+                        if neardup_mode != NEARDUP_OFF:
+                            with profiler.stage('neardup'):
+                                neardup_stats = merger.collapse_near_duplicates_in_store(store, neardup_mode)
+                        with profiler.stage('write'):
+                            store.write_m3u_file(output_file)
+                        group_counts = store.group_counts()
+                else:
+                    url_to_entry = merger.parse_m3u_files(file_paths, md_groups, profiler=profiler)
+                    tags = None
+                    with profiler.stage('delete'):
+                        grouped = merger.rebuild_grouped_data(url_to_entry)
+                        grouped = merger.delete_groups(grouped, groups_to_delete)
+                    if neardup_mode != NEARDUP_OFF:
+                        with profiler.stage('neardup'):
+                            grouped, tags, neardup_stats = merger.collapse_near_duplicates(grouped, neardup_mode)
+                    
+                    with profiler.stage('write'):
+                        result = merger.write_m3u(grouped, tags)
+                        with open(output_file, 'w', encoding='utf-8') as f:
+                            f.writelines(result)
+                    group_counts = {group: len(channels) for group, channels in grouped.items()}
+        
+        if not cached:
+            store_result(memo_key, [output_file], {'group_counts': group_counts, 'neardup': neardup_stats})
         
-        total_channels = sum(len(channels) for channels in grouped.values())
+        total_channels = sum(group_counts.values())
         stats_text = f"""✅ Удаление завершено!
 
 📊 Результат:
-- Групп осталось: {len(grouped)}
+- Групп осталось: {len(group_counts)}
 - Каналов: {total_channels}
 - Удалено групп: {len(groups_to_delete)}
-
+{format_fetch_errors(failed)}{format_neardup_stats(neardup_stats)}{format_cache_note(cached)}{format_profile(profiler, output_folder)}
 💾 Сохранено: {output_file}
 """
         
@@ -229,45 +580,84 @@ def merger_delete_groups(m3u_files, md_file, selected_groups):
 
 
 
-def merger_merge_groups(m3u_files, md_file, target_group, source_groups):
+def merger_merge_groups(m3u_files, md_file, target_group, source_groups, disk_mode=False, urls_text="", profile_mode=PROFILE_OFF,
+                        neardup_mode=NEARDUP_OFF):
     """Объединение групп"""
     if not target_group or not source_groups:
         return None, "Выберите целевую группу и группы для объединения"
     
     try:
-        # Gradio 4.44.1: md_file is already a string path
-        with open(md_file, 'r', encoding='utf-8') as f:
-            md_content = f.read()
-        
-        merger = M3UMerger()
-        md_groups = merger.parse_md_groups(md_content)
+        # Gradio 4.44.1: md_file is already a string path (.md или .groups.json)
+        profiler = StageProfiler(profile_mode)
+        merger = lazy_import("modules.merger").M3UMerger()
+        with profiler.stage('load_groups'):
+            md_groups = merger.load_group_index(md_file)
         
-        # Gradio 4.44.1: m3u_files is already a list of file paths (strings)
-        file_paths = m3u_files
-        
-        url_to_entry = merger.parse_m3u_files(file_paths, md_groups)
-        grouped = merger.rebuild_grouped_data(url_to_entry)
+        with profiler.stage('fetch'):
+            file_paths, failed = resolve_input_files(m3u_files, urls_text)
+        if not file_paths:
+            return None, no_input_error(failed)
         
         target = target_group.split(' (')[0]
         sources = [g.split(' (')[0] for g in source_groups if g != target_group]
         
-        grouped = merger.merge_groups(grouped, target, sources)
-        
-        output_folder = create_output_folder()
+        output_folder = create_output_folder(OUTPUT_DIR)
         output_file = output_folder / "merged_combined.m3u"
         
-        result = merger.write_m3u(grouped)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.writelines(result)
+        with profiler.stage('cache'):
+            memo_key = get_result_store().job_key(
+                "merger_merge", file_paths + [md_file],
+                {'target': target, 'sources': sorted(sources), 'disk_mode': bool(disk_mode), 'neardup': neardup_mode},
+                ["modules.merger", "modules.mergestore", "modules.groupindex", "modules.fastscan", "modules.compression",
+                 "modules.neardup"]
+            )
+            cached = get_result_store().fetch(memo_key, output_folder)
+        
+        neardup_stats = None
+        if cached:
+            group_counts = cached[1]['group_counts']
+            neardup_stats = cached[1].get('neardup')
+        else:
+            with profiler.capture():
+                if disk_mode:
+                    with lazy_import("modules.mergestore").SQLiteMergeStore() as store:
+                        merger.parse_m3u_files_to_store(file_paths, md_groups, store, profiler=profiler)
+                        with profiler.stage('merge'):
+                            store.merge_groups(target, sources)
+                        # После удаления/объединения: решения о дубликатах - по итоговым группам
+                        if neardup_mode != NEARDUP_OFF:
+                            with profiler.stage('neardup'):
+                                neardup_stats = merger.collapse_near_duplicates_in_store(store, neardup_mode)
+                        with profiler.stage('write'):
+                            store.write_m3u_file(output_file)
+                        group_counts = store.group_counts()
+                else:
+                    url_to_entry = merger.parse_m3u_files(file_paths, md_groups, profiler=profiler)
+                    tags = None
+                    with profiler.stage('merge'):
+                        grouped = merger.rebuild_grouped_data(url_to_entry)
+                        grouped = merger.merge_groups(grouped, target, sources)
+                    if neardup_mode != NEARDUP_OFF:
+                        with profiler.stage('neardup'):
+                            grouped, tags, neardup_stats = merger.collapse_near_duplicates(grouped, neardup_mode)
+                    
+                    with profiler.stage('write'):
+                        result = merger.write_m3u(grouped, tags)
+                        with open(output_file, 'w', encoding='utf-8') as f:
+                            f.writelines(result)
+                    group_counts = {group: len(channels) for group, channels in grouped.items()}
         
-        total_channels = sum(len(channels) for channels in grouped.values())
+        if not cached:
+            store_result(memo_key, [output_file], {'group_counts': group_counts, 'neardup': neardup_stats})
+        
+        total_channels = sum(group_counts.values())
         stats_text = f"""✅ Объединение завершено!
 
 📊 Результат:
-- Групп: {len(grouped)}
+- Групп: {len(group_counts)}
 - Каналов: {total_channels}
 - Объединено в: {target}
-
+{format_fetch_errors(failed)}{format_neardup_stats(neardup_stats)}{format_cache_note(cached)}{format_profile(profiler, output_folder)}
 💾 Сохранено: {output_file}
 """
         
@@ -277,10 +667,63 @@ def merger_merge_groups(m3u_files, md_file, target_group, source_groups):
         return None, f"❌ Ошибка: {str(e)}"
 
 
+def cleaner_submit_function(files, blocklist_text, output_codec=PLAIN, urls_text="", profile_mode=PROFILE_OFF,
+                            epg_file=None, epg_hours=0):
+    """Очистка как фоновая задача"""
+    return submit_handler("cleaner", cleaner_function, files, blocklist_text, output_codec, urls_text, profile_mode,
+                          epg_file, epg_hours)
+
+
+def converter_submit_function(files, urls_text="", profile_mode=PROFILE_OFF):
+    """Конвертация как фоновая задача"""
+    return submit_handler("converter", converter_function, files, urls_text, profile_mode)
+
+
+def analytics_submit_function(files, urls_text="", top=50, profile_mode=PROFILE_OFF):
+    """Анализ как фоновая задача"""
+    return submit_handler("analytics", analytics_function, files, urls_text, top, profile_mode)
+
+
+def merger_load_outputs(m3u_files, md_file, disk_mode=False, urls_text=""):
+    """Выходы Merger после загрузки групп: чекбоксы и оба списка получают одни и те же группы"""
+    checkboxes, status = merger_load_groups(m3u_files, md_file, disk_mode, urls_text)
+    choices = checkboxes.get('choices', [])
+    return checkboxes, gr.update(choices=choices), gr.update(choices=choices), status, gr.update(), gr.update()
+
+
+def merger_result_outputs(handler, *args):
+    """Выходы Merger после удаления/объединения: форма выбора групп не меняется"""
+    output_file, stats_text = handler(*args)
+    return gr.update(), gr.update(), gr.update(), gr.update(), output_file, stats_text
+
+
+def merger_load_submit_function(m3u_files, md_file, disk_mode=False, urls_text=""):
+    """Загрузка групп как фоновая задача"""
+    return submit_handler("merger_load", merger_load_outputs, m3u_files, md_file, disk_mode, urls_text)
+
+
+def merger_delete_submit_function(m3u_files, md_file, selected_groups, disk_mode=False, urls_text="",
+                                  profile_mode=PROFILE_OFF, neardup_mode=NEARDUP_OFF):
+    """Удаление групп как фоновая задача"""
+    return submit_handler("merger_delete", merger_result_outputs, merger_delete_groups, m3u_files, md_file,
+                          selected_groups, disk_mode, urls_text, profile_mode, neardup_mode)
+
+
+def merger_merge_submit_function(m3u_files, md_file, target_group, source_groups, disk_mode=False, urls_text="",
+                                 profile_mode=PROFILE_OFF, neardup_mode=NEARDUP_OFF):
+    """Объединение групп как фоновая задача"""
+    return submit_handler("merger_merge", merger_result_outputs, merger_merge_groups, m3u_files, md_file,
+                          target_group, source_groups, disk_mode, urls_text, profile_mode, neardup_mode)
+
+
 # Создание Gradio интерфейса
 with gr.Blocks(title="m3uGenius", theme=gr.themes.Soft()) as app:
     gr.Markdown("# 🎯 m3uGenius")
     gr.Markdown("Универсальная обработка M3U плейлистов")
+    profile_mode = gr.Dropdown(
+        label="Профилирование (таймеры этапов всегда; cProfile/sampling - по запросу, результат в profile.json)",
+        choices=list(PROFILE_MODES), value=PROFILE_OFF
+    )
     
     with gr.Tabs():
         # TAB 1: Cleaner
@@ -288,67 +731,172 @@ with gr.Blocks(title="m3uGenius", theme=gr.themes.Soft()) as app:
             gr.Markdown("### Очистка и объединение M3U файлов")
             with gr.Row():
                 with gr.Column():
-                    cleaner_files = gr.File(label="M3U файлы", file_count="multiple", file_types=[".m3u", ".m3u8"])
+                    cleaner_files = gr.File(label="M3U файлы", file_count="multiple", file_types=INPUT_FILE_TYPES)
+                    cleaner_urls = gr.Textbox(label="URL плейлистов (по одному на строку)", lines=2, placeholder="https://provider.example/playlist.m3u")
                     cleaner_blocklist = gr.Textbox(label="Блоклист (один домен/URL на строку)", lines=5, placeholder="example.com\nbad-domain.net")
+                    cleaner_codec = gr.Dropdown(label="Сжатие результата", choices=available_codecs(), value=PLAIN)
+                    with gr.Accordion("📺 EPG (XMLTV)", open=False):
+                        cleaner_epg_file = gr.File(label="XMLTV гид (можно .gz)", file_types=EPG_FILE_TYPES)
+                        cleaner_epg_hours = gr.Number(label="Окно, часов вперед (0 - весь гид)", value=0, precision=0)
                     cleaner_btn = gr.Button("🚀 Запустить очистку", variant="primary")
                 with gr.Column():
+                    cleaner_job_id = gr.Textbox(label="ID задачи", interactive=True)
+                    with gr.Row():
+                        cleaner_refresh_btn = gr.Button("🔄 Обновить статус")
+                        cleaner_cancel_btn = gr.Button("⛔ Отменить", variant="stop")
                     cleaner_output = gr.File(label="Результат")
+                    cleaner_epg_output = gr.File(label="EPG по каналам результата")
                     cleaner_stats = gr.Textbox(label="Статистика", lines=10)
             
             cleaner_btn.click(
-                cleaner_function,
-                inputs=[cleaner_files, cleaner_blocklist],
-                outputs=[cleaner_output, cleaner_stats],
+                cleaner_submit_function,
+                inputs=[cleaner_files, cleaner_blocklist, cleaner_codec, cleaner_urls, profile_mode,
+                        cleaner_epg_file, cleaner_epg_hours],
+                outputs=[cleaner_job_id, cleaner_stats],
                 api_name="cleaner"
             )
+            
+            cleaner_refresh_btn.click(
+                job_status_function,
+                inputs=[cleaner_job_id],
+                outputs=[cleaner_output, cleaner_epg_output, cleaner_stats],
+                api_name=False
+            )
+            
+            cleaner_cancel_btn.click(job_cancel_function, inputs=[cleaner_job_id], outputs=[cleaner_stats], api_name=False)
         
         # TAB 2: Tester
         with gr.Tab("🔍 Tester"):
             gr.Markdown("### Тестирование потоков через FFmpeg")
             with gr.Row():
                 with gr.Column():
-                    tester_files = gr.File(label="M3U файлы", file_count="multiple", file_types=[".m3u", ".m3u8"])
+                    tester_files = gr.File(label="M3U файлы", file_count="multiple", file_types=INPUT_FILE_TYPES)
+                    tester_urls = gr.Textbox(label="URL плейлистов (по одному на строку)", lines=2, placeholder="https://provider.example/playlist.m3u")
                     tester_timeout = gr.Slider(minimum=3, maximum=20, value=8, step=1, label="Timeout (секунды)")
                     tester_workers = gr.Slider(minimum=5, maximum=50, value=15, step=5, label="Параллельных потоков")
+                    tester_codec = gr.Dropdown(label="Сжатие результата", choices=available_codecs(), value=PLAIN)
+                    tester_delta = gr.Checkbox(label="Дельта-режим: тестировать только новые/измененные потоки", value=False)
+                    tester_hls = gr.Dropdown(
+                        label="HLS master-плейлисты: off - вариант выбирает FFmpeg, cheapest - самый легкий, all - все параллельно",
+                        choices=list(HLS_MODES), value=HLS_CHEAPEST
+                    )
+                    with gr.Accordion("📺 EPG (XMLTV)", open=False):
+                        tester_epg_file = gr.File(label="XMLTV гид (можно .gz)", file_types=EPG_FILE_TYPES)
+                        tester_epg_hours = gr.Number(label="Окно, часов вперед (0 - весь гид)", value=0, precision=0)
                     tester_btn = gr.Button("🚀 Запустить тестирование", variant="primary")
                 with gr.Column():
+                    tester_job_id = gr.Textbox(label="ID задачи", interactive=True)
+                    with gr.Row():
+                        tester_refresh_btn = gr.Button("🔄 Обновить статус")
+                        tester_cancel_btn = gr.Button("⛔ Отменить", variant="stop")
                     tester_output = gr.File(label="Результат")
+                    tester_epg_output = gr.File(label="EPG по рабочим каналам")
                     tester_stats = gr.Textbox(label="Статистика", lines=10)
             
             tester_btn.click(
                 tester_function,
-                inputs=[tester_files, tester_timeout, tester_workers],
-                outputs=[tester_output, tester_stats],
+                inputs=[tester_files, tester_timeout, tester_workers, tester_codec, tester_urls, tester_delta, profile_mode,
+                        tester_epg_file, tester_epg_hours, tester_hls],
+                outputs=[tester_job_id, tester_stats],
                 api_name="tester"
             )
+            
+            tester_refresh_btn.click(
+                job_status_function,
+                inputs=[tester_job_id],
+                outputs=[tester_output, tester_epg_output, tester_stats],
+                api_name="job_status"
+            )
+            
+            tester_cancel_btn.click(
+                job_cancel_function,
+                inputs=[tester_job_id],
+                outputs=[tester_stats],
+                api_name="job_cancel"
+            )
         
         # TAB 3: Converter
         with gr.Tab("📄 Converter"):
             gr.Markdown("### Конвертация M3U в PDF/HTML/MD")
             with gr.Row():
                 with gr.Column():
-                    converter_files = gr.File(label="M3U файлы", file_count="multiple", file_types=[".m3u", ".m3u8"])
+                    converter_files = gr.File(label="M3U файлы", file_count="multiple", file_types=INPUT_FILE_TYPES)
+                    converter_urls = gr.Textbox(label="URL плейлистов (по одному на строку)", lines=2, placeholder="https://provider.example/playlist.m3u")
                     converter_btn = gr.Button("🚀 Конвертировать", variant="primary")
                 with gr.Column():
+                    converter_job_id = gr.Textbox(label="ID задачи", interactive=True)
+                    with gr.Row():
+                        converter_refresh_btn = gr.Button("🔄 Обновить статус")
+                        converter_cancel_btn = gr.Button("⛔ Отменить", variant="stop")
                     converter_pdf = gr.File(label="PDF")
                     converter_html = gr.File(label="HTML")
                     converter_md = gr.File(label="Markdown")
+                    converter_groups = gr.File(label="Группы (JSON)")
                     converter_stats = gr.Textbox(label="Статистика", lines=5)
             
             converter_btn.click(
-                converter_function,
-                inputs=[converter_files],
-                outputs=[converter_pdf, converter_html, converter_md, converter_stats],
+                converter_submit_function,
+                inputs=[converter_files, converter_urls, profile_mode],
+                outputs=[converter_job_id, converter_stats],
                 api_name="converter"
             )
+            
+            converter_refresh_btn.click(
+                converter_status_function,
+                inputs=[converter_job_id],
+                outputs=[converter_pdf, converter_html, converter_md, converter_groups, converter_stats],
+                api_name="converter_status"
+            )
+            
+            converter_cancel_btn.click(job_cancel_function, inputs=[converter_job_id], outputs=[converter_stats], api_name=False)
+        
+        # TAB 4: Analytics
+        with gr.Tab("📊 Analytics"):
+            gr.Markdown("### Распределения и дубликаты (хосты, группы, схемы, атрибуты EXTINF)")
+            with gr.Row():
+                with gr.Column():
+                    analytics_files = gr.File(label="M3U файлы", file_count="multiple", file_types=INPUT_FILE_TYPES)
+                    analytics_urls = gr.Textbox(label="URL плейлистов (по одному на строку)", lines=2, placeholder="https://provider.example/playlist.m3u")
+                    analytics_top = gr.Number(label="Строк в топах хостов и групп (0 - все)", value=50, precision=0, minimum=0)
+                    analytics_btn = gr.Button("🚀 Анализировать", variant="primary")
+                with gr.Column():
+                    analytics_job_id = gr.Textbox(label="ID задачи", interactive=True)
+                    with gr.Row():
+                        analytics_refresh_btn = gr.Button("🔄 Обновить статус")
+                        analytics_cancel_btn = gr.Button("⛔ Отменить", variant="stop")
+                    analytics_json = gr.File(label="Отчет (JSON)")
+                    analytics_csv = gr.File(label="Отчет (CSV)")
+                    analytics_stats = gr.Textbox(label="Статистика", lines=10)
+            
+            analytics_btn.click(
+                analytics_submit_function,
+                inputs=[analytics_files, analytics_urls, analytics_top, profile_mode],
+                outputs=[analytics_job_id, analytics_stats],
+                api_name="analytics"
+            )
+            
+            analytics_refresh_btn.click(
+                job_status_function,
+                inputs=[analytics_job_id],
+                outputs=[analytics_json, analytics_csv, analytics_stats],
+                api_name=False
+            )
+            
+            analytics_cancel_btn.click(job_cancel_function, inputs=[analytics_job_id], outputs=[analytics_stats], api_name=False)
         
-        # TAB 4: Merger
+        # TAB 5: Merger
         with gr.Tab("🔀 Merger"):
             gr.Markdown("### Умное объединение по группам")
             with gr.Row():
                 with gr.Column():
-                    merger_m3u_files = gr.File(label="M3U файлы", file_count="multiple", file_types=[".m3u", ".m3u8"])
-                    merger_md_file = gr.File(label="MD файл с группами", file_count="single", file_types=[".md"])
+                    merger_m3u_files = gr.File(label="M3U файлы", file_count="multiple", file_types=INPUT_FILE_TYPES)
+                    merger_urls = gr.Textbox(label="URL плейлистов (по одному на строку)", lines=2, placeholder="https://provider.example/playlist.m3u")
+                    merger_md_file = gr.File(label="Файл групп (MD или JSON)", file_count="single", file_types=[".md", ".json"])
+                    merger_disk_mode = gr.Checkbox(label="Дисковый режим (SQLite) для очень больших плейлистов", value=False)
+                    merger_neardup = gr.Dropdown(
+                        label="Похожие каналы (транслит, HD/FHD, пунктуация): collapse - оставить один, tag - пометить tvg-name",
+                        choices=list(NEARDUP_MODES), value=NEARDUP_OFF
+                    )
                     merger_load_btn = gr.Button("📥 Загрузить группы")
                     merger_groups = gr.CheckboxGroup(label="Группы", choices=[], interactive=True)
                     merger_load_status = gr.Textbox(label="Статус загрузки", lines=2)
@@ -362,43 +910,51 @@ with gr.Blocks(title="m3uGenius", theme=gr.themes.Soft()) as app:
                     merger_sources = gr.CheckboxGroup(label="Исходные группы (откуда)", choices=[], interactive=True)
                     merger_merge_btn = gr.Button("🔗 Объединить", variant="primary")
                     
+                    merger_job_id = gr.Textbox(label="ID задачи", interactive=True)
+                    with gr.Row():
+                        merger_refresh_btn = gr.Button("🔄 Обновить статус")
+                        merger_cancel_btn = gr.Button("⛔ Отменить", variant="stop")
                     merger_output = gr.File(label="Результат")
                     merger_stats = gr.Textbox(label="Статистика", lines=8)
             
-            def update_dropdowns(m3u_files, md_file):
-                checkboxes, status = merger_load_groups(m3u_files, md_file)
-                choices = checkboxes.get('choices', [])
-                return (
-                    checkboxes,
-                    gr.update(choices=choices),
-                    gr.update(choices=choices),
-                    status
-                )
-            
             merger_load_btn.click(
-                update_dropdowns,
-                inputs=[merger_m3u_files, merger_md_file],
-                outputs=[merger_groups, merger_target, merger_sources, merger_load_status],
+                merger_load_submit_function,
+                inputs=[merger_m3u_files, merger_md_file, merger_disk_mode, merger_urls],
+                outputs=[merger_job_id, merger_load_status],
                 api_name="merger_load"
             )
             
             merger_delete_btn.click(
-                merger_delete_groups,
-                inputs=[merger_m3u_files, merger_md_file, merger_groups],
-                outputs=[merger_output, merger_stats],
+                merger_delete_submit_function,
+                inputs=[merger_m3u_files, merger_md_file, merger_groups, merger_disk_mode, merger_urls, profile_mode,
+                        merger_neardup],
+                outputs=[merger_job_id, merger_stats],
                 api_name="merger_delete"
             )
             
             merger_merge_btn.click(
-                merger_merge_groups,
-                inputs=[merger_m3u_files, merger_md_file, merger_target, merger_sources],
-                outputs=[merger_output, merger_stats],
+                merger_merge_submit_function,
+                inputs=[merger_m3u_files, merger_md_file, merger_target, merger_sources, merger_disk_mode, merger_urls, profile_mode,
+                        merger_neardup],
+                outputs=[merger_job_id, merger_stats],
                 api_name="merger_merge"
             )
+            
+            merger_refresh_btn.click(
+                merger_status_function,
+                inputs=[merger_job_id],
+                outputs=[merger_groups, merger_target, merger_sources, merger_load_status, merger_output, merger_stats],
+                api_name="merger_status"
+            )
+            
+            merger_cancel_btn.click(job_cancel_function, inputs=[merger_job_id], outputs=[merger_stats], api_name=False)
 
 
 if __name__ == "__main__":
     OUTPUT_DIR.mkdir(exist_ok=True)
+    startup_time = time.perf_counter() - _APP_STARTED
+    budget_status = "✓" if startup_time <= STARTUP_BUDGET else "⚠️ бюджет превышен"
+    print(f"⏱ Холодный старт: {startup_time:.2f} c (бюджет {STARTUP_BUDGET:.1f} c) {budget_status}")
     print("🚀 Запуск m3uGenius...")
     
     # Simplified launch for Hugging Face Spaces - let Gradio handle port automatically
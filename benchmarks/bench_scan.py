@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: исходный разбор M3U (readlines, как в Merger до fastscan),
+текстовое чтение по правилам fastscan и байтовый mmap-сканер
+Запуск: python benchmarks/bench_scan.py [--entries 1000000]
+"""
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.fastscan import iter_entries, iter_entries_text, decode
+from benchmarks.synthetic import write_playlist
+
+
+def run_legacy(path):
+    """Исходный разбор Merger: readlines всего файла, URL - строка сразу после #EXTINF"""
+    seen = set()
+    kept = named = 0
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = f.readlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if line.startswith('#EXTINF:'):
+            if i + 1 < len(lines):
+                url = lines[i + 1].strip()
+                if url and not url.startswith('#') and url.startswith(('http://', 'https://')) and url not in seen:
+                    seen.add(url)
+                    parts = line.rsplit(',', 1)
+                    kept += 1
+                    named += len(parts) == 2 and bool(parts[1].strip())
+            i += 2
+        else:
+            i += 1
+    return kept, named
+
+
+def run_text(path):
+    """Построчное текстовое чтение по правилам fastscan: полное декодирование, имя из str"""
+    seen = set()
+    kept = named = 0
+    for extinf, url in iter_entries_text(path):
+        if url in seen:
+            continue
+        seen.add(url)
+        name = extinf.rsplit(',', 1)[-1].strip() if extinf else None
+        kept += 1
+        named += bool(name)
+    return kept, named
+
+
+def run_fast(path):
+    """Быстрый путь: дедупликация по байтам, имя декодируется только у уникальных"""
+    seen = set()
+    kept = named = 0
+    for extinf, url in iter_entries(path):
+        if url in seen:
+            continue
+        seen.add(url)
+        name = decode(extinf.rpartition(b',')[2]).strip() if extinf else None
+        kept += 1
+        named += bool(name)
+    return kept, named
+
+
+def measure(func, path):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение исходного, текстового и mmap-парсинга M3U")
+    parser.add_argument('--entries', type=int, default=500000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench.m3u'
+        write_playlist(path, args.entries, comment_ratio=0.5)
+        size_mb = path.stat().st_size / 1024 / 1024
+        print(f"Плейлист: {args.entries} записей, {size_mb:.1f} МБ")
+
+        baseline = None
+        for label, func in (("legacy", run_legacy), ("text", run_text), ("mmap", run_fast)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                kept, named = func(path)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            baseline = baseline or best
+            _, _, peak = measure(func, path)
+            print(f"{label:6s}: {best:.2f} c ({size_mb / best:.1f} МБ/с, x{baseline / best:.2f} к legacy), "
+                  f"уникальных {kept} (с именем {named}), пик памяти {peak / 1024 / 1024:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Локальный HTTP/HLS сервер-заглушка для бенчмарка Tester.
+Виды потоков (первый сегмент пути):
+  /ok/<n>/index.m3u8      - рабочий HLS (плейлист + TS сегменты)
+  /master/<n>/index.m3u8  - master-плейлист с MASTER_VARIANTS вариантами (v<i>/index.m3u8)
+  /slow/<n>/index.m3u8    - рабочий, но каждый ответ с задержкой slow_delay
+  /missing/<n>/index.m3u8 - 404
+  /hang/<n>/index.m3u8    - заголовки отправлены, тело не приходит (таймаут)
+
+Запуск отдельно: python benchmarks/fakeserver.py --port 8099
+"""
+import time
+import shutil
+import argparse
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+STREAM_KINDS = ("ok", "master", "slow", "missing", "hang")
+SEGMENT_SECONDS = 2
+# (BANDWIDTH, RESOLUTION) вариантов master-плейлиста
+MASTER_VARIANTS = ((800000, "640x360"), (2500000, "1280x720"), (6000000, "1920x1080"))
+TS_PACKET = 188
+
+
+def make_segment():
+    """
+    TS сегмент для ответов: настоящий (testsrc через FFmpeg), если FFmpeg есть,
+    иначе - пустые TS пакеты (FFmpeg их не примет, но HTTP-часть проверяется)
+    """
+    if shutil.which('ffmpeg'):
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-loglevel', 'error',
+                 '-f', 'lavfi', '-i', f'testsrc=duration={SEGMENT_SECONDS}:size=64x64:rate=10',
+                 '-c:v', 'mpeg2video', '-f', 'mpegts', '-'],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30, check=True,
+            )
+            if result.stdout:
+                return result.stdout
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+            pass
+    null_packet = b'\x47\x1f\xff\x10' + b'\xff' * (TS_PACKET - 4)
+    return null_packet * 100
+
+
+def media_playlist(segments=3):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}",
+             "#EXT-X-MEDIA-SEQUENCE:0"]
+    for i in range(segments):
+        lines.append(f"#EXTINF:{SEGMENT_SECONDS}.0,")
+        lines.append(f"seg{i}.ts")
+    lines.append("#EXT-X-ENDLIST")
+    return ("\n".join(lines) + "\n").encode('ascii')
+
+
+def master_playlist():
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    # Порядок не по битрейту: Tester сам выбирает самый легкий вариант
+    for i, (bandwidth, resolution) in reversed(list(enumerate(MASTER_VARIANTS))):
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={resolution},CODECS="avc1.64001f,mp4a.40.2"')
+        lines.append(f"v{i}/index.m3u8")
+    return ("\n".join(lines) + "\n").encode('ascii')
+
+
+class FakeStreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        parts = self.path.strip('/').split('/')
+        kind = parts[0] if parts else ""
+        server.count(kind)
+
+        if kind not in STREAM_KINDS or kind == "missing":
+            self.send_error(404)
+            return
+        if kind == "hang":
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+            self.send_header('Content-Length', '1000000')
+            self.end_headers()
+            server.stopped.wait()
+            return
+        if kind == "slow":
+            time.sleep(server.slow_delay)
+
+        if kind == "master" and len(parts) == 3 and self.path.endswith('.m3u8'):
+            body, content_type = master_playlist(), 'application/vnd.apple.mpegurl'
+        elif self.path.endswith('.m3u8'):
+            body, content_type = media_playlist(), 'application/vnd.apple.mpegurl'
+        else:
+            body, content_type = server.segment, 'video/mp2t'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeStreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, slow_delay=2.0):
+        super().__init__((host, port), FakeStreamHandler)
+        self.slow_delay = slow_delay
+        self.segment = make_segment()
+        self.stopped = threading.Event()
+        self.requests = {kind: 0 for kind in STREAM_KINDS}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, kind, n):
+        return f"{self.base_url}/{kind}/{n}/index.m3u8"
+
+    def url_mix(self, mix, seed=42):
+        """
+        Функция n → URL с заданной долей видов потоков, например
+        {'ok': 0.7, 'slow': 0.1, 'missing': 0.1, 'hang': 0.1}
+        """
+        kinds = [kind for kind in STREAM_KINDS if mix.get(kind)]
+        total = sum(mix[kind] for kind in kinds)
+
+        def stream_url(n):
+            # детерминированно по номеру канала (без random, чтобы не зависеть от порядка вызовов)
+            point = ((n * 2654435761 + seed) % 10000) / 10000 * total
+            for kind in kinds:
+                point -= mix[kind]
+                if point < 0:
+                    return self.url(kind, n)
+            return self.url(kinds[-1], n)
+        return stream_url
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/HLS сервер-заглушка для Tester")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--slow-delay', type=float, default=2.0)
+    args = parser.parse_args()
+    with FakeStreamServer(args.host, args.port, args.slow_delay) as server:
+        print(f"Сервер: {server.base_url} (виды: {', '.join(STREAM_KINDS)}), Ctrl+C - выход")
+        try:
+            server.stopped.wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Набор бенчмарков: пропускная способность и пик памяти по модулям
+на синтетических плейлистах, с сохранением базовой линии и проверкой регрессий.
+
+Запуск:
+    python benchmarks/run_benchmarks.py                      # все случаи
+    python benchmarks/run_benchmarks.py --save-baseline      # записать baseline.json
+    python benchmarks/run_benchmarks.py --check              # сравнить с baseline.json
+    python benchmarks/run_benchmarks.py --cases cleaner,merger --entries 500000
+
+Код выхода при --check: 1, если есть регрессия больше --tolerance.
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import write_playlist, make_blocklist
+from benchmarks.fakeserver import FakeStreamServer
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+CASES = ("scan", "cleaner", "converter", "merger", "merger_disk", "neardup", "analytics", "pipeline", "tester")
+
+# Параметры, от которых зависят результаты: сравнение с базой только при совпадении
+WORKLOAD_KEYS = ("entries", "duplicate_ratio", "hosts", "host_skew", "richness",
+                 "blocklist_size", "streams", "stream_mix", "tester_timeout", "tester_workers")
+
+
+def parse_mix(text):
+    """'ok=0.7,slow=0.1' → {'ok': 0.7, 'slow': 0.1}"""
+    mix = {}
+    for part in text.split(','):
+        kind, _, share = part.partition('=')
+        if kind.strip():
+            mix[kind.strip()] = float(share or 0)
+    return mix
+
+
+def measure(func, repeat):
+    """Лучшее время из repeat запусков и пик памяти Python (отдельный запуск под tracemalloc)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(timings), peak
+
+
+class Workload:
+    """Синтетические входные файлы одного прогона"""
+
+    def __init__(self, folder, args):
+        self.folder = Path(folder)
+        self.args = args
+        self.playlist = self.folder / "bench.m3u"
+        write_playlist(self.playlist, args.entries, args.duplicate_ratio, args.hosts,
+                       args.host_skew, args.richness)
+        self.size_mb = self.playlist.stat().st_size / 1024 / 1024
+        self.blocklist = make_blocklist(args.blocklist_size, args.hosts)
+
+        from modules.converter import M3UConverter
+        converter = M3UConverter("")
+        self.group_index = converter.build_group_index({"bench.m3u": converter.parse_m3u(self.playlist)})
+
+
+def case_scan(work):
+    from modules.fastscan import iter_entries
+
+    def run():
+        return sum(1 for _ in iter_entries(work.playlist))
+    return run
+
+
+def case_cleaner(work):
+    from modules.cleaner import M3UCleaner
+
+    def run():
+        result, stats = M3UCleaner().clean_m3u([str(work.playlist)], work.folder / "cleaned.m3u", work.blocklist)
+        return stats['total']
+    return run
+
+
+def case_converter(work):
+    from modules.converter import M3UConverter
+
+    def run():
+        converter = M3UConverter("")
+        all_data = {"bench.m3u": converter.parse_m3u(work.playlist)}
+        converter.build_html_content(all_data)
+        converter.build_markdown_content(all_data)
+        converter.build_group_index(all_data)
+        return sum(len(channels) for channels in all_data["bench.m3u"].values())
+    return run
+
+
+def case_merger(work):
+    from modules.merger import M3UMerger
+
+    def run():
+        merger = M3UMerger()
+        url_to_entry = merger.parse_m3u_files([str(work.playlist)], work.group_index)
+        merger.write_m3u(merger.rebuild_grouped_data(url_to_entry))
+        return len(url_to_entry)
+    return run
+
+
+def case_merger_disk(work):
+    from modules.merger import M3UMerger
+    from modules.mergestore import SQLiteMergeStore
+
+    def run():
+        with SQLiteMergeStore() as store:
+            M3UMerger().parse_m3u_files_to_store([str(work.playlist)], work.group_index, store)
+            store.write_m3u_file(work.folder / "merged_disk.m3u")
+            return sum(store.group_counts().values())
+    return run
+
+
+def case_neardup(work):
+    from modules.merger import M3UMerger
+    merger = M3UMerger()
+    url_to_entry = merger.parse_m3u_files([str(work.playlist)], work.group_index)
+
+    def run():
+        grouped = merger.rebuild_grouped_data(url_to_entry)
+        merger.collapse_near_duplicates(grouped)
+        return len(url_to_entry)
+    return run
+
+
+def case_analytics(work):
+    from modules.analytics import analyze_playlists
+
+    def run():
+        return analyze_playlists([work.playlist])['entries']
+    return run
+
+
+def case_pipeline(work):
+    from modules.cleaner import M3UCleaner
+    from modules.pipeline import PlaylistPipeline
+
+    def run():
+        pipeline = PlaylistPipeline(stages=("clean",), cleaner=M3UCleaner(), blocklist_text=work.blocklist)
+        summary = pipeline.run([str(work.playlist)], work.folder)
+        return summary['stats']['source']['entries']
+    return run
+
+
+def run_tester(args, folder):
+    """Tester против локального сервера-заглушки: один прогон (время и память)"""
+    from modules.tester import M3UTester, probe_ffmpeg
+    if probe_ffmpeg() is None:
+        return None
+
+    with FakeStreamServer(slow_delay=args.slow_delay) as server:
+        playlist = Path(folder) / "streams.m3u"
+        write_playlist(playlist, args.streams, duplicate_ratio=0, richness=1,
+                       stream_urls=server.url_mix(parse_mix(args.stream_mix)))
+        tester = M3UTester(timeout=args.tester_timeout, max_workers=args.tester_workers)
+        tracemalloc.start()
+        started = time.perf_counter()
+        _, stats = tester.test_playlists([str(playlist)], Path(folder) / "tested.m3u")
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        'entries': stats['streams_tested'],
+        'seconds': round(elapsed, 4),
+        'entries_per_s': round(stats['streams_tested'] / max(elapsed, 1e-9), 1),
+        'peak_mb': round(peak / 1024 / 1024, 2),
+        'working': stats['streams_working'],
+        'hls_masters': stats['hls_masters'],
+        'server_requests': dict(server.requests),
+    }
+
+
+def run_suite(args, cases):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Workload(tmp, args)
+        print(f"Плейлист: {args.entries} записей, {work.size_mb:.1f} МБ; "
+              f"блоклист: {args.blocklist_size} строк")
+        for name in cases:
+            if name == "tester":
+                result = run_tester(args, tmp)
+                if result is None:
+                    print("tester      : пропущен (FFmpeg недоступен)")
+                    continue
+            else:
+                func = globals()[f"case_{name}"](work)
+                count, seconds, peak = measure(func, args.repeat)
+                result = {
+                    'entries': count,
+                    'seconds': round(seconds, 4),
+                    'entries_per_s': round(count / max(seconds, 1e-9), 1),
+                    'mb_per_s': round(work.size_mb / max(seconds, 1e-9), 2),
+                    'peak_mb': round(peak / 1024 / 1024, 2),
+                }
+            results[name] = result
+            print(f"{name:12s}: {result['seconds']:.3f} c, {result['entries_per_s']:,.0f} записей/с, "
+                  f"пик памяти {result['peak_mb']:.1f} МБ")
+    return results
+
+
+def compare(baseline, results, tolerance):
+    """Список регрессий: пропускная способность ниже или пик памяти выше базы больше tolerance"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current['entries_per_s'] < base['entries_per_s'] * (1 - tolerance):
+            regressions.append(f"{name}: пропускная способность {current['entries_per_s']:,.0f} "
+                               f"< {base['entries_per_s']:,.0f} записей/с")
+        # +1 МБ: небольшие абсолютные колебания не считаются регрессией
+        if current['peak_mb'] > base['peak_mb'] * (1 + tolerance) + 1:
+            regressions.append(f"{name}: пик памяти {current['peak_mb']:.1f} > {base['peak_mb']:.1f} МБ")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки модулей m3uGenius")
+    parser.add_argument('--cases', default=",".join(CASES), help=f"через запятую из: {','.join(CASES)}")
+    parser.add_argument('--entries', type=int, default=200000)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.3)
+    parser.add_argument('--hosts', type=int, default=200)
+    parser.add_argument('--host-skew', type=float, default=1.0, help="перекос хостов (Ципф), 0 - равномерно")
+    parser.add_argument('--richness', type=int, default=2, choices=range(4), help="атрибуты EXTINF, 0..3")
+    parser.add_argument('--blocklist-size', type=int, default=1000)
+    parser.add_argument('--streams', type=int, default=200, help="потоков для tester")
+    parser.add_argument('--stream-mix', default="ok=0.6,master=0.1,slow=0.1,missing=0.1,hang=0.1")
+    parser.add_argument('--slow-delay', type=float, default=1.0)
+    parser.add_argument('--tester-timeout', type=int, default=2)
+    parser.add_argument('--tester-workers', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="сохранить результаты как базу")
+    parser.add_argument('--check', action='store_true', help="сравнить с базой")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="допустимое ухудшение (доля)")
+    parser.add_argument('--json', type=Path, help="записать результаты в JSON")
+    args = parser.parse_args()
+
+    cases = [name.strip() for name in args.cases.split(',') if name.strip()]
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"неизвестные случаи: {', '.join(unknown)}")
+
+    workload = {key: getattr(args, key) for key in WORKLOAD_KEYS}
+    report = {
+        'workload': workload,
+        'machine': {'python': platform.python_version(), 'platform': platform.platform()},
+        'results': run_suite(args, cases),
+    }
+
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    exit_code = 0
+    if args.check:
+        if not args.baseline.exists():
+            print(f"База не найдена: {args.baseline} (создайте через --save-baseline)")
+            return 1
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if baseline.get('workload') != workload:
+            print("Параметры нагрузки отличаются от базы - сравнение невозможно")
+            return 1
+        regressions = compare(baseline['results'], report['results'], args.tolerance)
+        for line in regressions:
+            print(f"⚠️ Регрессия: {line}")
+        if not regressions:
+            print(f"✓ Регрессий нет (допуск {args.tolerance:.0%})")
+        exit_code = 1 if regressions else 0
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"База сохранена: {args.baseline}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетических плейлистов и блоклистов для бенчмарков.
+Все параметры детерминированы seed - одинаковые аргументы дают одинаковый файл.
+"""
+import random
+import itertools
+
+
+# Уровни богатства EXTINF: 0 - только имя, 3 - все типичные атрибуты
+ATTRIBUTE_LEVELS = (
+    (),
+    ('group-title',),
+    ('tvg-id', 'tvg-name', 'group-title'),
+    ('tvg-id', 'tvg-name', 'tvg-logo', 'tvg-chno', 'catchup', 'group-title'),
+)
+
+GROUP_NAMES = ("Новости", "Спорт", "Кино", "Детские", "Музыка", "Документальные",
+               "Региональные", "Развлекательные", "HD", "Радио")
+
+
+def host_name(index):
+    return f"host{index}.example.com"
+
+
+def host_weights(hosts, skew):
+    """Веса хостов по закону Ципфа: skew=0 - равномерно, больше - сильнее перекос"""
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(hosts)))
+
+
+def extinf_line(n, richness):
+    attrs = []
+    for attr in ATTRIBUTE_LEVELS[richness]:
+        if attr == 'tvg-id':
+            attrs.append(f'tvg-id="ch{n}.example"')
+        elif attr == 'tvg-name':
+            attrs.append(f'tvg-name="Канал {n}"')
+        elif attr == 'tvg-logo':
+            attrs.append(f'tvg-logo="http://logo.example.com/{n}.png"')
+        elif attr == 'tvg-chno':
+            attrs.append(f'tvg-chno="{n}"')
+        elif attr == 'catchup':
+            attrs.append('catchup="default" catchup-days="7"')
+        elif attr == 'group-title':
+            attrs.append(f'group-title="{GROUP_NAMES[n % len(GROUP_NAMES)]}"')
+    head = "#EXTINF:-1" + (" " + " ".join(attrs) if attrs else "")
+    return f"{head},Канал {n} HD"
+
+
+def write_playlist(path, entries, duplicate_ratio=0.3, hosts=200, host_skew=1.0,
+                   richness=2, comment_ratio=0.2, stream_urls=None, seed=42):
+    """
+    Пишет синтетический плейлист.
+    duplicate_ratio - доля записей, повторяющих уже встречавшийся канал;
+    hosts / host_skew - число хостов и перекос распределения по ним;
+    richness - уровень атрибутов EXTINF (0..3);
+    stream_urls - функция n → URL (например, адреса FakeStreamServer) вместо host*.example.com
+    """
+    rnd = random.Random(seed)
+    weights = host_weights(hosts, host_skew)
+    unique = max(1, int(entries * (1 - duplicate_ratio)))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#EXTM3U\n')
+        for i in range(entries):
+            n = i if i < unique else rnd.randrange(unique)
+            if rnd.random() < comment_ratio:
+                f.write('#EXTVLCOPT:http-user-agent=Mozilla/5.0\n')
+            f.write(extinf_line(n, richness) + '\n')
+            if stream_urls is not None:
+                f.write(stream_urls(n) + '\n')
+            else:
+                # хост зависит только от канала: у дубликатов он тот же
+                host = random.Random(n).choices(range(hosts), cum_weights=weights)[0]
+                f.write(f'http://{host_name(host)}:8080/live/{n}/index.m3u8\n')
+    return path
+
+
+def make_blocklist(size, hosts=200, seed=42):
+    """Блоклист: часть реальных хостов плейлиста + несуществующие домены и URL-фрагменты"""
+    rnd = random.Random(seed)
+    lines = ["# synthetic blocklist"]
+    real = rnd.sample(range(hosts), min(hosts, max(1, size // 10)))
+    lines.extend(host_name(h) for h in real)
+    for i in range(size - len(real)):
+        if i % 2:
+            lines.append(f"blocked{i}.invalid")
+        else:
+            lines.append(f"http://ads{i}.invalid/path/{i}")
+    return "\n".join(lines)
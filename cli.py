@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+m3uGenius CLI - пакетная обработка без интерфейса (например, из cron)
+Конвейер clean → test → group → export за один проход, без промежуточных файлов
+
+Пример:
+    python cli.py in1.m3u in2.m3u.gz --url https://example.com/list.m3u \\
+        --stages clean,test,export --blocklist blocklist.txt
+
+Коды выхода: 0 - успех, 1 - ошибка, 2 - неверные аргументы,
+3 - результат пуст (ни одна запись не прошла конвейер)
+"""
+import sys
+import json
+import argparse
+from contextlib import redirect_stdout
+from pathlib import Path
+from datetime import datetime
+from modules.compression import available_codecs, PLAIN
+from modules.pipeline import PlaylistPipeline, STAGES
+from modules.resultstore import create_output_folder
+from modules.hls import HLS_MODES, HLS_CHEAPEST
+
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_EMPTY = 3
+
+OUTPUT_DIR = Path("outputs")
+FONT_PATH = Path("ttf/DejaVuSans.ttf")
+
+
+def log(message):
+    """Прогресс - в stderr, stdout остается для JSON сводки"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def parse_merge(values):
+    """'Цель=Источник1,Источник2' → {источник: цель}"""
+    merge_into = {}
+    for value in values:
+        target, sep, sources = value.partition('=')
+        if not sep or not target.strip():
+            raise ValueError(f"Неверный формат --merge: {value}")
+        for source in sources.split(','):
+            if source.strip():
+                merge_into[source.strip()] = target.strip()
+    return merge_into
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="m3uGenius: однопроходный конвейер clean → test → group → export",
+    )
+    parser.add_argument("inputs", nargs="*", help="входные плейлисты (.m3u, .m3u8, сжатые)")
+    parser.add_argument("--url", action="append", default=[], help="плейлист по URL (можно несколько)")
+    parser.add_argument("--url-file", help="файл со списком URL (один на строку)")
+    parser.add_argument("--stages", default="clean,test,export",
+                        help=f"этапы через запятую из: {','.join(STAGES)} (по умолчанию clean,test,export)")
+    parser.add_argument("--blocklist", help="файл блоклиста (домены/URL, один на строку)")
+    parser.add_argument("--timeout", type=int, default=8, help="таймаут проверки потока, с")
+    parser.add_argument("--workers", type=int, default=15, help="параллельных проверок FFmpeg")
+    parser.add_argument("--hls-variants", default=HLS_CHEAPEST, choices=HLS_MODES,
+                        help="master-плейлисты HLS: off - вариант выбирает FFmpeg, cheapest - самый легкий, all - все")
+    parser.add_argument("--groups", help="индекс групп для этапа group (.groups.json или .md)")
+    parser.add_argument("--delete-group", action="append", default=[], help="удалить группу (можно несколько)")
+    parser.add_argument("--merge", action="append", default=[], metavar="ЦЕЛЬ=ИСТ1,ИСТ2",
+                        help="объединить группы в целевую (можно несколько)")
+    parser.add_argument("--output-dir", help="папка результата (по умолчанию outputs/<дата_время>)")
+    parser.add_argument("--codec", default=PLAIN, choices=available_codecs(), help="сжатие playlist.m3u")
+    parser.add_argument("--font", default=str(FONT_PATH), help="TTF шрифт для PDF")
+    parser.add_argument("--epg", help="XMLTV гид: отфильтровать по каналам результата (epg.xml)")
+    parser.add_argument("--epg-hours", type=float, default=0, help="окно EPG, часов вперед (0 - весь гид)")
+    parser.add_argument("--summary", help="дополнительно записать JSON сводку в файл")
+    parser.add_argument("-q", "--quiet", action="store_true", help="не выводить прогресс")
+    return parser
+
+
+def resolve_inputs(args):
+    """Локальные файлы + плейлисты, скачанные по URL (с кэшем); возвращает (файлы, незагруженные URL)"""
+    input_files = []
+    failed = []
+    for path in args.inputs:
+        if not Path(path).is_file():
+            raise FileNotFoundError(f"Файл не найден: {path}")
+        input_files.append(path)
+
+    urls = list(args.url)
+    if args.url_file:
+        from modules.remote import parse_url_list
+        with open(args.url_file, 'r', encoding='utf-8') as f:
+            urls.extend(parse_url_list(f.read()))
+    if urls:
+        from modules.remote import PlaylistFetcher
+        with PlaylistFetcher() as fetcher:
+            paths, failed = fetcher.fetch_all(urls, None if args.quiet else log)
+            input_files.extend(paths)
+    return input_files, failed
+
+
+def build_pipeline(args, stages):
+    """Создает только нужные этапам обработчики (FFmpeg проверяется лишь для test)"""
+    progress = None if args.quiet else log
+    options = {'stages': stages, 'progress_callback': progress}
+
+    if "clean" in stages:
+        from modules.cleaner import M3UCleaner
+        options['cleaner'] = M3UCleaner()
+        if args.blocklist:
+            with open(args.blocklist, 'r', encoding='utf-8') as f:
+                options['blocklist_text'] = f.read()
+    if "test" in stages:
+        from modules.tester import M3UTester
+        options['tester'] = M3UTester(timeout=args.timeout, max_workers=args.workers,
+                                       hls_variants=args.hls_variants)
+    if "group" in stages:
+        if not args.groups:
+            raise ValueError("Для этапа group нужен --groups")
+        from modules.merger import M3UMerger
+        merger = M3UMerger()
+        options['merger'] = merger
+        options['group_index'] = merger.load_group_index(args.groups)
+        options['groups_to_delete'] = args.delete_group
+        options['merge_into'] = parse_merge(args.merge)
+    if "export" in stages:
+        from modules.converter import M3UConverter
+        options['converter'] = M3UConverter(args.font)
+    return PlaylistPipeline(**options)
+
+
+def run_pipeline(args, stages):
+    input_files, failed = resolve_inputs(args)
+    if not input_files:
+        raise ValueError("Нет входных плейлистов" + "".join(f"; {url}: {error}" for url, error in failed))
+    pipeline = build_pipeline(args, stages)
+
+    output_folder = Path(args.output_dir) if args.output_dir else create_output_folder(OUTPUT_DIR)
+    output_folder.mkdir(parents=True, exist_ok=True)
+    result = {'inputs': [str(path) for path in input_files], 'output_folder': str(output_folder),
+              'failed_urls': [{'url': url, 'error': error} for url, error in failed]}
+    result.update(pipeline.run(input_files, output_folder, args.codec))
+    if args.epg and result['entries_written']:
+        from modules.epg import filter_epg_for_playlists
+        epg_path, epg_stats = filter_epg_for_playlists(
+            [result['outputs'][0]], args.epg, output_folder, args.epg_hours, None if args.quiet else log
+        )
+        result['outputs'].append(str(epg_path))
+        result['stats']['epg'] = epg_stats
+    return result
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if not stages or unknown:
+        parser.error(f"неизвестные этапы: {', '.join(unknown) or '(пусто)'}")
+
+    summary = {'status': 'ok', 'started_at': datetime.now().isoformat(timespec='seconds')}
+    exit_code = EXIT_OK
+    summary_files = []
+    try:
+        # Сообщения модулей (print) уходят в stderr, stdout - только JSON сводка
+        with redirect_stdout(sys.stderr):
+            summary.update(run_pipeline(args, stages))
+        if summary['entries_written'] == 0:
+            summary['status'] = 'empty'
+            exit_code = EXIT_EMPTY
+        summary_files = [Path(summary['output_folder']) / "summary.json"]
+    except KeyboardInterrupt:
+        summary.update(status='interrupted', error="Прервано пользователем")
+        exit_code = 130
+    except Exception as e:
+        summary.update(status='error', error=str(e))
+        exit_code = EXIT_ERROR
+
+    summary['exit_code'] = exit_code
+    summary_json = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.summary:
+        summary_files.append(Path(args.summary))
+    for path in summary_files:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(summary_json)
+    print(summary_json)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Analytics Module
+Статистика плейлистов до очистки/тестирования: потоки по хостам, группам и схемам,
+доля дубликатов, заполненность атрибутов EXTINF.
+Файл разбирается векторно (NumPy) по байтовому буферу по правилам fastscan.iter_entries
+(строки с обрезанными пробелами, те же схемы и #EXTINF): переводы строк, запятые
+и '=' находятся одним проходом по блокам, поля записей хранятся колонками хешей
+(хешируется все поле), агрегаты считаются через np.unique - без цикла Python по записям.
+"""
+import csv
+import json
+import mmap
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+from modules.compression import detect_codec, open_binary, PLAIN
+from modules.fastscan import STREAM_SCHEMES, EXTINF_PREFIX, decode
+
+
+# Атрибуты EXTINF для отчета о заполненности
+ATTRIBUTES = ('tvg-id', 'tvg-name', 'tvg-logo', 'tvg-chno', 'tvg-rec', 'catchup', 'group-title')
+SCHEMES = tuple(decode(scheme[:-3]) for scheme in STREAM_SCHEMES)
+NO_GROUP = "(без группы)"
+TOP_DEFAULT = 50
+
+# Ширина окон (кратна 8): поле длиннее окна хешируется/просматривается окнами подряд
+FIELD_WIDTH = 64
+URL_WIDTH = 128
+CHUNK_ROWS = 1 << 16
+# Блок байтов для поиска разделителей: временные маски остаются в кэше процессора
+SCAN_BLOCK = 1 << 20
+
+_NEWLINE, _QUOTE, _COMMA, _EQUALS, _HASH_SIGN, _CR = 10, 34, 44, 61, 35, 13
+_HOST_END = np.zeros(256, dtype=bool)
+_HOST_END[[ord('/'), ord(':'), ord('?'), ord('#'), ord(' '), _CR, _NEWLINE]] = True
+_QUOTE_END = np.zeros(256, dtype=bool)
+_QUOTE_END[_QUOTE] = True
+# Пробельные байты bytes.strip() - как у строк fastscan
+_SPACE = np.zeros(256, dtype=bool)
+_SPACE[list(b' \t\n\r\x0b\x0c')] = True
+_PRIME = np.uint64(0x100000001B3)
+
+
+def _suffix_key(text):
+    """Последние (до 8) байт строки как uint64 и маска значимых байт - для сравнения окон"""
+    raw = text.encode('ascii')[-8:]
+    value = int.from_bytes(raw.rjust(8, b'\0'), 'little')
+    mask = int.from_bytes(b'\xff' * len(raw), 'little') << (8 * (8 - len(raw)))
+    return np.uint64(value), np.uint64(mask)
+
+
+def _prefix_key(raw):
+    """Первые байты строки (до 8) как uint64 и маска"""
+    return np.uint64(int.from_bytes(raw, 'little')), np.uint64((1 << (8 * len(raw))) - 1)
+
+
+_ATTRIBUTE_KEYS = [_suffix_key(name + '=') for name in ATTRIBUTES]
+_SCHEME_KEYS = [_prefix_key(scheme) for scheme in STREAM_SCHEMES]
+
+
+def _read_buffer(path):
+    """
+    Байты файла как массив uint8 через mmap. Сжатый файл потоково распаковывается
+    во временный файл на диске и отображается так же - в памяти целиком не держится
+    """
+    if detect_codec(path) != PLAIN:
+        with open_binary(path) as src, tempfile.TemporaryFile() as f:
+            shutil.copyfileobj(src, f, 1024 * 1024)
+            return _map_file(f)
+    with open(path, 'rb') as f:
+        return _map_file(f)
+
+
+def _map_file(f):
+    if not f.seek(0, 2):
+        return np.frombuffer(b"\n", dtype=np.uint8)
+    # Отображение остается действительным и после закрытия файла
+    return np.frombuffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), dtype=np.uint8)
+
+
+def _positions(buf):
+    """Позиции переводов строк, запятых и '=' (поблочно, без масок размером с файл)"""
+    found = ([], [], [])
+    for offset in range(0, len(buf), SCAN_BLOCK):
+        block = buf[offset:offset + SCAN_BLOCK]
+        for positions, byte in zip(found, (_NEWLINE, _COMMA, _EQUALS)):
+            positions.append(np.flatnonzero(block == byte) + offset)
+    return [np.concatenate(positions) if positions else np.zeros(0, dtype=np.int64) for positions in found]
+
+
+def _windows(buf, starts, width):
+    """
+    Копии buf[start:start+width] строками матрицы через скользящее окно (без матрицы
+    индексов); у конца файла недостающие байты - нули
+    """
+    if len(buf) < width:
+        buf = np.concatenate((buf, np.zeros(width, dtype=np.uint8)))
+    view = np.lib.stride_tricks.as_strided(buf, shape=(len(buf) - width + 1, width), strides=(1, 1), writeable=False)
+    safe = np.minimum(starts, len(view) - 1)
+    window = view[safe]
+    for row in np.flatnonzero(safe != starts):
+        tail = buf[starts[row]:]
+        window[row] = 0
+        window[row, :len(tail)] = tail
+    return window
+
+
+def _words(buf, positions):
+    """8 байт buf начиная с каждой позиции как uint64"""
+    return np.ascontiguousarray(_windows(buf, positions, 8)).view('<u8')[:, 0]
+
+
+def _gather(buf, starts, lengths, width):
+    """Окна buf[start:start+width]; байты за длиной поля обнуляются"""
+    window = _windows(buf, starts, width)
+    window[np.arange(width) >= lengths[:, None]] = 0
+    return window
+
+
+def _hash_window(window, hashes):
+    """Продолжает FNV-подобные хеши hashes байтами строк матрицы uint8 (по 8-байтовым словам)"""
+    words = np.ascontiguousarray(window).view('<u8')
+    for column in range(words.shape[1]):
+        hashes = (hashes ^ words[:, column]) * _PRIME
+    return hashes
+
+
+def _slice_hashes(buf, starts, ends, width=FIELD_WIDTH):
+    """
+    Хеши срезов buf[start:end] целиком (с учетом длины), пачками по CHUNK_ROWS строк;
+    поля длиннее окна дохешируются следующими окнами только для этих строк
+    """
+    lengths = np.maximum(ends - starts, 0)
+    result = np.empty(len(starts), dtype=np.uint64)
+    for first in range(0, len(starts), CHUNK_ROWS):
+        part_starts, part_lengths = starts[first:first + CHUNK_ROWS], lengths[first:first + CHUNK_ROWS]
+        hashes = _hash_window(_gather(buf, part_starts, part_lengths, width), part_lengths.astype(np.uint64) * _PRIME)
+        offset = width
+        rows = np.flatnonzero(part_lengths > offset)
+        while len(rows):
+            hashes[rows] = _hash_window(_gather(buf, part_starts[rows] + offset, part_lengths[rows] - offset, width),
+                                        hashes[rows])
+            offset += width
+            rows = rows[part_lengths[rows] > offset]
+        result[first:first + len(hashes)] = hashes
+    return result
+
+
+def _find_first(buf, starts, ends, table, width=FIELD_WIDTH):
+    """Позиция первого байта из таблицы table в buf[start:end] (или end), окнами по width"""
+    result = ends.copy()
+    rows = np.arange(len(starts))
+    offset = 0
+    while len(rows):
+        window_starts = starts[rows] + offset
+        lengths = ends[rows] - window_starts
+        hit = table[_gather(buf, window_starts, lengths, width)] & (np.arange(width) < lengths[:, None])
+        found = hit.any(axis=1)
+        result[rows[found]] = window_starts[found] + np.argmax(hit[found], axis=1)
+        rows = rows[~found & (lengths > width)]
+        offset += width
+    return result
+
+
+def _strip(buf, starts, ends):
+    """Срезы без пробелов по краям (как bytes.strip); циклы только по строкам с пробелами"""
+    starts, ends = starts.copy(), ends.copy()
+    rows = np.flatnonzero(ends > starts)
+    while len(rows):
+        rows = rows[(ends[rows] > starts[rows]) & _SPACE[buf[np.minimum(starts[rows], len(buf) - 1)]]]
+        starts[rows] += 1
+    rows = np.flatnonzero(ends > starts)
+    while len(rows):
+        rows = rows[(ends[rows] > starts[rows]) & _SPACE[buf[np.maximum(ends[rows] - 1, 0)]]]
+        ends[rows] -= 1
+    return starts, ends
+
+
+def _labels(buf, hashes, starts, ends):
+    """Текст для каждого уникального хеша (декодируется один срез на значение)"""
+    unique, first = np.unique(hashes, return_index=True)
+    return {int(value): decode(buf[starts[i]:ends[i]].tobytes()).strip() for value, i in zip(unique, first)}
+
+
+class PlaylistColumns:
+    """
+    Колонки записей одного файла (одна строка - один URL, пары с #EXTINF как в
+    fastscan.iter_entries):
+    хеши URL / хоста / группы / имени, код схемы и наличие атрибутов
+    """
+
+    def __init__(self, path):
+        self.source = Path(path).name
+        buf = _read_buffer(path)
+        newlines, commas, equals = _positions(buf)
+        line_starts, line_ends = _strip(buf, np.concatenate(([0], newlines + 1)), np.concatenate((newlines, [len(buf)])))
+
+        extinf_lines = self._extinf_lines(buf, line_starts, line_ends)
+        url_lines, scheme_codes = self._url_lines(buf, line_starts, line_ends)
+        self.entries = len(url_lines)
+        self.schemes = scheme_codes.astype(np.uint64)
+        url_starts, url_ends = line_starts[url_lines], line_ends[url_lines]
+
+        # URL получает последний #EXTINF после предыдущего URL
+        position = np.searchsorted(extinf_lines, url_lines) - 1
+        previous_url = np.concatenate(([-1], url_lines[:-1]))
+        candidate = extinf_lines[np.maximum(position, 0)] if len(extinf_lines) else np.full(len(url_lines), -1)
+        self.has_extinf = (position >= 0) & (candidate > previous_url)
+        entry_lines = np.where(self.has_extinf, candidate, 0)
+
+        self.url_hashes = _slice_hashes(buf, url_starts, url_ends, URL_WIDTH)
+        self._hosts(buf, url_starts, url_ends)
+
+        line_count = len(line_starts)
+        is_extinf = np.zeros(line_count, dtype=bool)
+        is_extinf[extinf_lines] = True
+        self._attributes(buf, equals, newlines, is_extinf, entry_lines, line_ends)
+        self._names(buf, commas, line_starts, line_ends, entry_lines)
+
+    @staticmethod
+    def _extinf_lines(buf, starts, ends):
+        prefix = np.frombuffer(EXTINF_PREFIX, dtype=np.uint8)
+        candidates = np.flatnonzero((ends - starts >= len(prefix)) & (buf[np.minimum(starts, len(buf) - 1)] == _HASH_SIGN))
+        for offset in range(1, len(prefix)):
+            candidates = candidates[buf[starts[candidates] + offset] == prefix[offset]]
+        return candidates
+
+    @staticmethod
+    def _url_lines(buf, starts, ends):
+        """Строки потоков (схемы fastscan.STREAM_SCHEMES): номера строк и коды схем"""
+        lengths = ends - starts
+        candidates = np.flatnonzero(lengths >= min(len(scheme) for scheme in STREAM_SCHEMES))
+        head = _words(buf, starts[candidates])
+        lines, codes = [], []
+        for code, (value, mask) in enumerate(_SCHEME_KEYS):
+            matched = candidates[((head & mask) == value) & (lengths[candidates] >= len(STREAM_SCHEMES[code]))]
+            lines.append(matched)
+            codes.append(np.full(len(matched), code))
+        lines = np.concatenate(lines)
+        order = np.argsort(lines, kind='stable')
+        return lines[order], np.concatenate(codes)[order]
+
+    def _hosts(self, buf, url_starts, url_ends):
+        scheme_lengths = np.array([len(scheme) for scheme in STREAM_SCHEMES])[self.schemes.astype(int)]
+        host_starts = url_starts + scheme_lengths
+        # Первый разделитель после '://' (или конец строки)
+        host_ends = _find_first(buf, host_starts, url_ends, _HOST_END)
+        self.host_hashes = _slice_hashes(buf, host_starts, host_ends)
+        self.host_labels = _labels(buf, self.host_hashes, host_starts, host_ends)
+
+    def _attributes(self, buf, equals, newlines, is_extinf, entry_lines, line_ends):
+        """Атрибуты - по '=' внутри строк #EXTINF: имя атрибута - 8 байт перед '='"""
+        equals = equals[equals >= 8]
+        # Номер строки '=' - число переводов строки перед ним
+        equals_line = np.searchsorted(newlines, equals)
+        inside = is_extinf[equals_line]
+        equals, equals_line = equals[inside], equals_line[inside]
+        before = _words(buf, equals - 7)
+
+        self.attributes = {}
+        group_equals = group_lines = None
+        for name, (value, mask) in zip(ATTRIBUTES, _ATTRIBUTE_KEYS):
+            matched = (before & mask) == value
+            present = np.zeros(len(is_extinf), dtype=bool)
+            present[equals_line[matched]] = True
+            self.attributes[name] = present[entry_lines] & self.has_extinf
+            if name == 'group-title':
+                group_equals, group_lines = equals[matched], equals_line[matched]
+
+        # group-title="...": первое вхождение в строке, значение до закрывающей кавычки
+        # (как fastscan.attribute: без кавычек значения нет)
+        quoted = buf[np.minimum(group_equals + 1, len(buf) - 1)] == _QUOTE
+        group_lines, first = np.unique(group_lines[quoted], return_index=True)
+        value_starts = group_equals[quoted][first] + 2
+        value_ends = _find_first(buf, value_starts, line_ends[group_lines], _QUOTE_END)
+        closed = value_ends < line_ends[group_lines]
+        group_lines, value_starts, value_ends = group_lines[closed], value_starts[closed], value_ends[closed]
+        value_starts, value_ends = _strip(buf, value_starts, value_ends)
+        group_hashes = _slice_hashes(buf, value_starts, value_ends)
+        line_group = np.zeros(len(is_extinf), dtype=np.uint64)
+        line_group[group_lines] = group_hashes
+        self.group_hashes = np.where(self.has_extinf, line_group[entry_lines], np.uint64(0))
+        self.group_labels = _labels(buf, group_hashes, value_starts, value_ends)
+
+    def _names(self, buf, commas, line_starts, line_ends, entry_lines):
+        """Имя канала - текст после последней запятой #EXTINF"""
+        ext_starts, ext_ends = line_starts[entry_lines], line_ends[entry_lines]
+        last_comma = np.searchsorted(commas, ext_ends) - 1
+        comma = commas[np.maximum(last_comma, 0)] if len(commas) else ext_starts
+        has_name = self.has_extinf & (last_comma >= 0) & (comma >= ext_starts)
+        # Имя без пробелов по краям, как fastscan.channel_name
+        name_starts, name_ends = _strip(buf, np.where(has_name, comma + 1, ext_ends), ext_ends)
+        self.name_hashes = np.where(has_name, _slice_hashes(buf, name_starts, name_ends), np.uint64(0))
+
+
+def _distribution(hashes, labels, total, top=0, empty_label=None):
+    """
+    Распределение по значениям по убыванию числа записей:
+    (строки {'value', 'count', 'share'}, хеши этих строк, число разных значений)
+    """
+    values, counts = np.unique(hashes, return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    if top:
+        order = order[:top]
+    rows = []
+    for index in order:
+        value = int(values[index])
+        label = empty_label if value == 0 and empty_label else labels.get(value, "")
+        rows.append({'value': label, 'count': int(counts[index]), 'share': round(float(counts[index]) / max(1, total), 4)})
+    return rows, values[order], len(values)
+
+
+def analyze_playlists(playlist_files, top=TOP_DEFAULT, progress_callback=None):
+    """Отчет по плейлистам (словарь для JSON)"""
+    parts = []
+    for path in playlist_files:
+        if progress_callback:
+            progress_callback(f"📊 Анализ: {Path(path).name}")
+        parts.append(PlaylistColumns(path))
+
+    def column(name, dtype=np.uint64):
+        arrays = [getattr(part, name) for part in parts]
+        return np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+
+    total = sum(part.entries for part in parts)
+    url_hashes = column('url_hashes')
+    host_hashes = column('host_hashes')
+    name_hashes = column('name_hashes')
+    host_labels, group_labels = {}, {}
+    for part in parts:
+        host_labels.update(part.host_labels)
+        group_labels.update(part.group_labels)
+
+    unique_urls, first_url = np.unique(url_hashes, return_index=True)
+    named = name_hashes[name_hashes != 0]
+    unique_names = len(np.unique(named))
+
+    hosts, host_values, hosts_total = _distribution(host_hashes, host_labels, total, top)
+    # Дубликаты по хостам: уникальные URL хоста (хост определяется URL)
+    host_unique = dict(zip(*np.unique(host_hashes[first_url], return_counts=True)))
+    for row, value in zip(hosts, host_values):
+        row['unique_urls'] = int(host_unique.get(value, 0))
+        row['duplicate_ratio'] = round(1 - row['unique_urls'] / max(1, row['count']), 4)
+
+    groups, _, groups_total = _distribution(column('group_hashes'), group_labels, total, top, NO_GROUP)
+    schemes, _, _ = _distribution(column('schemes'), dict(enumerate(SCHEMES)), total)
+
+    attributes = {}
+    for name in ATTRIBUTES:
+        arrays = [part.attributes[name] for part in parts]
+        present = int(np.concatenate(arrays).sum()) if arrays else 0
+        attributes[name] = {'count': present, 'share': round(present / max(1, total), 4)}
+
+    return {
+        'files': [{'file': part.source, 'entries': part.entries} for part in parts],
+        'entries': total,
+        'with_extinf': int(column('has_extinf', bool).sum()),
+        'unique_urls': len(unique_urls),
+        'duplicate_urls': total - len(unique_urls),
+        'url_duplicate_ratio': round(1 - len(unique_urls) / max(1, total), 4),
+        'unique_names': unique_names,
+        'name_duplicate_ratio': round(1 - unique_names / max(1, len(named)), 4),
+        'hosts_total': hosts_total,
+        'groups_total': groups_total,
+        'schemes': schemes,
+        'hosts': hosts,
+        'groups': groups,
+        'attributes': attributes,
+    }
+
+
+def save_report(report, output_folder):
+    """analytics.json и analytics.csv (плоские строки: раздел, значение, число, доля)"""
+    output_folder = Path(output_folder)
+    json_file = output_folder / "analytics.json"
+    csv_file = output_folder / "analytics.csv"
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(csv_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['section', 'value', 'count', 'share', 'duplicate_ratio'])
+        for key in ('entries', 'with_extinf', 'unique_urls', 'duplicate_urls', 'unique_names',
+                    'hosts_total', 'groups_total'):
+            writer.writerow(['summary', key, report[key], '', ''])
+        for item in report['files']:
+            writer.writerow(['file', item['file'], item['entries'], '', ''])
+        for section, rows in (('scheme', report['schemes']), ('host', report['hosts']), ('group', report['groups'])):
+            for row in rows:
+                writer.writerow([section, row['value'], row['count'], row['share'], row.get('duplicate_ratio', '')])
+        for name, row in report['attributes'].items():
+            writer.writerow(['attribute', name, row['count'], row['share'], ''])
+    return json_file, csv_file
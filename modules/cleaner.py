@@ -4,9 +4,12 @@ M3U Cleaner Module
 Блокирует домены, объединяет M3U файлы, удаляет дубликаты
 """
 import os
+import time
 import hashlib
 from urllib.parse import urlparse
 from pathlib import Path
+from modules.compression import open_playlist, PLAIN
+from modules.profiling import StageProfiler
 
 
 class M3UCleaner:
@@ -55,30 +58,21 @@ class M3UCleaner:
             return True
         return False
     
-    def clean_m3u(self, input_files, blocklist_text="", progress_callback=None):
-        """Очищает и объединяет M3U файлы"""
+    def clean_m3u(self, input_files, output_file, blocklist_text="", progress_callback=None, profiler=None,
+                  output_codec=PLAIN):
+        """
+        Очищает и объединяет M3U файлы в output_file.
+        Строки идут потоком из входа (в т.ч. сжатого) сразу в выходной файл, целиком не читаются.
+        profiler (StageProfiler) - таймеры этапов parse (чтение, разбор и запись) / match
+        Возвращает (output_file, stats) или (None, {'error': ...})
+        """
+        profiler = profiler or StageProfiler()
         if blocklist_text:
             self.load_blocklist_from_text(blocklist_text)
         
-        all_lines = []
-        
-        for input_file in input_files:
-            try:
-                with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    lines = f.readlines()
-                    all_lines.extend(lines)
-                    if progress_callback:
-                        progress_callback(f"Прочитано: {input_file}")
-            except Exception as e:
-                if progress_callback:
-                    progress_callback(f"Ошибка чтения {input_file}: {e}")
-        
-        if not all_lines:
-            return None, {"error": "Нет данных для обработки"}
-        
-        filtered = []
         current_extinf = None
         seen_blocks = set()
+        line_count = 0
         
         stats = {
             'total': 0,
@@ -88,47 +82,96 @@ class M3UCleaner:
         }
         
         header_written = False
+        # Горячий цикл: время проверки блоклиста накапливается без контекстных менеджеров
+        perf_counter = time.perf_counter
+        match_time = 0.0
+        loop_started = perf_counter()
         
-        for line in all_lines:
-            line_stripped = line.strip()
-            
-            if line_stripped.startswith('#EXTM3U'):
-                if not header_written:
-                    filtered.append(line)
-                    header_written = True
-                continue
-            
-            if line_stripped.startswith('#') and not line_stripped.startswith('#EXTINF'):
-                filtered.append(line)
-                continue
-            
-            if line_stripped.startswith('#EXTINF'):
-                current_extinf = line
+        with open_playlist(output_file, 'w', output_codec) as out:
+            write = out.write
+            for input_file in input_files:
+                try:
+                    with open_playlist(input_file) as f:
+                        for line in f:
+                            line_count += 1
+                            line_stripped = line.strip()
+                            
+                            if line_stripped.startswith('#EXTM3U'):
+                                if not header_written:
+                                    write(line)
+                                    header_written = True
+                                continue
+                            
+                            if line_stripped.startswith('#') and not line_stripped.startswith('#EXTINF'):
+                                write(line)
+                                continue
+                            
+                            if line_stripped.startswith('#EXTINF'):
+                                current_extinf = line
+                                continue
+                            
+                            if not line_stripped:
+                                write(line)
+                                continue
+                            
+                            if line_stripped.startswith(('http', 'udp', 'rtmp', 'rtsp')):
+                                stats['total'] += 1
+                                
+                                block_id = (current_extinf.strip() if current_extinf else "") + "|" + line_stripped
+                                
+                                if block_id in seen_blocks:
+                                    stats['duplicates'] += 1
+                                    current_extinf = None
+                                    continue
+                                
+                                started = perf_counter()
+                                blocked = self.is_blocked(line_stripped)
+                                match_time += perf_counter() - started
+                                
+                                if blocked:
+                                    stats['blocked'] += 1
+                                    current_extinf = None
+                                else:
+                                    stats['kept'] += 1
+                                    seen_blocks.add(block_id)
+                                    if current_extinf:
+                                        write(current_extinf)
+                                    write(line)
+                                    current_extinf = None
+                    if progress_callback:
+                        progress_callback(f"Прочитано: {input_file}")
+                except Exception as e:
+                    if progress_callback:
+                        progress_callback(f"Ошибка чтения {input_file}: {e}")
+        
+        loop_time = perf_counter() - loop_started
+        profiler.count('lines', line_count)
+        profiler.add('parse', loop_time - match_time)
+        profiler.add('match', match_time, stats['total'] - stats['duplicates'])
+        stats['stages'] = profiler.to_dict()['stages']
+        
+        if not line_count:
+            Path(output_file).unlink(missing_ok=True)
+            return None, {"error": "Нет данных для обработки"}
+        return output_file, stats
+    
+    def iter_clean(self, entries, stats, blocklist_text=""):
+        """
+        Потоковая очистка записей конвейера (словари с 'info' и 'url'):
+        блоклист и дубликаты, без промежуточных файлов
+        """
+        if blocklist_text:
+            self.load_blocklist_from_text(blocklist_text)
+        seen_blocks = set()
+        for entry in entries:
+            stats['total'] += 1
+            block_id = (entry['info'].strip() if entry['info'] else "") + "|" + entry['url']
+            if block_id in seen_blocks:
+                stats['duplicates'] += 1
                 continue
-            
-            if not line_stripped:
-                filtered.append(line)
+            if self.is_blocked(entry['url']):
+                stats['blocked'] += 1
                 continue
-            
-            if line_stripped.startswith(('http', 'udp', 'rtmp', 'rtsp')):
-                stats['total'] += 1
-                
-                block_id = (current_extinf.strip() if current_extinf else "") + "|" + line_stripped
-                
-                if block_id in seen_blocks:
-                    stats['duplicates'] += 1
-                    current_extinf = None
-                    continue
-                
-                if self.is_blocked(line_stripped):
-                    stats['blocked'] += 1
-                    current_extinf = None
-                else:
-                    stats['kept'] += 1
-                    seen_blocks.add(block_id)
-                    if current_extinf:
-                        filtered.append(current_extinf)
-                    filtered.append(line)
-                    current_extinf = None
-        
-        return filtered, stats
+            stats['kept'] += 1
+            seen_blocks.add(block_id)
+            yield entry
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Compression Module
+Прозрачное чтение/запись сжатых плейлистов (gzip/xz/bz2/zstd) потоками
+"""
+import io
+import bz2
+import gzip
+import lzma
+
+try:
+    import zstandard
+except ImportError:  # zstd - необязательная зависимость
+    zstandard = None
+
+
+PLAIN = "none"
+
+MAGIC_BYTES = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'BZh', 'bz2'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+SUFFIXES = {'gzip': '.gz', 'xz': '.xz', 'bz2': '.bz2', 'zstd': '.zst'}
+
+# Расширения для полей загрузки Gradio
+INPUT_FILE_TYPES = [".m3u", ".m3u8", ".gz", ".xz", ".bz2", ".zst"]
+
+
+def available_codecs():
+    """Кодеки, доступные для записи в текущем окружении"""
+    codecs = [PLAIN, 'gzip', 'xz', 'bz2']
+    if zstandard is not None:
+        codecs.append('zstd')
+    return codecs
+
+
+def detect_codec(path):
+    """Определяет кодек файла по сигнатуре (magic bytes)"""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, codec in MAGIC_BYTES:
+        if head.startswith(magic):
+            return codec
+    return PLAIN
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise RuntimeError("Для zstd установите пакет zstandard")
+
+
+def open_binary(path, mode='rb', codec=None):
+    """Открывает файл как поток байтов; при чтении кодек определяется автоматически"""
+    if codec is None:
+        codec = detect_codec(path) if 'r' in mode else PLAIN
+    if codec == PLAIN:
+        return open(path, mode)
+    if codec == 'gzip':
+        return gzip.open(path, mode)
+    if codec == 'xz':
+        return lzma.open(path, mode)
+    if codec == 'bz2':
+        return bz2.open(path, mode)
+    if codec == 'zstd':
+        _require_zstd()
+        fh = open(path, mode)
+        if 'r' in mode:
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(fh, closefd=True))
+        return zstandard.ZstdCompressor().stream_writer(fh, closefd=True)
+    raise ValueError(f"Неизвестный кодек: {codec}")
+
+
+def open_playlist(path, mode='r', codec=None):
+    """Открывает плейлист в текстовом режиме (utf-8) поверх open_binary"""
+    stream = open_binary(path, mode.replace('t', '') + 'b', codec)
+    if 'r' in mode:
+        return io.TextIOWrapper(stream, encoding='utf-8', errors='ignore')
+    return io.TextIOWrapper(stream, encoding='utf-8')
+
+
+def compressed_path(path, codec):
+    """Добавляет к имени файла расширение кодека"""
+    if codec in (None, PLAIN):
+        return path
+    return path.with_name(path.name + SUFFIXES[codec])
@@ -7,13 +7,9 @@ import os
 import re
 from pathlib import Path
 from collections import defaultdict
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+from modules.groupindex import GroupIndex
+from modules.compression import open_playlist
+from modules.profiling import StageProfiler
 
 
 GENRE_KEYWORDS = {
@@ -26,11 +22,25 @@ GENRE_KEYWORDS = {
 }
 
 
+# reportlab импортируется лениво (только при сборке PDF), шрифты регистрируются один раз
+_registered_fonts = set()
+
+
+def register_font(font_path, font_name='DejaVu'):
+    """Регистрирует TTF шрифт в reportlab один раз на процесс"""
+    if font_name in _registered_fonts or not os.path.isfile(font_path):
+        return
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    pdfmetrics.registerFont(TTFont(font_name, font_path))
+    _registered_fonts.add(font_name)
+
+
 class M3UConverter:
     def __init__(self, font_path):
         self.font_path = font_path
-        if os.path.isfile(font_path):
-            pdfmetrics.registerFont(TTFont('DejaVu', font_path))
+        self.group_index = None
+        self.profiler = StageProfiler()
     
     def extract_group_and_channel(self, line):
         if not line.startswith('#EXTINF:'):
@@ -52,20 +62,21 @@ class M3UConverter:
     def parse_m3u(self, file_path):
         groups = {}
         current_group = "Без группы"
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = [line.rstrip('\n') for line in f]
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.startswith('#EXTINF:'):
-                group, channel = self.extract_group_and_channel(line)
-                if group:
-                    current_group = group
-                if channel and not self.is_url(channel):
-                    groups.setdefault(current_group, []).append(channel)
-            elif i > 0 and lines[i-1].startswith('#EXTINF:') and not self.is_url(line) and line:
-                groups.setdefault(current_group, []).append(line)
-            i += 1
+        # Построчно: сжатый вход не распаковывается в память целиком
+        previous = ""
+        with open_playlist(file_path) as f:
+            for raw_line in f:
+                raw_line = raw_line.rstrip('\n')
+                line = raw_line.strip()
+                if line.startswith('#EXTINF:'):
+                    group, channel = self.extract_group_and_channel(line)
+                    if group:
+                        current_group = group
+                    if channel and not self.is_url(channel):
+                        groups.setdefault(current_group, []).append(channel)
+                elif previous.startswith('#EXTINF:') and not self.is_url(line) and line:
+                    groups.setdefault(current_group, []).append(line)
+                previous = raw_line
         return groups
     
     def find_emoji_for_group(self, group_name):
@@ -75,21 +86,48 @@ class M3UConverter:
                 return emoji
         return ""
     
-    def convert_to_formats(self, m3u_files, output_base_name, progress_callback=None):
+    def convert_to_formats(self, m3u_files, output_base_name, progress_callback=None, profiler=None):
+        if profiler is not None:
+            self.profiler = profiler
         all_data = {}
         for m3u_file in m3u_files:
             if progress_callback:
                 progress_callback(f"Парсинг: {Path(m3u_file).name}")
-            groups = self.parse_m3u(m3u_file)
+            with self.profiler.stage('parse'):
+                groups = self.parse_m3u(m3u_file)
+            self.profiler.count('channels', sum(len(channels) for channels in groups.values()))
             all_data[Path(m3u_file).name] = groups
         
-        pdf_content = self.build_pdf_content(all_data)
-        html_content = self.build_html_content(all_data)
-        md_content = self.build_markdown_content(all_data)
+        return self.convert_data(all_data)
+    
+    def convert_data(self, all_data):
+        """Строит PDF/HTML/MD из {файл: {группа: [каналы]}} (используется и конвейером CLI)"""
+        with self.profiler.stage('render_pdf'):
+            pdf_content = self.build_pdf_content(all_data)
+        with self.profiler.stage('render_html'):
+            html_content = self.build_html_content(all_data)
+        with self.profiler.stage('render_md'):
+            md_content = self.build_markdown_content(all_data)
+        with self.profiler.stage('index'):
+            self.group_index = self.build_group_index(all_data)
         
         return pdf_content, html_content, md_content
     
+    def build_group_index(self, all_data):
+        """Строит индекс канал → группа для Merger (вместо разбора Markdown)"""
+        index = GroupIndex()
+        for groups in all_data.values():
+            for group_name in sorted(groups.keys()):
+                for ch in groups[group_name]:
+                    index.add(ch, group_name)
+        return index
+    
     def build_pdf_content(self, all_data):
+        from reportlab.platypus import Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib import colors
+        
+        register_font(self.font_path)
         styles = getSampleStyleSheet()
         title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontName='DejaVu', fontSize=16, spaceAfter=12, alignment=1)
         group_style = ParagraphStyle('Group', parent=styles['Heading2'], fontName='DejaVu', fontSize=12, spaceAfter=6, textColor=colors.darkblue)
@@ -113,6 +151,13 @@ class M3UConverter:
             story.append(Spacer(1, 24))
         return story
     
+    def write_pdf(self, pdf_story, pdf_file):
+        """Собирает PDF документ из story"""
+        from reportlab.platypus import SimpleDocTemplate
+        with self.profiler.stage('write_pdf'):
+            doc = SimpleDocTemplate(str(pdf_file), pagesize=(612, 792))
+            doc.build(pdf_story)
+    
     def build_html_content(self, all_data):
         html = '''<!DOCTYPE html>
 <html lang="ru">
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Delta Module
+Инкрементальная обработка: индекс отпечатков записей прошлого запуска
+по каждому источнику (url → хеши EXTINF + вердикты)
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+
+DEFAULT_DB_PATH = Path("state/delta.sqlite")
+# Вердикт старше этого перепроверяется, даже если запись не менялась (поток мог умереть)
+DEFAULT_MAX_AGE = 24 * 3600
+# Записей на один запрос к SQLite (поиск и запись идут пакетами, в памяти только пакет)
+BATCH_SIZE = 500
+# Загрузки Gradio лежат в папках по хешу содержимого: между запусками стабильно только имя
+UPLOAD_DIR = Path(os.environ.get("GRADIO_TEMP_DIR") or Path(tempfile.gettempdir()) / "gradio").resolve()
+# Метаданные кэша плейлистов, скачанных по URL (modules.remote)
+FETCH_META = "meta.json"
+
+
+def source_key(path):
+    """
+    Ключ источника между запусками:
+    плейлист из кэша загрузок по URL - его URL, файл, загруженный через интерфейс, -
+    'upload:' + имя, остальные файлы - полный путь
+    """
+    path = Path(path).resolve()
+    meta_path = path.with_name(FETCH_META)
+    if meta_path.exists():
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                url = json.load(f).get('url')
+            if url:
+                return url
+        except (OSError, ValueError):
+            pass
+    if UPLOAD_DIR in path.parents:
+        return f"upload:{path.name}"
+    return str(path)
+
+
+def entry_fingerprint(extinf, url=""):
+    """Короткий хеш записи (EXTINF + URL)"""
+    data = f"{extinf or ''}|{url}".encode('utf-8', errors='ignore')
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class DeltaRun:
+    """
+    Сравнение текущей версии источника с прошлой прямо по таблице SQLite:
+    прошлые вердикты читаются пакетами по URL, новые пишутся пакетами
+    с номером запуска (generation); записи прошлых запусков, не встреченные
+    в этом, удаляются в commit()
+    """
+
+    def __init__(self, index, source, context, generation):
+        self.index = index
+        self.source = source
+        self.context = context
+        self.generation = generation
+        self._pending = []
+        self.stats = {'added': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'expired': 0}
+
+    def lookup_many(self, entries):
+        """
+        entries - список (url, отпечаток). Для каждой записи - (вердикт, detail, время проверки)
+        прошлого запуска, если запись не изменилась и вердикт не устарел, иначе None
+        """
+        prior = self.index.load_prior(self.source, self.generation, {url for url, _ in entries})
+        max_age = self.index.max_age
+        now = time.time()
+        records = []
+        for url, fingerprint in entries:
+            previous = prior.get(url)
+            record = None
+            if previous is None:
+                self.stats['added'] += 1
+            # У одного URL в источнике может быть несколько записей (разные EXTINF)
+            elif fingerprint not in previous:
+                self.stats['changed'] += 1
+            else:
+                self.stats['unchanged'] += 1
+                record = previous[fingerprint]
+                checked_at = record[2]
+                if max_age is not None and (checked_at is None or now - checked_at > max_age):
+                    self.stats['expired'] += 1
+                    record = None
+            records.append(record)
+        return records
+
+    def record(self, url, fingerprint, verdict, detail=None):
+        """Новый вердикт; detail - строка, сохраняемая вместе с ним (например, варианты HLS)"""
+        self._add(url, fingerprint, (verdict, detail, time.time()))
+
+    def carry(self, url, fingerprint, record):
+        """Переносит запись прошлого запуска (из lookup_many) как есть: время проверки не обновляется"""
+        self._add(url, fingerprint, record)
+
+    def _add(self, url, fingerprint, record):
+        self._pending.append((url, fingerprint, *record))
+        if len(self._pending) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.index.save_records(self.source, self.generation, self._pending)
+            self._pending = []
+
+    def commit(self):
+        """Сохраняет текущую версию источника как базу для следующего запуска"""
+        self.flush()
+        self.stats['removed'] = self.index.finish(self.source, self.context, self.generation)
+        return self.stats
+
+
+class DeltaIndex:
+    def __init__(self, operation, db_path=DEFAULT_DB_PATH, max_age=DEFAULT_MAX_AGE):
+        """max_age - срок годности вердикта в секундах (None - без срока)"""
+        self.operation = operation
+        self.max_age = max_age
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sources ("
+                " operation TEXT, source TEXT, context TEXT, generation INTEGER DEFAULT 0,"
+                " PRIMARY KEY (operation, source))"
+            )
+            # Прежняя таблица хранила один отпечаток на URL
+            conn.execute("DROP TABLE IF EXISTS entries")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS delta_entries ("
+                " operation TEXT, source TEXT, url TEXT, fingerprint TEXT, verdict TEXT, detail TEXT,"
+                " checked_at REAL, generation INTEGER DEFAULT 0,"
+                " PRIMARY KEY (operation, source, url, fingerprint))"
+            )
+            for table, columns in (('sources', (('generation', 'INTEGER DEFAULT 0'),)),
+                                   ('delta_entries', (('detail', 'TEXT'), ('checked_at', 'REAL'),
+                                                      ('generation', 'INTEGER DEFAULT 0')))):
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column, column_type in columns:
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def begin(self, source, context=""):
+        """
+        Начинает сравнение для источника (путь к плейлисту, ключ - source_key).
+        Если контекст изменился, прошлые вердикты не используются.
+        """
+        source = source_key(source)
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT context, generation FROM sources WHERE operation = ? AND source = ?",
+                (self.operation, source),
+            ).fetchone()
+            if row is None:
+                generation = 1
+                conn.execute(
+                    "INSERT INTO sources (operation, source, context, generation) VALUES (?, ?, ?, ?)",
+                    (self.operation, source, context, generation),
+                )
+            else:
+                # Номер запуска сохраняется сразу: записи прерванного запуска не смешиваются со следующим
+                generation = (row[1] or 0) + 1
+                conn.execute(
+                    "UPDATE sources SET generation = ? WHERE operation = ? AND source = ?",
+                    (generation, self.operation, source),
+                )
+                if row[0] != context:
+                    conn.execute(
+                        "DELETE FROM delta_entries WHERE operation = ? AND source = ?", (self.operation, source)
+                    )
+        return DeltaRun(self, source, context, generation)
+
+    def load_prior(self, source, generation, urls):
+        """url → {отпечаток: (вердикт, detail, время проверки)} прошлых запусков для пакета URL"""
+        prior = {}
+        urls = list(urls)
+        with self._lock, self._connect() as conn:
+            for start in range(0, len(urls), BATCH_SIZE):
+                batch = urls[start:start + BATCH_SIZE]
+                rows = conn.execute(
+                    "SELECT url, fingerprint, verdict, detail, checked_at FROM delta_entries"
+                    f" WHERE operation = ? AND source = ? AND url IN ({','.join('?' * len(batch))})"
+                    " AND generation < ?",
+                    (self.operation, source, *batch, generation),
+                )
+                for url, fingerprint, verdict, detail, checked_at in rows:
+                    prior.setdefault(url, {})[fingerprint] = (verdict, detail, checked_at)
+        return prior
+
+    def save_records(self, source, generation, records):
+        """records - (url, отпечаток, вердикт, detail, время проверки)"""
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO delta_entries"
+                " (operation, source, url, fingerprint, verdict, detail, checked_at, generation)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((self.operation, source, *record, generation) for record in records),
+            )
+
+    def finish(self, source, context, generation):
+        """Удаляет записи, не встреченные в запуске generation; возвращает число удаленных URL"""
+        with self._lock, self._connect() as conn:
+            removed = conn.execute(
+                "SELECT COUNT(DISTINCT url) FROM delta_entries AS old"
+                " WHERE operation = ? AND source = ? AND generation < ? AND NOT EXISTS ("
+                "  SELECT 1 FROM delta_entries AS cur WHERE cur.operation = old.operation"
+                "  AND cur.source = old.source AND cur.url = old.url AND cur.generation = ?)",
+                (self.operation, source, generation, generation),
+            ).fetchone()[0]
+            conn.execute(
+                "DELETE FROM delta_entries WHERE operation = ? AND source = ? AND generation < ?",
+                (self.operation, source, generation),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sources (operation, source, context, generation) VALUES (?, ?, ?, ?)",
+                (self.operation, source, context, generation),
+            )
+        return removed
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+EPG Module
+Потоковая фильтрация XMLTV по каналам плейлиста (tvg-id / tvg-name):
+iterparse с очисткой разобранных элементов - память не зависит от размера гида
+"""
+import re
+import time
+import calendar
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from modules.fastscan import iter_entries, attribute, channel_name
+from modules.compression import open_binary, detect_codec, compressed_path
+from modules.groupindex import normalize_name
+
+
+# Расширения для полей загрузки Gradio
+EPG_FILE_TYPES = [".xml", ".xmltv", ".gz", ".xz", ".bz2", ".zst"]
+
+XMLTV_TIME = re.compile(r'^(\d{14})(?:\s*([+-])(\d{2})(\d{2}))?')
+
+
+def parse_xmltv_time(value):
+    """'20240101120000 +0300' → секунды epoch (UTC); None, если формат неизвестен"""
+    match = XMLTV_TIME.match(value or "")
+    if not match:
+        return None
+    stamp, sign, hours, minutes = match.groups()
+    seconds = calendar.timegm(time.strptime(stamp, '%Y%m%d%H%M%S'))
+    if sign:
+        offset = int(hours) * 3600 + int(minutes) * 60
+        seconds -= offset if sign == '+' else -offset
+    return seconds
+
+
+def collect_channel_keys(playlist_files):
+    """
+    tvg-id и нормализованные tvg-name (или имена каналов) записей плейлистов -
+    по ним отбираются каналы гида
+    """
+    ids = set()
+    names = set()
+    for playlist in playlist_files:
+        for extinf, _ in iter_entries(playlist):
+            if not extinf:
+                continue
+            tvg_id = attribute(extinf, b'tvg-id')
+            if tvg_id:
+                ids.add(tvg_id)
+            name = attribute(extinf, b'tvg-name') or channel_name(extinf)
+            if name:
+                names.add(normalize_name(name))
+    return ids, names
+
+
+class EPGFilter:
+    def __init__(self, ids, names=(), window_start=None, window_end=None):
+        """window_start / window_end - секунды epoch; передачи вне окна отбрасываются"""
+        self.ids = set(ids)
+        self.names = set(names)
+        self.window_start = window_start
+        self.window_end = window_end
+        self.stats = {
+            'channels_total': 0,
+            'channels_kept': 0,
+            'programmes_total': 0,
+            'programmes_kept': 0,
+            'programmes_outside_window': 0,
+        }
+
+    def channel_matches(self, elem):
+        if elem.get('id') in self.ids:
+            return True
+        return any(normalize_name(name.text or "") in self.names for name in elem.iter('display-name'))
+
+    def in_window(self, elem):
+        if self.window_start is None and self.window_end is None:
+            return True
+        start = parse_xmltv_time(elem.get('start'))
+        stop = parse_xmltv_time(elem.get('stop')) or start
+        if start is None:
+            return True
+        if self.window_end is not None and start >= self.window_end:
+            return False
+        if self.window_start is not None and stop <= self.window_start:
+            return False
+        return True
+
+    def filter(self, xmltv_file, output_file, codec=None, progress_callback=None):
+        """
+        Пишет в output_file только подходящие <channel> и их <programme>.
+        codec=None - как у входного файла. Возвращает (путь, статистика).
+        """
+        if codec is None:
+            codec = detect_codec(xmltv_file)
+            output_file = compressed_path(Path(output_file), codec)
+        kept_channels = set()
+        root = None
+
+        with open_binary(xmltv_file) as src, open_binary(output_file, 'wb', codec) as out:
+            out.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE tv SYSTEM "xmltv.dtd">\n')
+            for event, elem in ET.iterparse(src, events=('start', 'end')):
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                        attrs = "".join(f' {key}="{_escape_attr(value)}"' for key, value in elem.attrib.items())
+                        out.write(f"<tv{attrs}>\n".encode('utf-8'))
+                    continue
+
+                if elem.tag == 'channel':
+                    self.stats['channels_total'] += 1
+                    if self.channel_matches(elem):
+                        kept_channels.add(elem.get('id'))
+                        self.stats['channels_kept'] += 1
+                        self._write(out, elem)
+                elif elem.tag == 'programme':
+                    self.stats['programmes_total'] += 1
+                    if elem.get('channel') in kept_channels:
+                        if self.in_window(elem):
+                            self.stats['programmes_kept'] += 1
+                            self._write(out, elem)
+                        else:
+                            self.stats['programmes_outside_window'] += 1
+                    if progress_callback and self.stats['programmes_total'] % 100000 == 0:
+                        progress_callback(f"📺 EPG: просмотрено {self.stats['programmes_total']} передач")
+                else:
+                    continue
+                # Разобранный элемент верхнего уровня больше не нужен
+                root.clear()
+            out.write(b"</tv>\n")
+
+        return output_file, self.stats
+
+    @staticmethod
+    def _write(out, elem):
+        elem.tail = "\n"
+        out.write(b"  " + ET.tostring(elem, encoding='unicode').encode('utf-8'))
+
+
+def _escape_attr(value):
+    return (value.replace('&', '&amp;').replace('"', '&quot;')
+                 .replace('<', '&lt;').replace('>', '&gt;'))
+
+
+def filter_epg_for_playlists(playlist_files, xmltv_file, output_folder, window_hours=0, progress_callback=None):
+    """
+    Фильтрует гид по каналам готовых плейлистов (результат Cleaner / Tester).
+    window_hours > 0 - только передачи, идущие сейчас и в ближайшие window_hours часов.
+    """
+    ids, names = collect_channel_keys(playlist_files)
+    window_start = window_end = None
+    if window_hours and window_hours > 0:
+        window_start = time.time()
+        window_end = window_start + window_hours * 3600
+    epg_filter = EPGFilter(ids, names, window_start, window_end)
+    return epg_filter.filter(xmltv_file, Path(output_folder) / "epg.xml", progress_callback=progress_callback)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Fast Scan Module
+Быстрое чтение больших M3U: mmap + поиск границ строк в байтах,
+декодируются только нужные поля
+"""
+import os
+import mmap
+from modules.compression import detect_codec, open_binary, open_playlist, PLAIN
+
+
+STREAM_SCHEMES = (b'http://', b'https://', b'rtmp://', b'rtsp://', b'udp://', b'rtp://')
+EXTINF_PREFIX = b'#EXTINF:'
+HEADER_PREFIX = b'#EXTM3U'
+
+
+def decode(raw):
+    """Декодирует поле записи в str (битые байты отбрасываются)"""
+    return raw.decode('utf-8', errors='ignore')
+
+
+def channel_name(extinf):
+    """Имя канала из байтовой строки #EXTINF (текст после последней запятой)"""
+    head, sep, name = extinf.rpartition(b',')
+    return decode(name).strip() if sep else None
+
+
+def attribute(extinf, name):
+    """Значение атрибута (name - bytes, например b'tvg-id') из байтовой строки #EXTINF"""
+    marker = name + b'="'
+    start = extinf.find(marker)
+    if start == -1:
+        return None
+    start += len(marker)
+    end = extinf.find(b'"', start)
+    if end == -1:
+        return None
+    return decode(extinf[start:end]).strip()
+
+
+def group_title(extinf):
+    """Значение group-title из байтовой строки #EXTINF"""
+    return attribute(extinf, b'group-title')
+
+
+def _iter_lines(path):
+    """Строки файла как bytes; файл отображается в память, если это возможно"""
+    if detect_codec(path) != PLAIN:
+        # Сжатый файл распаковывается потоком, без полной распаковки в память
+        with open_binary(path) as f:
+            yield from f
+        return
+    with open(path, 'rb') as f:
+        try:
+            size = os.fstat(f.fileno()).st_size
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        except (OSError, ValueError):
+            mm = None
+        if mm is None:
+            yield from f
+            return
+        with mm:
+            yield from iter(mm.readline, b'')
+
+
+def _scan(lines, schemes, strict, extinf_prefix=EXTINF_PREFIX):
+    extinf = None
+    pending = False
+    for line in lines:
+        line = line.strip()
+        if pending and strict:
+            # строгий режим: URL должен идти строкой сразу после #EXTINF
+            pending = False
+            if line.startswith(schemes):
+                yield extinf, line
+            extinf = None
+            continue
+        if not line:
+            continue
+        if line.startswith(extinf_prefix):
+            extinf = line
+            pending = True
+        elif line.startswith(schemes) and not strict:
+            # в строгом режиме URL без #EXTINF строкой выше пропускается
+            yield extinf, line
+            extinf = None
+            pending = False
+
+
+def iter_entries(path, schemes=STREAM_SCHEMES, strict=False):
+    """
+    Потоково отдает записи плейлиста как (extinf: bytes | None, url: bytes).
+    Комментарии и пустые строки пропускаются без декодирования.
+    strict=True - URL учитывается только сразу после #EXTINF (как в Merger).
+    """
+    return _scan(_iter_lines(path), schemes, strict)
+
+
+def iter_entries_with_options(path, schemes=STREAM_SCHEMES):
+    """
+    Как iter_entries (нестрогий режим), но с опциями записи: (extinf, url, options), где
+    options - строки-комментарии (#EXTVLCOPT, #KODIPROP, #EXTGRP...) между предыдущим
+    URL и этим, кроме #EXTINF и #EXTM3U
+    """
+    extinf = None
+    options = []
+    for line in _iter_lines(path):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(EXTINF_PREFIX):
+            extinf = line
+        elif line.startswith(b'#'):
+            if not line.startswith(HEADER_PREFIX):
+                options.append(line)
+        elif line.startswith(schemes):
+            # У большинства записей опций нет - отдается общий пустой кортеж
+            yield extinf, line, tuple(options) if options else ()
+            extinf = None
+            options.clear()
+
+
+def playlist_header(path):
+    """Строка #EXTM3U с атрибутами (url-tvg=...), если файл с нее начинается, иначе None"""
+    for line in _iter_lines(path):
+        line = line.strip()
+        if line:
+            return line if line.startswith(HEADER_PREFIX) else None
+    return None
+
+
+def iter_entries_text(path, schemes=STREAM_SCHEMES, strict=False):
+    """Эталонный текстовый путь (полное декодирование строк) - для сравнения"""
+    str_schemes = tuple(decode(s) for s in schemes)
+    with open_playlist(path) as f:
+        yield from _scan(f, str_schemes, strict, decode(EXTINF_PREFIX))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Group Index Module
+Машиночитаемое сопоставление канал → группа с индексом нормализованных имен
+"""
+import re
+import json
+import difflib
+from collections import OrderedDict, defaultdict
+
+
+GROUPS_FORMAT_VERSION = 1
+DEFAULT_GROUP = "Без группы"
+# Промахи поиска тоже кэшируются: размер ограничен, чтобы не расти с плейлистом
+LOOKUP_CACHE_SIZE = 65536
+
+# Теги качества и служебные пометки, не меняющие канал
+QUALITY_TAGS = re.compile(
+    r'\b(?:uhd|fhd|hd|sd|hq|lq|4k|8k|hevc|h\.?26[45]|avc|\d{3,4}[pi]|\d{2}\s?fps|'
+    r'orig|original|backup|reserve|rezerv|rezervnyy|multi)\b'
+)
+DIGITS = re.compile(r'\d+')
+
+
+def normalize_name(name):
+    """Нормализует имя канала: регистр, пробелы, кавычки и разделители"""
+    name = name.casefold().replace('ё', 'е')
+    name = re.sub(r'[\"\'«»`]', '', name)
+    name = re.sub(r'[\s_|]+', ' ', name)
+    return name.strip(' .-:')
+
+
+class GroupIndex:
+    def __init__(self):
+        self.exact = {}
+        self.normalized = {}
+        self._by_head = None
+        self._cache = OrderedDict()
+
+    @classmethod
+    def from_groups(cls, group_to_channels):
+        """Строит индекс из словаря группа → каналы"""
+        index = cls()
+        for group, channels in group_to_channels.items():
+            for channel in channels:
+                index.add(channel, group)
+        return index
+
+    @classmethod
+    def load(cls, path):
+        """Загружает индекс из JSON файла"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != GROUPS_FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия файла групп: {data.get('version')}")
+        return cls.from_groups(data.get('groups', {}))
+
+    def add(self, channel, group):
+        """Добавляет канал в индекс (первое вхождение имеет приоритет)"""
+        channel = channel.strip()
+        if not channel:
+            return
+        self.exact.setdefault(channel, group)
+        self.normalized.setdefault(normalize_name(channel), group)
+        self._by_head = None
+        self._cache.clear()
+
+    def __len__(self):
+        return len(self.exact)
+
+    def to_groups(self):
+        """Возвращает словарь группа → отсортированный список каналов"""
+        groups = defaultdict(list)
+        for channel, group in self.exact.items():
+            groups[group].append(channel)
+        return {group: sorted(channels) for group, channels in sorted(groups.items())}
+
+    def save(self, path):
+        """Сохраняет индекс в компактный JSON"""
+        data = {'version': GROUPS_FORMAT_VERSION, 'groups': self.to_groups()}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    def _head_buckets(self):
+        """Корзины нормализованных имен по первому слову для нечеткого поиска"""
+        if self._by_head is None:
+            self._by_head = defaultdict(list)
+            for key in self.normalized:
+                self._by_head[key.split(' ', 1)[0]].append(key)
+        return self._by_head
+
+    def _lookup_prefix(self, key):
+        """
+        Самое длинное имя из индекса, являющееся префиксом key по границе слова,
+        если дальше только теги качества: 'Россия HD' → 'Россия', но не 'Россия 24'
+        и не 'Первый Балтийский' → 'Первый'
+        """
+        words = key.split(' ')
+        for n in range(len(words) - 1, 0, -1):
+            candidate = ' '.join(words[:n])
+            if candidate in self.normalized:
+                rest = QUALITY_TAGS.sub('', ' '.join(words[n:]))
+                if not re.sub(r'\W+', '', rest):
+                    return self.normalized[candidate]
+                return None
+        return None
+
+    def _lookup_fuzzy(self, key, cutoff):
+        """Нечеткое совпадение среди имен с тем же первым словом и теми же номерами"""
+        digits = DIGITS.findall(key)
+        candidates = [
+            candidate for candidate in self._head_buckets().get(key.split(' ', 1)[0], [])
+            if DIGITS.findall(candidate) == digits
+        ]
+        matches = difflib.get_close_matches(key, candidates, n=1, cutoff=cutoff)
+        if matches:
+            return self.normalized[matches[0]]
+        return None
+
+    def lookup(self, channel, default=DEFAULT_GROUP, fuzzy=True, cutoff=0.85):
+        """Ищет группу канала: точное имя → нормализованное → префикс → нечеткое"""
+        group = self.exact.get(channel)
+        if group is not None:
+            return group
+        cache_key = (channel, fuzzy, cutoff)
+        cache = self._cache
+        if cache_key in cache:
+            cache.move_to_end(cache_key)
+            return cache[cache_key]
+
+        key = normalize_name(channel)
+        group = self.normalized.get(key)
+        if group is None and fuzzy and key:
+            group = self._lookup_prefix(key)
+            if group is None:
+                group = self._lookup_fuzzy(key, cutoff)
+        if group is None:
+            group = default
+
+        cache[cache_key] = group
+        if len(cache) > LOOKUP_CACHE_SIZE:
+            cache.popitem(last=False)
+        return group
+
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+HLS Module
+Разбор master-плейлистов HLS (#EXT-X-STREAM-INF): варианты по битрейту,
+кэш структуры по URL - Tester проверяет выбранный вариант, а не то, что выберет FFmpeg
+"""
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+
+HLS_OFF = "off"
+HLS_CHEAPEST = "cheapest"
+HLS_ALL = "all"
+HLS_MODES = (HLS_OFF, HLS_CHEAPEST, HLS_ALL)
+
+USER_AGENT = "m3uGenius/1.0"
+# Master-плейлист - несколько килобайт; больше не читаем (вдруг по ссылке сам поток)
+MAX_PLAYLIST_BYTES = 1024 * 1024
+CACHE_ENTRIES = 10000
+CACHE_TTL = 600
+# Ответы, по которым поток считается нерабочим без запуска FFmpeg
+GONE_STATUSES = (404, 410)
+
+STREAM_INF = "#EXT-X-STREAM-INF:"
+ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class HLSVariant:
+    """Вариант master-плейлиста: абсолютный URI и параметры из #EXT-X-STREAM-INF"""
+    __slots__ = ('uri', 'bandwidth', 'resolution', 'codecs')
+
+    def __init__(self, uri, bandwidth=0, resolution=None, codecs=None):
+        self.uri = uri
+        self.bandwidth = bandwidth
+        self.resolution = resolution
+        self.codecs = codecs
+
+    @property
+    def label(self):
+        """'1280x720 2500k' для отчета"""
+        bitrate = f"{round(self.bandwidth / 1000)}k" if self.bandwidth else "?k"
+        return f"{self.resolution} {bitrate}" if self.resolution else bitrate
+
+
+def is_hls_url(url):
+    """Плейлист HLS по расширению пути (потоки других форматов не скачиваются)"""
+    return urlparse(url).path.lower().endswith('.m3u8')
+
+
+def parse_stream_inf(line):
+    """Атрибуты строки #EXT-X-STREAM-INF как словарь (кавычки сняты)"""
+    return {key: value.strip('"') for key, value in ATTRIBUTE.findall(line[len(STREAM_INF):])}
+
+
+def parse_master_playlist(text, base_url):
+    """
+    Варианты master-плейлиста по возрастанию битрейта;
+    None - это media-плейлист (или не HLS вовсе)
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    if not lines or not lines[0].startswith("#EXTM3U"):
+        return None
+
+    variants = {}
+    attributes = None
+    for line in lines:
+        if line.startswith(STREAM_INF):
+            attributes = parse_stream_inf(line)
+        elif line and not line.startswith('#') and attributes is not None:
+            uri = urljoin(base_url, line)
+            bandwidth = attributes.get('AVERAGE-BANDWIDTH') or attributes.get('BANDWIDTH') or "0"
+            # Один URI под несколькими аудио-группами - один вариант
+            if uri not in variants:
+                variants[uri] = HLSVariant(uri, int(bandwidth) if bandwidth.isdigit() else 0,
+                                           attributes.get('RESOLUTION'), attributes.get('CODECS'))
+            attributes = None
+    if not variants:
+        return None
+    return sorted(variants.values(), key=lambda variant: variant.bandwidth)
+
+
+def cheapest_variant(variants):
+    """Вариант с наименьшим битрейтом; аудио-варианты (без RESOLUTION) - только если нет видео"""
+    video = [variant for variant in variants if variant.resolution]
+    return min(video or variants, key=lambda variant: variant.bandwidth)
+
+
+def dump_variants(variants):
+    """Рабочие варианты в JSON для дельта-индекса (URI не храним: в нем бывают токены)"""
+    return json.dumps([[variant.bandwidth, variant.resolution] for variant in variants])
+
+
+def load_variants(text):
+    """Обратно к dump_variants: варианты без URI, годятся для format_variants_comment"""
+    try:
+        return [HLSVariant(None, bandwidth, resolution) for bandwidth, resolution in json.loads(text)]
+    except (TypeError, ValueError):
+        return []
+
+
+def format_variants_comment(variants):
+    """Строка-комментарий с рабочими вариантами для выходного M3U (ставится перед #EXTINF)"""
+    return f"# HLS варианты (рабочие): {', '.join(variant.label for variant in variants)}\n"
+
+
+class MasterPlaylistCache:
+    """LRU кэш результата разбора по URL (с TTL: ссылки на варианты бывают с токенами)"""
+
+    def __init__(self, max_entries=CACHE_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url):
+        """(найдено, варианты или None)"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, url, variants):
+        with self._lock:
+            self._entries[url] = (time.monotonic(), variants)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Общий на процесс: повторные проверки тех же каналов не скачивают master заново
+_master_cache = MasterPlaylistCache()
+
+
+class HLSResolver:
+    def __init__(self, timeout=8, cache=None):
+        self.cache = _master_cache if cache is None else cache
+        self.client = httpx.Client(
+            timeout=timeout,
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT},
+        )
+
+    def close(self):
+        self.client.close()
+
+    def resolve(self, url):
+        """
+        Варианты master-плейлиста по URL или None (media-плейлист).
+        Ошибки HTTP (httpx.HTTPError) пробрасываются и не кэшируются.
+        """
+        found, variants = self.cache.get(url)
+        if found:
+            return variants
+
+        body = bytearray()
+        with self.client.stream('GET', url) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                body += chunk
+                if len(body) >= MAX_PLAYLIST_BYTES:
+                    break
+            base_url = str(response.url)
+        variants = parse_master_playlist(body.decode('utf-8', errors='ignore'), base_url)
+        self.cache.put(url, variants)
+        return variants
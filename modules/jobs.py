@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Jobs Module
+Фоновые задачи для долгих операций: таблица задач в SQLite,
+очередь с ограничением параллельности и общий бюджет процессов FFmpeg
+"""
+import json
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_DB_PATH = Path("state/jobs.sqlite")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class FFmpegBudget:
+    """
+    Глобальный лимит одновременных процессов FFmpeg, честно делимый
+    между активными задачами: каждой задаче не больше slots / активных задач
+    """
+
+    def __init__(self, slots):
+        self.slots = max(1, int(slots))
+        self._in_use = {}
+        self._total = 0
+        self._cond = threading.Condition()
+
+    def register(self, job_id):
+        with self._cond:
+            self._in_use.setdefault(job_id, 0)
+            self._cond.notify_all()
+
+    def unregister(self, job_id):
+        with self._cond:
+            self._in_use.pop(job_id, None)
+            self._cond.notify_all()
+
+    def fair_share(self):
+        return max(1, self.slots // max(1, len(self._in_use)))
+
+    @contextmanager
+    def slot(self, job_id):
+        """Занимает один слот FFmpeg на время проверки потока"""
+        with self._cond:
+            self._in_use.setdefault(job_id, 0)
+            self._cond.wait_for(
+                lambda: self._total < self.slots and self._in_use[job_id] < self.fair_share()
+            )
+            self._in_use[job_id] += 1
+            self._total += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                if job_id in self._in_use:
+                    self._in_use[job_id] -= 1
+                self._total -= 1
+                self._cond.notify_all()
+
+    def usage(self):
+        with self._cond:
+            return {'slots': self.slots, 'in_use': self._total, 'jobs': len(self._in_use)}
+
+
+class JobContext:
+    """Передается в функцию задачи: прогресс, отмена, слоты FFmpeg"""
+
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.job_id = job_id
+        self.cancel_event = threading.Event()
+
+    def progress(self, message):
+        self.manager._update(self.job_id, progress=message)
+
+    def ffmpeg_slot(self):
+        return self.manager.budget.slot(self.job_id)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+
+class JobManager:
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_jobs=2, ffmpeg_slots=50):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.budget = FFmpegBudget(ffmpeg_slots)
+        self.executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+        self._contexts = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, operation TEXT, status TEXT,"
+                " created_at TEXT, started_at TEXT, finished_at TEXT,"
+                " progress TEXT, result TEXT, error TEXT)"
+            )
+            # Задачи прошлого процесса уже не выполняются
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ? WHERE status IN (?, ?)",
+                (FAILED, "Прервано перезапуском приложения", QUEUED, RUNNING),
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, operation, func, *args, **kwargs):
+        """
+        Ставит задачу в очередь. func вызывается как func(job, *args, **kwargs)
+        и должна вернуть JSON-сериализуемый результат.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, operation, status, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, operation, QUEUED, datetime.now().isoformat(timespec='seconds')),
+            )
+        job = JobContext(self, job_id)
+        with self._lock:
+            self._contexts[job_id] = job
+            self._futures[job_id] = self.executor.submit(self._run, job, func, args, kwargs)
+        return job_id
+
+    def _run(self, job, func, args, kwargs):
+        try:
+            # Отмена между выдачей задачи воркеру и этой проверкой: future.cancel() уже не сработал
+            if job.cancel_event.is_set():
+                raise JobCancelled()
+            self._update(job.job_id, status=RUNNING, started_at=datetime.now().isoformat(timespec='seconds'))
+            self.budget.register(job.job_id)
+            result = func(job, *args, **kwargs)
+            status = CANCELLED if job.cancel_event.is_set() else DONE
+            self._update(job.job_id, status=status, result=json.dumps(result, ensure_ascii=False),
+                         finished_at=datetime.now().isoformat(timespec='seconds'))
+        except JobCancelled:
+            self._update(job.job_id, status=CANCELLED, finished_at=datetime.now().isoformat(timespec='seconds'))
+        except Exception as e:
+            self._update(job.job_id, status=FAILED, error=str(e),
+                         finished_at=datetime.now().isoformat(timespec='seconds'))
+        finally:
+            self.budget.unregister(job.job_id)
+            with self._lock:
+                self._contexts.pop(job.job_id, None)
+                self._futures.pop(job.job_id, None)
+
+    def status(self, job_id):
+        """Возвращает запись задачи (result - распакованный JSON) или None"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        with self._lock:
+            job['queue_position'] = None
+            if job['status'] == QUEUED:
+                queued = [jid for jid, f in self._futures.items() if not f.running()]
+                job['queue_position'] = queued.index(job_id) + 1 if job_id in queued else None
+        return job
+
+    def cancel(self, job_id):
+        """Отменяет задачу: из очереди снимается сразу, запущенная останавливается"""
+        with self._lock:
+            job = self._contexts.get(job_id)
+            future = self._futures.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        if future is not None and future.cancel():
+            self._update(job_id, status=CANCELLED, finished_at=datetime.now().isoformat(timespec='seconds'))
+            with self._lock:
+                self._contexts.pop(job_id, None)
+                self._futures.pop(job_id, None)
+        return True
@@ -4,13 +4,18 @@ M3U Merger Module
 Умное объединение M3U файлов по группам с чекбоксами
 """
 import re
+import time
 from pathlib import Path
 from collections import defaultdict
+from modules.groupindex import GroupIndex, DEFAULT_GROUP
+from modules.fastscan import iter_entries, channel_name as extinf_channel_name, decode
+from modules.profiling import StageProfiler
+from modules.neardup import find_near_duplicates, NEARDUP_COLLAPSE, NEARDUP_TAG
 
 
 class M3UMerger:
     def __init__(self):
-        pass
+        self.profiler = StageProfiler()
     
     def parse_md_groups(self, md_content):
         """Парсит группы из Markdown контента"""
@@ -28,47 +33,169 @@ class M3UMerger:
                     group_to_channels[current_group].add(channel_name)
         return dict(group_to_channels)
     
+    def load_group_index(self, groups_file):
+        """Загружает индекс групп из JSON (конвертер) или из Markdown"""
+        if Path(groups_file).suffix.lower() == '.json':
+            return GroupIndex.load(groups_file)
+        with open(groups_file, 'r', encoding='utf-8') as f:
+            md_content = f.read()
+        return GroupIndex.from_groups(self.parse_md_groups(md_content))
+    
     def is_radio(self, channel_name, group_name=""):
         radio_keywords = {'radio', 'радио', 'fm', 'am', 'smooth', 'jazz', 'music', 'музыка', '📻'}
         combined = (channel_name + " " + group_name).lower()
         return any(kw in combined for kw in radio_keywords)
     
-    def parse_m3u_files(self, m3u_files, md_groups, progress_callback=None):
-        """Парсит M3U файлы и группирует по MD"""
-        url_to_entry = {}
-        channel_to_group = {}
-        for group, channels in md_groups.items():
-            for ch in channels:
-                channel_to_group[ch] = group
-        
+    def _resolve_group_index(self, md_groups):
+        if isinstance(md_groups, GroupIndex):
+            return md_groups
+        return GroupIndex.from_groups(md_groups)
+    
+    def iter_m3u_entries(self, m3u_files, progress_callback=None):
+        """Потоково отдает (url, имя канала) из M3U файлов, без радиостанций"""
         for m3u_file in m3u_files:
             if progress_callback:
                 progress_callback(f"Парсинг: {Path(m3u_file).name}")
             
-            with open(m3u_file, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                if line.startswith('#EXTINF:'):
-                    parts = line.rsplit(',', 1)
-                    channel_name = parts[1].strip() if len(parts) == 2 else "(без имени)"
-                    if i + 1 < len(lines):
-                        url = lines[i + 1].strip()
-                        if url and not url.startswith('#') and url.startswith(('http://', 'https://')):
-                            if self.is_radio(channel_name):
-                                i += 2
-                                continue
-                            final_group = channel_to_group.get(channel_name, "Без группы")
-                            if url not in url_to_entry:
-                                url_to_entry[url] = (channel_name, final_group)
-                    i += 2
-                else:
-                    i += 1
+            # URL должен идти строкой сразу после #EXTINF
+            for extinf, raw_url in iter_entries(m3u_file, schemes=(b'http://', b'https://'), strict=True):
+                channel_name = extinf_channel_name(extinf) or "(без имени)"
+                if not self.is_radio(channel_name):
+                    yield decode(raw_url), channel_name
+    
+    def _timed_lookup(self, group_index):
+        """lookup индекса групп с накоплением времени этапа match"""
+        perf_counter = time.perf_counter
+        totals = [0.0, 0]
+        
+        def lookup(channel_name):
+            started = perf_counter()
+            group = group_index.lookup(channel_name, DEFAULT_GROUP)
+            totals[0] += perf_counter() - started
+            totals[1] += 1
+            return group
+        return lookup, totals
+    
+    def parse_m3u_files(self, m3u_files, md_groups, progress_callback=None, profiler=None):
+        """Парсит M3U файлы и группирует по индексу групп (или словарю из MD)"""
+        if profiler is not None:
+            self.profiler = profiler
+        url_to_entry = {}
+        group_index = self._resolve_group_index(md_groups)
+        lookup, match = self._timed_lookup(group_index)
+        started = time.perf_counter()
         
+        for url, channel_name in self.iter_m3u_entries(m3u_files, progress_callback):
+            if url not in url_to_entry:
+                final_group = lookup(channel_name)
+                url_to_entry[url] = (channel_name, final_group)
+        
+        self.profiler.add('parse', time.perf_counter() - started - match[0])
+        self.profiler.add('match', match[0], match[1])
         return url_to_entry
     
+    def parse_m3u_files_to_store(self, m3u_files, md_groups, store, progress_callback=None, profiler=None):
+        """Парсит M3U файлы в дисковое хранилище (SQLiteMergeStore)"""
+        if profiler is not None:
+            self.profiler = profiler
+        group_index = self._resolve_group_index(md_groups)
+        lookup, match = self._timed_lookup(group_index)
+        started = time.perf_counter()
+        store.add_entries(
+            (url, channel_name, lookup(channel_name))
+            for url, channel_name in self.iter_m3u_entries(m3u_files, progress_callback)
+        )
+        # parse включает вставку в SQLite (идет тем же потоком)
+        self.profiler.add('parse', time.perf_counter() - started - match[0])
+        self.profiler.add('match', match[0], match[1])
+        return store
+    
+    def _near_duplicate_plan(self, entries, mode):
+        """
+        entries - список (ключ записи, имя, группа) после удаления/объединения групп.
+        Кластер учитывается, только если в нем есть хотя бы два разных имени:
+        collapse - решается внутри группы (записи разных групп друг друга не удаляют):
+        записи с каноническим именем остаются все (запасные URL), если их нет -
+        первая запись получает каноническое имя, остальные варианты имени удаляются;
+        tag - все записи остаются, каноническое имя кластера - метка (tvg-name)
+        """
+        canonical, stats = find_near_duplicates(name for _, name, _ in entries)
+        cluster_names = defaultdict(set)
+        group_names = defaultdict(set)
+        for _, name, group in entries:
+            target = canonical.get(name)
+            if target is not None:
+                cluster_names[target].add(name)
+                group_names[(target, group)].add(name)
+        
+        renamed, tagged, deleted = [], [], []
+        kept = set()
+        for entry_key, name, group in entries:
+            # Имена без ключа (пустые или только номер) не сравниваются
+            target = canonical.get(name)
+            if target is None or len(cluster_names[target]) < 2:
+                continue
+            if mode == NEARDUP_TAG:
+                tagged.append((entry_key, target))
+                continue
+            names = group_names[(target, group)]
+            if len(names) < 2 or name == target:
+                continue
+            if target in names or (target, group) in kept:
+                deleted.append(entry_key)
+            else:
+                kept.add((target, group))
+                renamed.append((entry_key, target))
+        
+        stats['renamed'] = len(renamed)
+        stats['tagged'] = len(tagged)
+        stats['removed'] = len(deleted)
+        return renamed, tagged, deleted, stats
+    
+    def collapse_near_duplicates(self, grouped, mode=NEARDUP_COLLAPSE):
+        """
+        Почти одинаковые каналы в сгруппированных данных (после delete_groups/merge_groups).
+        Возвращает (grouped, метки url → имя, статистика)
+        """
+        renamed, tagged, deleted, stats = self._near_duplicate_plan(
+            [(url, name, group) for group, channels in grouped.items() for name, url in channels], mode
+        )
+        if renamed or deleted:
+            renamed, deleted = dict(renamed), set(deleted)
+            for group, channels in grouped.items():
+                grouped[group] = [(renamed.get(url, name), url) for name, url in channels if url not in deleted]
+        return grouped, dict(tagged), stats
+    
+    def collapse_near_duplicates_in_store(self, store, mode=NEARDUP_COLLAPSE):
+        """То же для дискового хранилища (SQLiteMergeStore): правки пакетами по seq"""
+        renamed, tagged, deleted, stats = self._near_duplicate_plan(list(store.iter_names()), mode)
+        store.update_entries(renamed, tagged, deleted)
+        return stats
+    
+    def iter_regroup(self, entries, md_groups, stats, groups_to_delete=(), merge_into=None):
+        """
+        Потоковая перегруппировка записей конвейера по индексу групп:
+        радио и дубликаты URL отбрасываются, удаленные группы пропускаются,
+        merge_into {группа-источник: целевая группа} объединяет группы
+        """
+        group_index = self._resolve_group_index(md_groups)
+        groups_to_delete = set(groups_to_delete)
+        merge_into = merge_into or {}
+        seen_urls = set()
+        for entry in entries:
+            name = entry.get('name') or "(без имени)"
+            if entry['url'] in seen_urls or self.is_radio(name):
+                stats['skipped'] += 1
+                continue
+            seen_urls.add(entry['url'])
+            group = group_index.lookup(name, DEFAULT_GROUP)
+            group = merge_into.get(group, group)
+            if group in groups_to_delete:
+                stats['deleted'] += 1
+                continue
+            stats['grouped'] += 1
+            yield {**entry, 'group': group, 'info': f'#EXTINF:-1 group-title="{group}",{name}'}
+    
     def rebuild_grouped_data(self, url_to_entry):
         """Восстанавливает группировку"""
         grouped = defaultdict(list)
@@ -95,11 +222,14 @@ class M3UMerger:
                 del grouped[group]
         return grouped
     
-    def write_m3u(self, grouped_data):
-        """Записывает M3U контент"""
+    def write_m3u(self, grouped_data, tags=None):
+        """Записывает M3U контент (tags: url → tvg-name для помеченных дубликатов)"""
         lines = ["#EXTM3U\n"]
+        tags = tags or {}
         for group in sorted(grouped_data.keys()):
             for channel_name, url in grouped_data[group]:
-                lines.append(f'#EXTINF:-1 group-title="{group}",{channel_name}\n')
+                tag = tags.get(url)
+                tvg_name = f' tvg-name="{tag}"' if tag else ""
+                lines.append(f'#EXTINF:-1{tvg_name} group-title="{group}",{channel_name}\n')
                 lines.append(f'{url}\n')
         return lines
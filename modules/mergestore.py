@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Merge Store Module
+Дисковое хранилище записей Merger на SQLite для многомиллионных плейлистов
+"""
+import os
+import sqlite3
+import tempfile
+
+
+class SQLiteMergeStore:
+    """Дедупликация по URL через индекс, операции над группами — SQL запросами"""
+
+    BATCH_SIZE = 10000
+
+    def __init__(self, db_path=None):
+        self._temporary = db_path is None
+        if self._temporary:
+            fd, db_path = tempfile.mkstemp(prefix="m3u_merge_", suffix=".sqlite")
+            os.close(fd)
+        self.db_path = str(db_path)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " seq INTEGER PRIMARY KEY,"
+            " url TEXT NOT NULL UNIQUE,"
+            " name TEXT NOT NULL,"
+            " grp TEXT NOT NULL,"
+            " tag TEXT)"
+        )
+        self._indexed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Закрывает соединение и удаляет временную базу"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self._temporary and os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def add_entries(self, entries):
+        """Добавляет записи (url, name, group); повторный URL игнорируется"""
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= self.BATCH_SIZE:
+                self._insert(batch)
+                batch = []
+        if batch:
+            self._insert(batch)
+        self.conn.commit()
+
+    def _insert(self, batch):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO entries (url, name, grp) VALUES (?, ?, ?)", batch
+        )
+
+    def _ensure_index(self):
+        """Индекс по группе строится один раз после массовой загрузки"""
+        if not self._indexed:
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_grp ON entries (grp, seq)")
+            self._indexed = True
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def group_counts(self):
+        """Возвращает словарь группа → количество каналов"""
+        self._ensure_index()
+        rows = self.conn.execute("SELECT grp, COUNT(*) FROM entries GROUP BY grp ORDER BY grp")
+        return dict(rows)
+
+    def get_group_list(self):
+        """Возвращает отсортированный список групп"""
+        return list(self.group_counts().keys())
+
+    def delete_groups(self, groups_to_delete):
+        """Удаляет группы одним запросом"""
+        self._ensure_index()
+        groups = list(groups_to_delete)
+        if groups:
+            placeholders = ",".join("?" * len(groups))
+            self.conn.execute(f"DELETE FROM entries WHERE grp IN ({placeholders})", groups)
+            self.conn.commit()
+
+    def merge_groups(self, target_group, source_groups):
+        """Переносит каналы исходных групп в целевую одним запросом"""
+        self._ensure_index()
+        groups = [g for g in source_groups if g != target_group]
+        if groups:
+            placeholders = ",".join("?" * len(groups))
+            self.conn.execute(
+                f"UPDATE entries SET grp = ? WHERE grp IN ({placeholders})",
+                [target_group] + groups,
+            )
+            self.conn.commit()
+
+    def iter_names(self):
+        """Потоково отдает (seq, имя, группа) в порядке добавления"""
+        cursor = self.conn.execute("SELECT seq, name, grp FROM entries ORDER BY seq")
+        while True:
+            rows = cursor.fetchmany(self.BATCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+
+    def update_entries(self, renamed=(), tagged=(), deleted=()):
+        """Пакетные правки по seq: renamed (seq, имя), tagged (seq, метка), deleted seq"""
+        self.conn.executemany("UPDATE entries SET name = ? WHERE seq = ?", ((n, q) for q, n in renamed))
+        self.conn.executemany("UPDATE entries SET tag = ? WHERE seq = ?", ((t, q) for q, t in tagged))
+        self.conn.executemany("DELETE FROM entries WHERE seq = ?", ((q,) for q in deleted))
+        self.conn.commit()
+
+    def iter_grouped(self):
+        """Потоково отдает (группа, имя, url, метка) в порядке групп и добавления"""
+        self._ensure_index()
+        cursor = self.conn.execute("SELECT grp, name, url, tag FROM entries ORDER BY grp, seq")
+        while True:
+            rows = cursor.fetchmany(self.BATCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+
+    def write_m3u_file(self, output_file):
+        """Потоково записывает M3U с диска, не собирая строки в памяти"""
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write("#EXTM3U\n")
+            for group, channel_name, url, tag in self.iter_grouped():
+                tvg_name = f' tvg-name="{tag}"' if tag else ""
+                f.write(f'#EXTINF:-1{tvg_name} group-title="{group}",{channel_name}\n')
+                f.write(f'{url}\n')
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Module
+Поиск почти одинаковых каналов ("Первый канал HD", "Perviy Kanal [HD]", "Zvezda HD"):
+ключ имени (транслитерация, теги качества, пунктуация) → MinHash/LSH кандидаты
+→ проверка Жаккара по триграммам → кластеры (union-find)
+"""
+import re
+import zlib
+import random
+from array import array
+from collections import Counter
+from modules.groupindex import normalize_name, QUALITY_TAGS, DIGITS
+
+
+NEARDUP_OFF = "off"
+NEARDUP_COLLAPSE = "collapse"
+NEARDUP_TAG = "tag"
+NEARDUP_MODES = (NEARDUP_OFF, NEARDUP_COLLAPSE, NEARDUP_TAG)
+
+TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch',
+    'ш': 'sh', 'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'і': 'i', 'ї': 'i', 'є': 'e', 'ґ': 'g',
+}
+TRANSLIT_TABLE = str.maketrans(TRANSLIT)
+
+# Разные варианты латиницы одного русского звука сводятся к одному написанию
+SKELETON = (('kh', 'h'), ('ts', 'c'), ('ph', 'f'), ('w', 'v'), ('x', 'ks'), ('j', 'i'), ('y', 'i'))
+REPEATS = re.compile(r'(.)\1+')
+NUMBER_TV = re.compile(r'(\d+)\s*tv\b')
+
+
+def _skeleton(text):
+    for old, new in SKELETON:
+        text = text.replace(old, new)
+    return REPEATS.sub(r'\1', text)
+
+
+STOP_WORDS = {_skeleton(word) for word in ('kanal', 'channel', 'telekanal')}
+ORDINALS = {
+    _skeleton(word.translate(TRANSLIT_TABLE)): str(n)
+    for n, word in enumerate(("первый", "второй", "третий", "четвертый", "пятый",
+                              "шестой", "седьмой", "восьмой", "девятый", "десятый"), 1)
+}
+
+
+def channel_key(name):
+    """Ключ сравнения имени: 'Perviy Kanal [HD]' и 'Первый канал HD' → '1'"""
+    key = normalize_name(name).translate(TRANSLIT_TABLE)
+    key = QUALITY_TAGS.sub(' ', key)
+    key = re.sub(r'[^\w\s]+', ' ', key).replace('_', ' ')
+    # '1tv' → '1 tv', 'tv3' → 'tv 3'
+    key = re.sub(r'(?<=\d)(?=[a-z])|(?<=[a-z])(?=\d)', ' ', key)
+    key = NUMBER_TV.sub(r'\1', key)
+    words = [ORDINALS.get(word, word) for word in _skeleton(key).split()]
+    meaningful = [word for word in words if word not in STOP_WORDS]
+    return ' '.join(meaningful or words)
+
+
+def clusterable(key):
+    """
+    Ключ годится для сравнения: есть слово кроме номеров и «канал»
+    ('1TV', 'Channel 5', '5 канал' - под одним номером в разных странах разные каналы)
+    """
+    return any(not word.isdigit() and word not in STOP_WORDS for word in key.split())
+
+
+def shingles(key, size=3):
+    """Символьные триграммы ключа (с границами слов)"""
+    padded = f" {key} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class NearDuplicateFinder:
+    """
+    Уникальные ключи имен → кластеры. Подписи MinHash не хранятся: на ключ
+    остается по одному хешу полосы (bands × 8 байт), полосы обрабатываются по очереди,
+    поэтому память растет линейно и умеренно даже для сотен тысяч имен
+    """
+
+    def __init__(self, threshold=0.6, bands=16, rows=4, bucket_limit=4, seed=42):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.bucket_limit = bucket_limit
+        rnd = random.Random(seed)
+        self._masks = [rnd.getrandbits(32) for _ in range(bands * rows)]
+        self._shingle_hashes = {}
+        self.keys = []
+        self._key_ids = {}
+        self._band_hashes = array('q')
+        self._parent = []
+        self.stats = {'keys': 0, 'candidate_pairs': 0, 'verified_pairs': 0}
+
+    def _signature(self, grams):
+        cache = self._shingle_hashes
+        rows = []
+        for gram in grams:
+            hashes = cache.get(gram)
+            if hashes is None:
+                base = zlib.crc32(gram.encode('utf-8'))
+                hashes = tuple(((base ^ mask) * 0x9E3779B1) & 0xFFFFFFFF for mask in self._masks)
+                cache[gram] = hashes
+            rows.append(hashes)
+        # Поэлементный минимум по всем триграммам - в C (zip/map)
+        return list(map(min, zip(*rows)))
+
+    def add(self, key):
+        """Добавляет ключ, возвращает его номер (одинаковые ключи - один номер)"""
+        key_id = self._key_ids.get(key)
+        if key_id is not None:
+            return key_id
+        key_id = len(self.keys)
+        self._key_ids[key] = key_id
+        self.keys.append(key)
+        self._parent.append(key_id)
+        signature = self._signature(shingles(key))
+        # Номера и число слов входят в хеш полосы: Россия 1 / Россия 24 и Россия / Россия К
+        # не становятся кандидатами, проверка пар не тратится на заведомо разные каналы
+        shape = (len(key.split()), *DIGITS.findall(key))
+        rows = self.rows
+        for band in range(self.bands):
+            self._band_hashes.append(hash((band, shape, *signature[band * rows:(band + 1) * rows])))
+        return key_id
+
+    def _find(self, key_id):
+        parent = self._parent
+        while parent[key_id] != key_id:
+            parent[key_id] = parent[parent[key_id]]
+            key_id = parent[key_id]
+        return key_id
+
+    def _union(self, first, second):
+        first, second = self._find(first), self._find(second)
+        if first != second:
+            self._parent[max(first, second)] = min(first, second)
+
+    def _similar(self, first, second):
+        return jaccard(shingles(self.keys[first]), shingles(self.keys[second])) >= self.threshold
+
+    def clusters(self):
+        """Список корней: clusters()[key_id] - номер кластера (наименьший номер ключа)"""
+        self.stats['keys'] = len(self.keys)
+        bands = self.bands
+        for band in range(bands):
+            buckets = {}
+            for key_id in range(len(self.keys)):
+                bucket = buckets.setdefault(self._band_hashes[key_id * bands + band], [])
+                for other in bucket:
+                    if self._find(other) == self._find(key_id):
+                        continue
+                    self.stats['candidate_pairs'] += 1
+                    if self._similar(other, key_id):
+                        self.stats['verified_pairs'] += 1
+                        self._union(other, key_id)
+                # Большие корзины (частые слова) не дают квадратичного числа сравнений
+                if len(bucket) < self.bucket_limit:
+                    bucket.append(key_id)
+        return [self._find(key_id) for key_id in range(len(self.keys))]
+
+
+def find_near_duplicates(names, threshold=0.6):
+    """
+    names - итерируемое имен (с повторами). Возвращает (имя → каноническое имя, статистика).
+    Каноническое имя кластера - самое частое исходное имя (при равенстве - первое встреченное).
+    Имена с пустым ключом ('HD', '4K', только эмодзи или пунктуация) и ключом из номера
+    ('1TV', 'Канал 5') не кластеризуются и в результат не попадают.
+    """
+    finder = NearDuplicateFinder(threshold=threshold)
+    counts = Counter(names)
+    name_ids = {}
+    skipped = 0
+    for name in list(counts):
+        key = channel_key(name)
+        if not clusterable(key):
+            del counts[name]
+            skipped += 1
+            continue
+        name_ids[name] = finder.add(key)
+    roots = finder.clusters()
+
+    canonical = {}
+    cluster_sizes = Counter()
+    for name, count in counts.items():
+        root = roots[name_ids[name]]
+        cluster_sizes[root] += 1
+        best = canonical.get(root)
+        if best is None or count > counts[best]:
+            canonical[root] = name
+
+    stats = dict(finder.stats)
+    stats['names'] = len(counts)
+    stats['skipped_names'] = skipped
+    stats['clusters'] = sum(1 for size in cluster_sizes.values() if size > 1)
+    stats['clustered_names'] = sum(size for size in cluster_sizes.values() if size > 1)
+    return {name: canonical[roots[key_id]] for name, key_id in name_ids.items()}, stats
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Pipeline Module
+Однопроходный конвейер clean → test → group → export: записи идут потоком
+через логику M3UCleaner / M3UTester / M3UMerger / M3UConverter без промежуточных файлов
+"""
+import time
+from pathlib import Path
+from modules.fastscan import iter_entries_with_options, playlist_header, channel_name, decode
+from modules.compression import open_playlist, compressed_path, PLAIN
+from modules.hls import format_variants_comment
+
+
+STAGES = ("clean", "test", "group", "export")
+
+
+class PlaylistPipeline:
+    def __init__(self, stages=STAGES, cleaner=None, tester=None, merger=None, converter=None,
+                 blocklist_text="", group_index=None, groups_to_delete=(), merge_into=None,
+                 progress_callback=None):
+        unknown = [stage for stage in stages if stage not in STAGES]
+        if unknown:
+            raise ValueError(f"Неизвестные этапы: {', '.join(unknown)}")
+        self.stages = [stage for stage in STAGES if stage in stages]
+        self.cleaner = cleaner
+        self.tester = tester
+        self.merger = merger
+        self.converter = converter
+        self.blocklist_text = blocklist_text
+        self.group_index = group_index
+        self.groups_to_delete = groups_to_delete
+        self.merge_into = merge_into
+        self.progress_callback = progress_callback
+        self.stats = {'source': {'files': 0, 'entries': 0}}
+
+    def _log(self, message):
+        if self.progress_callback:
+            self.progress_callback(message)
+
+    def iter_source(self, input_files):
+        """Записи всех входных плейлистов: словари info / url / name / source_file / options"""
+        for input_file in input_files:
+            source_file = Path(input_file).name
+            self.stats['source']['files'] += 1
+            self._log(f"📂 Обрабатывается: {source_file}")
+            try:
+                for extinf, raw_url, options in iter_entries_with_options(input_file):
+                    self.stats['source']['entries'] += 1
+                    yield {
+                        'info': decode(extinf) if extinf else None,
+                        'url': decode(raw_url),
+                        'name': channel_name(extinf) if extinf else None,
+                        'source_file': source_file,
+                        # #EXTVLCOPT / #KODIPROP... идут вместе с записью, как в Cleaner
+                        'options': [decode(option) for option in options] if options else (),
+                    }
+            except OSError as e:
+                self._log(f"✗ Ошибка чтения {source_file}: {e}")
+
+    def _test(self, entries):
+        # Опции записей, которые сейчас проверяются (URL уникальны после дедупликации)
+        options = {}
+        
+        def streams():
+            # Дубликаты потоков отсеиваются до запуска FFmpeg
+            for entry in entries:
+                stream = self.tester.new_stream(entry['url'], entry['info'], entry['source_file'], entry['name'])
+                if stream is not None:
+                    options[stream.url] = entry.get('options')
+                    yield stream
+        
+        try:
+            for tested, result in enumerate(self.tester.iter_test_streams(streams()), 1):
+                if tested % 100 == 0:
+                    self._log(f"🔍 Протестировано: {tested} | Рабочих: {self.tester.stats['streams_working']}")
+                entry_options = options.pop(result.url, None)
+                if result.status == 'working':
+                    yield {'info': result.info, 'url': result.url, 'name': result.name,
+                           'source_file': result.source_file, 'options': entry_options,
+                           'variants': result.working_variants}
+        finally:
+            self.tester.close()
+
+    @staticmethod
+    def _header(input_files):
+        """Заголовок (#EXTM3U url-tvg=...) первого входного файла, где он есть"""
+        for input_file in input_files:
+            try:
+                header = playlist_header(input_file)
+            except OSError:
+                continue
+            if header:
+                return decode(header)
+        return "#EXTM3U"
+
+    def build(self, input_files):
+        """Собирает цепочку генераторов по выбранным этапам"""
+        entries = self.iter_source(input_files)
+        if "clean" in self.stages:
+            self.stats['clean'] = {'total': 0, 'blocked': 0, 'kept': 0, 'duplicates': 0}
+            entries = self.cleaner.iter_clean(entries, self.stats['clean'], self.blocklist_text)
+        if "test" in self.stages:
+            self.stats['test'] = self.tester.stats
+            entries = self._test(entries)
+        if "group" in self.stages:
+            self.stats['group'] = {'grouped': 0, 'deleted': 0, 'skipped': 0}
+            entries = self.merger.iter_regroup(entries, self.group_index, self.stats['group'],
+                                               self.groups_to_delete, self.merge_into)
+        return entries
+
+    def run(self, input_files, output_folder, codec=PLAIN):
+        """
+        Прогоняет записи через конвейер и пишет playlist.m3u (и экспорт Converter).
+        Возвращает сводку: этапы, счетчики, выходные файлы, время.
+        """
+        started = time.perf_counter()
+        output_folder = Path(output_folder)
+        output_file = compressed_path(output_folder / "playlist.m3u", codec)
+        export = "export" in self.stages
+        all_data = {}
+        written = 0
+
+        with open_playlist(output_file, 'w', codec) as f:
+            f.write(f"{self._header(input_files)}\n")
+            for entry in self.build(input_files):
+                # Опции - перед #EXTINF, как пишет Cleaner (URL остается сразу после #EXTINF)
+                for option in entry.get('options') or ():
+                    f.write(f"{option}\n")
+                if entry.get('variants'):
+                    f.write(format_variants_comment(entry['variants']))
+                if entry['info']:
+                    f.write(f"{entry['info']}\n")
+                f.write(f"{entry['url']}\n")
+                written += 1
+                if export and entry['info']:
+                    group, channel = self.converter.extract_group_and_channel(entry['info'])
+                    if channel and not self.converter.is_url(channel):
+                        all_data.setdefault(entry['source_file'], {}).setdefault(group, []).append(channel)
+
+        outputs = [output_file]
+        if export:
+            outputs.extend(self._export(all_data, output_folder))
+
+        return {
+            'stages': self.stages,
+            'stats': self.stats,
+            'entries_written': written,
+            'outputs': [str(path) for path in outputs],
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+        }
+
+    def _export(self, all_data, output_folder):
+        """Списки каналов в PDF/HTML/MD и индекс групп (как во вкладке Converter)"""
+        self._log("📄 Экспорт PDF/HTML/MD")
+        pdf_story, html_content, md_content = self.converter.convert_data(all_data)
+        pdf_file = output_folder / "playlist.pdf"
+        html_file = output_folder / "playlist.html"
+        md_file = output_folder / "playlist.md"
+        groups_file = output_folder / "playlist.groups.json"
+
+        self.converter.write_pdf(pdf_story, pdf_file)
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        with open(md_file, 'w', encoding='utf-8') as f:
+            f.write(md_content)
+        self.converter.group_index.save(groups_file)
+        self.stats['export'] = {
+            'files': len(all_data),
+            'groups': sum(len(groups) for groups in all_data.values()),
+        }
+        return [pdf_file, html_file, md_file, groups_file]
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Profiling Module
+Таймеры этапов и счетчики для статистики операций,
+по запросу - cProfile или сэмплирующий профилировщик (видит все потоки)
+"""
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+
+
+PROFILE_OFF = "off"
+PROFILE_CPROFILE = "cprofile"
+PROFILE_SAMPLING = "sampling"
+PROFILE_MODES = (PROFILE_OFF, PROFILE_CPROFILE, PROFILE_SAMPLING)
+
+TOP_FUNCTIONS = 30
+
+
+class SamplingProfiler:
+    """
+    Раз в interval снимает стеки потоков (sys._current_frames): потока, запустившего
+    профилирование, и всех потоков, созданных после запуска (например, пула проверок)
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.own_samples = Counter()
+        self.total_samples = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._ignored = set()
+
+    def _run(self):
+        self._ignored.add(threading.get_ident())
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in self._ignored:
+                    continue
+                self.samples += 1
+                self.own_samples[self._label(frame)] += 1
+                seen = set()
+                while frame is not None:
+                    label = self._label(frame)
+                    if label not in seen:
+                        seen.add(label)
+                        self.total_samples[label] += 1
+                    frame = frame.f_back
+
+    @staticmethod
+    def _label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+    def start(self):
+        # Потоки, уже работавшие до запуска (веб-сервер, другие задачи), не сэмплируются
+        self._ignored = set(sys._current_frames()) - {threading.get_ident()}
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self, limit=TOP_FUNCTIONS):
+        return {
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'top_self': [{'function': name, 'samples': n} for name, n in self.own_samples.most_common(limit)],
+            'top_total': [{'function': name, 'samples': n} for name, n in self.total_samples.most_common(limit)],
+        }
+
+
+class StageProfiler:
+    """
+    Накопительные таймеры этапов (read, parse, match, dedup, render, write...)
+    и счетчики. Безопасен для вызова из нескольких потоков.
+    """
+
+    def __init__(self, mode=PROFILE_OFF):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode}")
+        self.mode = mode
+        self.stages = {}
+        self.counters = Counter()
+        self.parallel = set()
+        self._order = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._capture = None
+
+    def add(self, name, seconds, calls=1, parallel=False):
+        """
+        Добавляет время этапа, измеренное вызывающим кодом (для горячих циклов).
+        parallel=True - время суммируется по потокам и может превышать общее
+        """
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = [0.0, 0]
+                self._order.append(name)
+                if parallel:
+                    self.parallel.add(name)
+            self.stages[name][0] += seconds
+            self.stages[name][1] += calls
+
+    @contextmanager
+    def stage(self, name, parallel=False):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started, parallel=parallel)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    @contextmanager
+    def capture(self):
+        """Включает выбранный профилировщик функций на время блока"""
+        if self.mode == PROFILE_CPROFILE:
+            # cProfile видит только текущий поток; для пулов потоков - sampling
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                self._capture = self._cprofile_report(profiler)
+        elif self.mode == PROFILE_SAMPLING:
+            profiler = SamplingProfiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                self._capture = profiler.report()
+        else:
+            yield
+
+    @staticmethod
+    def _cprofile_report(profiler, limit=TOP_FUNCTIONS):
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        top = []
+        for (filename, line, func), (cc, nc, tt, ct, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]:
+            top.append({
+                'function': f"{func} ({Path(filename).name}:{line})",
+                'calls': nc,
+                'own_seconds': round(tt, 4),
+                'cumulative_seconds': round(ct, 4),
+            })
+        return {'top_cumulative': top}
+
+    def to_dict(self):
+        with self._lock:
+            profile = {
+                'total_seconds': round(time.perf_counter() - self._started, 4),
+                'stages': {
+                    name: {'seconds': round(self.stages[name][0], 4), 'calls': self.stages[name][1],
+                           **({'parallel': True} if name in self.parallel else {})}
+                    for name in self._order
+                },
+                'counters': dict(self.counters),
+            }
+        if self._capture is not None:
+            profile[self.mode] = self._capture
+        return profile
+
+    def format_text(self):
+        """Строки для текстового поля статистики"""
+        profile = self.to_dict()
+        if not profile['stages']:
+            return ""
+        total = max(profile['total_seconds'], 1e-9)
+        lines = ["⏱ Этапы:"]
+        for name, stage in profile['stages'].items():
+            if stage.get('parallel'):
+                lines.append(f"- {name}: {stage['seconds']:.3f} c (сумма по потокам, {stage['calls']} вызовов)")
+            else:
+                lines.append(f"- {name}: {stage['seconds']:.3f} c ({stage['seconds'] / total * 100:.0f}%)")
+        lines.append(f"- всего: {profile['total_seconds']:.3f} c")
+        capture = profile.get(self.mode)
+        if capture:
+            top = capture.get('top_cumulative') or capture.get('top_self') or []
+            if top:
+                lines.append(f"🔬 {self.mode}: {top[0]['function']} (подробно в profile.json)")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path):
+        """Сохраняет JSON профиль (рядом с результатами операции)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Remote Playlist Module
+Загрузка плейлистов по URL: пул соединений, параллельность,
+дисковый кэш с условными запросами (ETag / Last-Modified)
+"""
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+
+DEFAULT_CACHE_DIR = Path("cache/playlists")
+USER_AGENT = "m3uGenius/1.0"
+CHUNK_SIZE = 1024 * 1024
+
+
+def parse_url_list(text):
+    """Извлекает URL плейлистов из текста (один на строку, # - комментарий)"""
+    urls = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if line and not line.startswith('#') and line.startswith(('http://', 'https://')):
+            urls.append(line)
+    return urls
+
+
+class PlaylistFetcher:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_connections=8, timeout=30):
+        self.cache_dir = Path(cache_dir)
+        self.max_connections = max_connections
+        self.client = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            timeout=timeout,
+            follow_redirects=True,
+            # Тело пишется в кэш как есть: gzip распознается по сигнатуре при чтении
+            headers={'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip'},
+        )
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.client.close()
+
+    def _url_lock(self, url):
+        """Один URL не скачивается параллельно двумя потоками"""
+        with self._locks_guard:
+            return self._locks.setdefault(url, threading.Lock())
+
+    def cache_paths(self, url):
+        """Пути к телу и метаданным кэша для URL"""
+        # Имя тела - только из хэша: путь URL может содержать '..' или быть длиннее лимита ФС
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()[:24]
+        folder = self.cache_dir / key
+        return folder / f"{key}.m3u", folder / "meta.json"
+
+    def fetch(self, url):
+        """
+        Скачивает плейлист в кэш потоком (без загрузки в память).
+        Возвращает (путь, from_cache).
+        """
+        body_path, meta_path = self.cache_paths(url)
+        with self._url_lock(url):
+            meta = {}
+            if body_path.exists() and meta_path.exists():
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+
+            headers = {}
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+            with self.client.stream('GET', url, headers=headers) as response:
+                if response.status_code == 304 and meta:
+                    return body_path, True
+                response.raise_for_status()
+
+                body_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = body_path.with_name(body_path.name + ".part")
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_raw(CHUNK_SIZE):
+                        f.write(chunk)
+                os.replace(tmp_path, body_path)
+
+                meta = {
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            return body_path, False
+
+    def fetch_all(self, urls, progress_callback=None):
+        """
+        Параллельно скачивает список URL.
+        Возвращает (пути в исходном порядке, [(url, ошибка), ...] для незагруженных).
+        """
+        def fetch_one(url):
+            try:
+                path, from_cache = self.fetch(url)
+                if progress_callback:
+                    progress_callback(f"{'Из кэша' if from_cache else 'Скачано'}: {url}")
+                return str(path), None
+            except (httpx.HTTPError, OSError) as e:
+                if progress_callback:
+                    progress_callback(f"Ошибка загрузки {url}: {e}")
+                # httpx добавляет к ошибке статуса ссылку на документацию - в отчет идет первая строка
+                return None, (str(e) or type(e).__name__).splitlines()[0]
+
+        if not urls:
+            return [], []
+        with ThreadPoolExecutor(max_workers=min(self.max_connections, len(urls))) as executor:
+            results = list(executor.map(fetch_one, urls))
+        paths = [path for path, _ in results if path]
+        failed = [(url, error) for url, (path, error) in zip(urls, results) if not path]
+        return paths, failed
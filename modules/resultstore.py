@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Result Store Module
+Мемоизация результатов операций: контентно-адресуемое хранилище
+(ключ = хеш операции, содержимого входных файлов, параметров и версии модулей)
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import importlib.util
+from pathlib import Path
+from datetime import datetime
+
+
+DEFAULT_STORE_DIR = Path("outputs/.store")
+MANIFEST = "manifest.json"
+TMP_SUFFIX = ".tmp"
+CHUNK_SIZE = 1024 * 1024
+
+_module_digests = {}
+
+
+def file_digest(path):
+    """SHA-256 содержимого файла (потоково)"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def module_digest(module_name):
+    """Версия модуля = хеш его исходного кода (без импорта модуля)"""
+    if module_name not in _module_digests:
+        spec = importlib.util.find_spec(module_name)
+        origin = spec.origin if spec else None
+        _module_digests[module_name] = file_digest(origin) if origin and os.path.isfile(origin) else ""
+    return _module_digests[module_name]
+
+
+def _link_or_copy(src, dst):
+    """Жесткая ссылка (мгновенно, без копии); копия - если ссылка невозможна"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class ResultStore:
+    def __init__(self, root=DEFAULT_STORE_DIR, max_bytes=2 * 1024 ** 3, max_age_days=14):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+
+    def job_key(self, operation, input_files, params, module_names):
+        """Ключ задачи: операция + содержимое входов + параметры + версии модулей"""
+        h = hashlib.sha256()
+        h.update(operation.encode('utf-8'))
+        for path in input_files:
+            h.update(b'\0' + file_digest(path).encode('ascii'))
+        h.update(json.dumps(params, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        for name in module_names:
+            h.update(f"\0{name}:{module_digest(name)}".encode('utf-8'))
+        return h.hexdigest()
+
+    def _entry_dir(self, key):
+        return self.root / key[:2] / key
+
+    def fetch(self, key, dest_folder):
+        """
+        Если результат уже есть - связывает его файлы в dest_folder.
+        Возвращает (пути файлов, meta) или None.
+        """
+        entry = self._entry_dir(key)
+        manifest_path = entry / MANIFEST
+        linked = []
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            paths = []
+            for name in manifest['files']:
+                dst = Path(dest_folder) / name
+                if not dst.exists():
+                    _link_or_copy(entry / name, dst)
+                    linked.append(dst)
+                paths.append(dst)
+            # mtime манифеста - время последнего использования (для вытеснения)
+            os.utime(manifest_path)
+        except FileNotFoundError:
+            # Записи нет или ее как раз вытесняет другой поток - промах кэша
+            for dst in linked:
+                dst.unlink(missing_ok=True)
+            return None
+        return paths, manifest.get('meta', {})
+
+    def put(self, key, files, meta=None):
+        """Сохраняет файлы результата под ключом и запускает вытеснение"""
+        entry = self._entry_dir(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # Своя временная папка на вызов: параллельные put одного ключа не мешают друг другу
+        tmp = Path(tempfile.mkdtemp(prefix=entry.name + ".", suffix=TMP_SUFFIX, dir=entry.parent))
+        try:
+            for path in files:
+                _link_or_copy(path, tmp / Path(path).name)
+            with open(tmp / MANIFEST, 'w', encoding='utf-8') as f:
+                json.dump({'files': [Path(p).name for p in files], 'meta': meta or {}}, f, ensure_ascii=False)
+            try:
+                os.replace(tmp, entry)
+            except OSError:
+                # Тот же результат уже сохранил другой поток
+                if not (entry / MANIFEST).exists():
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def _entries(self):
+        """Список (время использования, размер, путь) всех записей"""
+        entries = []
+        if not self.root.exists():
+            return entries
+        for manifest_path in self.root.glob(f"*/*/{MANIFEST}"):
+            entry = manifest_path.parent
+            if entry.name.endswith(TMP_SUFFIX):
+                continue
+            try:
+                size = sum(p.stat().st_size for p in entry.iterdir())
+                entries.append((manifest_path.stat().st_mtime, size, entry))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def evict(self):
+        """Удаляет записи старше max_age и самые давние сверх max_bytes"""
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for used_at, size, entry in entries:
+            if now - used_at > self.max_age or total > self.max_bytes:
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                removed += 1
+        return removed
+
+
+def create_output_folder(output_dir):
+    """Создает папку output_dir/<дата_время>"""
+    output_dir = Path(output_dir)
+    timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Параллельные задачи в одну секунду получают разные папки
+    folder = output_dir / timestamp
+    suffix = 1
+    while True:
+        try:
+            folder.mkdir()
+            return folder
+        except FileExistsError:
+            suffix += 1
+            folder = output_dir / f"{timestamp}_{suffix}"
+
+
+def prune_output_folders(output_dir, max_age_days, skip=(DEFAULT_STORE_DIR.name,)):
+    """Удаляет папки результатов (outputs/<дата_время>) старше max_age_days"""
+    output_dir = Path(output_dir)
+    if not output_dir.exists():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for folder in output_dir.iterdir():
+        if folder.is_dir() and folder.name not in skip and folder.stat().st_mtime < cutoff:
+            shutil.rmtree(folder, ignore_errors=True)
+            removed += 1
+    return removed
@@ -7,44 +7,208 @@ M3U Tester Module
 import subprocess
 from pathlib import Path
 from urllib.parse import urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime
 import hashlib
+import functools
+import threading
 import sys
+import time
+import shutil
+import tempfile
+from contextlib import nullcontext
+from itertools import islice
+import httpx
+from modules.fastscan import iter_entries, decode
+from modules.delta import entry_fingerprint, BATCH_SIZE as DELTA_BATCH_SIZE
+from modules.profiling import StageProfiler
+from modules.compression import open_playlist, PLAIN
+from modules.hls import (HLSResolver, is_hls_url, cheapest_variant, format_variants_comment,
+                         dump_variants, load_variants, GONE_STATUSES, HLS_OFF, HLS_CHEAPEST, HLS_ALL)
 
 
-class M3UTester:
-    def __init__(self, timeout=8, max_workers=15):
-        self.timeout = timeout
-        self.max_workers = max_workers
+_ffmpeg_probe_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _probe_ffmpeg_cached():
+    """Запуск ffmpeg -version и -protocols (результат кэшируется)"""
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-version'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            timeout=5
+        )
+        first_line = result.stdout.decode('utf-8', errors='ignore').split('\n', 1)[0].split()
+        version = first_line[2] if len(first_line) > 2 else "unknown"
+        
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-protocols'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=5
+        )
+        protocols = set()
+        section = None
+        for line in result.stdout.decode('utf-8', errors='ignore').splitlines():
+            line = line.strip()
+            if line.endswith(':'):
+                section = line[:-1].lower()
+            elif line and section == 'input':
+                protocols.add(line.lower())
+    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    
+    print(f"✓ FFmpeg {version} найден и доступен")
+    return {'version': version, 'protocols': frozenset(protocols)}
+
+
+def probe_ffmpeg():
+    """
+    Однократная (на процесс) проверка FFmpeg: версия и входные протоколы.
+    Возвращает None, если FFmpeg недоступен.
+    """
+    with _ffmpeg_probe_lock:
+        return _probe_ffmpeg_cached()
+
+
+class StreamResult:
+    """Поток и результат его проверки: слоты вместо словаря, без копирования на каждом шаге"""
+    __slots__ = ('url', 'info', 'source_file', 'name', 'fingerprint', 'status', 'error', 'tested_at', 'variants')
+    
+    def __init__(self, url, info, source_file, name=None):
+        self.url = url
+        self.info = info
+        self.source_file = source_file
+        self.name = name
+        self.fingerprint = None
+        self.status = None
+        self.error = None
+        self.tested_at = None
+        # Для master-плейлиста HLS: [(HLSVariant, рабочий)] по проверенным вариантам
+        self.variants = None
+    
+    @property
+    def working_variants(self):
+        return [variant for variant, working in self.variants or () if working]
+    
+    def finish(self, status, error=None):
+        """Фиксирует результат проверки (tested_at - секунды epoch)"""
+        self.status = status
+        self.error = error
+        self.tested_at = time.time()
+        return self
+
+
+class TesterRun:
+    """Состояние одного запуска: дедупликация потоков и счетчики"""
+    
+    def __init__(self):
+        # Ключи дедупликации - 64-битные числа, а не строки хешей
         self.seen_streams = set()
-        self.working_streams = []
+        self.extracted = False
+        # Дельта-режим: запуск DeltaRun источника для потоков в работе (URL уникальны)
+        self.stream_deltas = {}
         self.stats = {
             'total_streams_found': 0,
             'streams_tested': 0,
             'streams_working': 0,
             'streams_failed': 0,
-            'streams_duplicate': 0
+            'streams_duplicate': 0,
+            'streams_reused': 0,
+            'hls_masters': 0,
+            'hls_variants_tested': 0,
+            'hls_variants_working': 0
         }
+
+
+class SourceBuckets:
+    """
+    Рабочие потоки сразу пишутся во временные файлы по источникам;
+    итоговый M3U (заголовок + источники по порядку) собирается в конце
+    """
+    
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+    
+    def add(self, result):
+        bucket = self.buckets.get(result.source_file)
+        if bucket is None:
+            bucket = self.buckets[result.source_file] = tempfile.TemporaryFile('w+', encoding='utf-8')
+        working = result.working_variants
+        if working:
+            # Перед #EXTINF: строгий разбор (Merger) ждет URL сразу после #EXTINF
+            bucket.write(format_variants_comment(working))
+        bucket.write(f"{result.info}\n{result.url}\n")
+        self.count += 1
+    
+    def write(self, f, header_lines):
+        f.writelines(header_lines)
+        for source in sorted(self.buckets):
+            # Добавляем разделитель между источниками
+            if source:
+                f.write(f"\n# ИСТОЧНИК: {source}\n")
+                f.write("#" + "-"*50 + "\n")
+            bucket = self.buckets[source]
+            bucket.seek(0)
+            shutil.copyfileobj(bucket, f)
+    
+    def close(self):
+        for bucket in self.buckets.values():
+            bucket.close()
+        self.buckets.clear()
+
+
+class M3UTester:
+    def __init__(self, timeout=8, max_workers=15, ffmpeg_slot=None, cancel_event=None, hls_variants=HLS_CHEAPEST):
+        self.timeout = timeout
+        self.max_workers = max_workers
+        # hls_variants: off - FFmpeg сам выбирает вариант master-плейлиста,
+        # cheapest - проверяется самый легкий вариант, all - все варианты параллельно
+        self.hls_variants = hls_variants
+        self._hls = None
+        self._hls_lock = threading.Lock()
+        # ffmpeg_slot - контекстный менеджер общего лимита процессов (см. modules.jobs)
+        self.ffmpeg_slot = ffmpeg_slot or nullcontext
+        self.cancel_event = cancel_event
+        self.profiler = StageProfiler()
+        self.run = TesterRun()
+        
+        self.ffmpeg_version = None
+        self.ffmpeg_protocols = frozenset()
         
-        # Проверка FFmpeg при инициализации
+        # Проверка FFmpeg при инициализации (результат кэшируется на процесс)
         self._check_ffmpeg()
     
+    @property
+    def stats(self):
+        return self.run.stats
+    
+    @property
+    def seen_streams(self):
+        return self.run.seen_streams
+    
+    def start_run(self, profiler=None):
+        """Новый запуск: дедупликация, счетчики и таймеры этапов не копятся между вызовами"""
+        self.profiler = profiler if profiler is not None else StageProfiler()
+        self.run = TesterRun()
+        return self.run
+    
+    def _cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+    
     def _check_ffmpeg(self):
         """Проверка доступности FFmpeg"""
-        try:
-            result = subprocess.run(
-                ['ffmpeg', '-version'],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=True,
-                timeout=5
-            )
-            print("✓ FFmpeg найден и доступен")
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+        ffmpeg_info = probe_ffmpeg()
+        if ffmpeg_info is None:
             print("✗ ОШИБКА: FFmpeg не найден или не работает!")
             print("  Установите FFmpeg и добавьте его в PATH")
             raise RuntimeError("FFmpeg недоступен")
+        self.ffmpeg_version = ffmpeg_info['version']
+        self.ffmpeg_protocols = ffmpeg_info['protocols']
     
     def get_stream_hash(self, url):
         """Создание хеша URL для определения дубликатов"""
@@ -52,63 +216,134 @@ class M3UTester:
         clean_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
         return hashlib.md5(clean_url.encode('utf-8')).hexdigest()
     
-    def extract_streams_from_m3u(self, m3u_path):
-        """Извлечение потоков из M3U файла"""
-        streams = []
+    def iter_streams_from_m3u(self, m3u_path):
+        """Извлечение уникальных потоков из M3U файла (потоково)"""
+        source_file = Path(m3u_path).name
         try:
-            with open(m3u_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            current_info = None
-            for line in lines:
-                line = line.strip()
-                
-                if not line:
-                    continue
-                
-                # Сохраняем информацию о канале
-                if line.startswith('#EXTINF:'):
-                    current_info = line
-                    continue
-                
-                # Проверяем URL потока
-                if (line and not line.startswith('#') and 
-                    (line.startswith('http://') or 
-                     line.startswith('https://') or
-                     line.startswith('rtmp://') or
-                     line.startswith('rtsp://') or
-                     line.startswith('udp://') or
-                     line.startswith('rtp://'))):
-                    
-                    stream_hash = self.get_stream_hash(line)
-                    
-                    # Пропускаем дубликаты
-                    if stream_hash in self.seen_streams:
-                        self.stats['streams_duplicate'] += 1
-                        current_info = None
-                        continue
-                    
-                    self.seen_streams.add(stream_hash)
-                    
-                    streams.append({
-                        'url': line,
-                        'info': current_info if current_info else "#EXTINF:-1,Неизвестный канал",
-                        'hash': stream_hash,
-                        'source_file': Path(m3u_path).name
-                    })
-                    current_info = None
+            # Байтовый mmap-сканер: EXTINF декодируется только для уникальных потоков
+            for extinf, raw_url in iter_entries(m3u_path):
+                stream = self.new_stream(decode(raw_url), lambda: decode(extinf) if extinf else None, source_file)
+                if stream is not None:
+                    yield stream
                     
         except Exception as e:
             print(f"  ✗ Ошибка при чтении {Path(m3u_path).name}: {e}")
+    
+    def new_stream(self, url, info, source_file, name=None):
+        """
+        Запись потока для тестирования или None для дубликата.
+        info - строка EXTINF или функция, возвращающая ее (вызывается только для уникальных)
+        """
+        stream_key = int(self.get_stream_hash(url)[:16], 16)
+        
+        # Пропускаем дубликаты
+        if stream_key in self.run.seen_streams:
+            self.run.stats['streams_duplicate'] += 1
+            return None
+        
+        self.run.seen_streams.add(stream_key)
+        self.run.stats['total_streams_found'] += 1
+        
+        if callable(info):
+            info = info()
+        return StreamResult(url, info or "#EXTINF:-1,Неизвестный канал", source_file, name)
+    
+    def iter_test_streams(self, streams, max_pending=None):
+        """
+        Потоковое тестирование: результаты отдаются по мере готовности,
+        одновременно в работе не больше max_pending потоков
+        """
+        max_pending = max_pending or self.max_workers * 2
+        stats = self.run.stats
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
             
-        return streams
+            def collect(done):
+                for future in done:
+                    result = future.result()
+                    if result.status == 'cancelled':
+                        continue
+                    stats['streams_tested'] += 1
+                    if result.variants is not None:
+                        stats['hls_masters'] += 1
+                        stats['hls_variants_tested'] += len(result.variants)
+                        stats['hls_variants_working'] += len(result.working_variants)
+                    if result.status == 'working':
+                        stats['streams_working'] += 1
+                    else:
+                        stats['streams_failed'] += 1
+                    yield result
+            
+            for stream in streams:
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from collect(done)
+                pending.add(executor.submit(self.test_stream, stream))
+            
+            yield from collect(as_completed(pending))
     
-    def test_stream(self, stream_info):
+    def test_stream(self, stream):
         """
         МАКСИМАЛЬНО СТАБИЛЬНАЯ ПРОВЕРКА ПОТОКА ЧЕРЕЗ FFMPEG
         Точная копия из m3u_combiner_fixed.py
+        Master-плейлисты HLS разбираются заранее: FFmpeg получает URL варианта
         """
-        url = stream_info['url']
+        if self.hls_variants != HLS_OFF and is_hls_url(stream.url):
+            return self._test_hls(stream)
+        return stream.finish(*self._probe_url(stream.url))
+    
+    def _hls_resolver(self):
+        with self._hls_lock:
+            if self._hls is None:
+                self._hls = HLSResolver(timeout=self.timeout)
+            return self._hls
+    
+    def close(self):
+        """Закрывает HTTP-клиент HLS (при следующей проверке создается заново)"""
+        with self._hls_lock:
+            if self._hls is not None:
+                self._hls.close()
+                self._hls = None
+    
+    def _test_hls(self, stream):
+        """Проверка самого легкого (или всех) вариантов master-плейлиста"""
+        with self.profiler.stage('hls_resolve', parallel=True):
+            try:
+                variants = self._hls_resolver().resolve(stream.url)
+            except httpx.HTTPStatusError as e:
+                # Плейлиста нет - поток мертв; 401/403/5xx бывают только для нашего User-Agent
+                if e.response.status_code in GONE_STATUSES:
+                    return stream.finish('failed', f'HTTP {e.response.status_code}')
+                variants = None
+            except httpx.TimeoutException:
+                return stream.finish('timeout', f'Timeout после {self.timeout} секунд')
+            except (httpx.HTTPError, OSError):
+                # Не удалось скачать сами (TLS, нестандартный сервер) - пусть решает FFmpeg
+                variants = None
+        
+        if not variants:
+            return stream.finish(*self._probe_url(stream.url))
+        
+        targets = variants if self.hls_variants == HLS_ALL else [cheapest_variant(variants)]
+        if len(targets) == 1:
+            results = [self._probe_url(targets[0].uri)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+                results = list(executor.map(self._probe_url, [variant.uri for variant in targets]))
+        
+        if any(status == 'cancelled' for status, _ in results):
+            return stream.finish('cancelled', 'Отменено')
+        stream.variants = [(variant, status == 'working') for variant, (status, _) in zip(targets, results)]
+        if stream.working_variants:
+            return stream.finish('working')
+        return stream.finish(*results[0])
+    
+    def _probe_url(self, url):
+        """Проверка одного URL через FFmpeg: (статус, ошибка)"""
+        # Протокол, который эта сборка FFmpeg не умеет читать, не запускаем
+        scheme = url.split('://', 1)[0].lower()
+        if self.ffmpeg_protocols and scheme not in self.ffmpeg_protocols:
+            return 'failed', f'FFmpeg {self.ffmpeg_version} не поддерживает протокол {scheme}'
         
         # Команда FFmpeg для проверки потока
         ffmpeg_cmd = [
@@ -123,6 +358,18 @@ class M3UTester:
             '-'
         ]
         
+        # Слот общего бюджета FFmpeg; отмена проверяется уже после ожидания слота
+        wait_started = time.perf_counter()
+        with self.ffmpeg_slot():
+            self.profiler.add('slot_wait', time.perf_counter() - wait_started, parallel=True)
+            if self._cancelled():
+                return 'cancelled', 'Отменено'
+            
+            with self.profiler.stage('ffmpeg', parallel=True):
+                return self._run_ffmpeg(ffmpeg_cmd)
+    
+    def _run_ffmpeg(self, ffmpeg_cmd):
+        """Запуск FFmpeg для одного URL и разбор результата: (статус, ошибка)"""
         try:
             # Запускаем процесс FFmpeg
             process = subprocess.Popen(
@@ -138,118 +385,171 @@ class M3UTester:
                 # Убиваем процесс при таймауте
                 process.kill()
                 process.wait()  # Ждем полного завершения
-                return {
-                    **stream_info,
-                    'status': 'timeout',
-                    'error': f'Timeout после {self.timeout} секунд',
-                    'tested_at': datetime.now().isoformat()
-                }
+                return 'timeout', f'Timeout после {self.timeout} секунд'
             
             # Проверяем результат
             if process.returncode == 0:
-                return {
-                    **stream_info,
-                    'status': 'working',
-                    'error': None,
-                    'tested_at': datetime.now().isoformat()
-                }
+                return 'working', None
             else:
                 # Декодируем ошибку
                 err = stderr.decode('utf-8', errors='ignore') if stderr else ""
-                return {
-                    **stream_info,
-                    'status': 'failed',
-                    'error': err[:100] if err else "Unknown error",
-                    'tested_at': datetime.now().isoformat()
-                }
+                return 'failed', err[:100] if err else "Unknown error"
                 
         except Exception as e:
-            return {
-                **stream_info,
-                'status': 'error',
-                'error': str(e),
-                'tested_at': datetime.now().isoformat()
-            }
-    
-    def test_playlists(self, m3u_files, progress_callback=None):
+            return 'error', str(e)
+    
+    def _iter_changed_streams(self, streams, delta, buckets):
         """
-        Тестирование списка плейлистов
-        С максимальной стабильностью и поддержкой отмены
+        Дельта-режим: прошлые вердикты ищутся в SQLite пакетами (в памяти только пакет);
+        неизмененные потоки сразу идут в результат, дальше отдаются новые, измененные и устаревшие
         """
-        all_streams = []
-        
-        # Извлекаем потоки из всех файлов
+        stats = self.run.stats
+        while True:
+            batch = list(islice(streams, DELTA_BATCH_SIZE))
+            if not batch:
+                return
+            for stream in batch:
+                stream.fingerprint = entry_fingerprint(stream.info, stream.url)
+            records = delta.lookup_many([(stream.url, stream.fingerprint) for stream in batch])
+            for stream, record in zip(batch, records):
+                # Таймауты и ошибки запуска перепроверяются всегда
+                if record is not None and record[0] in ('working', 'failed'):
+                    delta.carry(stream.url, stream.fingerprint, record)
+                    stats['streams_reused'] += 1
+                    if record[0] == 'working':
+                        stats['streams_working'] += 1
+                        # Для master-плейлиста HLS - рабочие варианты прошлой проверки
+                        if record[1]:
+                            stream.variants = [(variant, True) for variant in load_variants(record[1])]
+                        buckets.add(stream.finish('working'))
+                    else:
+                        stats['streams_failed'] += 1
+                    continue
+                self.run.stream_deltas[stream.url] = delta
+                yield stream
+    
+    def _iter_pending_streams(self, m3u_files, delta_index, delta_runs, buckets, progress_callback, timings):
+        """
+        Уникальные потоки всех файлов по одному (в памяти только проверяемые сейчас);
+        неизмененные в дельта-режиме сразу идут в результат без FFmpeg
+        """
+        stats = self.run.stats
+        started = time.perf_counter()
         for m3u_file in m3u_files:
+            if self._cancelled():
+                break
             if progress_callback:
                 progress_callback(f"📂 Обрабатывается: {Path(m3u_file).name}")
+            delta = None
+            if delta_index is not None:
+                # По пути файла: у разных источников бывает одинаковое имя (get.php, playlist.m3u)
+                delta = delta_runs[m3u_file] = delta_index.begin(m3u_file)
             
-            streams = self.extract_streams_from_m3u(m3u_file)
-            all_streams.extend(streams)
-            self.stats['total_streams_found'] += len(streams)
-        
-        if not all_streams:
-            return None, {"error": "Нет потоков для тестирования"}
+            streams = self.iter_streams_from_m3u(m3u_file)
+            if delta is not None:
+                streams = self._iter_changed_streams(streams, delta, buckets)
+            for stream in streams:
+                timings['extract'] += time.perf_counter() - started
+                yield stream
+                started = time.perf_counter()
+                if self._cancelled():
+                    break
+        timings['extract'] += time.perf_counter() - started
+        self.run.extracted = True
         
         if progress_callback:
-            progress_callback(f"🔍 Найдено {len(all_streams)} уникальных потоков. Начинаем тестирование...")
-        
+            if delta_runs:
+                progress_callback(f"♻️ Без изменений (результат прошлого запуска): {stats['streams_reused']}")
+            progress_callback(f"🔍 Найдено {stats['total_streams_found']} уникальных потоков")
+    
+    def test_playlists(self, m3u_files, output_file, progress_callback=None, delta_index=None, profiler=None,
+                       output_codec=PLAIN):
+        """
+        Тестирование списка плейлистов с записью рабочих потоков в output_file
+        С максимальной стабильностью и поддержкой отмены
+        delta_index (DeltaIndex) - проверяются только новые/измененные потоки,
+        для неизмененных берется результат прошлого запуска
+        profiler (StageProfiler) - таймеры этапов extract / delta / test / ffmpeg / write
+        Память зависит от числа потоков в работе, а не от размера плейлистов.
+        Возвращает (output_file, stats) или (None, {'error': ...})
+        """
+        run = self.start_run(profiler)
+        profiler = self.profiler
+        stats = run.stats
+        delta_runs = {}
+        buckets = SourceBuckets()
+        timings = {'extract': 0.0, 'test': None}
         tested_count = 0
+        test_started = time.perf_counter()
         
         try:
-            # Параллельное тестирование потоков
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_stream = {
-                    executor.submit(self.test_stream, stream): stream 
-                    for stream in all_streams
-                }
+            streams = self._iter_pending_streams(m3u_files, delta_index, delta_runs, buckets, progress_callback, timings)
+            for result in self.iter_test_streams(streams):
+                tested_count += 1
+                profiler.count(result.status)
+                delta = run.stream_deltas.pop(result.url, None)
+                if delta is not None:
+                    working = result.working_variants
+                    delta.record(result.url, result.fingerprint, result.status,
+                                 dump_variants(working) if working else None)
                 
-                for future in as_completed(future_to_stream):
-                    tested_count += 1
-                    result = future.result()
-                    
-                    self.stats['streams_tested'] += 1
-                    
-                    # Обрабатываем результат
-                    if result['status'] == 'working':
-                        self.stats['streams_working'] += 1
-                        self.working_streams.append(result)
-                        status_icon = "✅"
-                    else:
-                        self.stats['streams_failed'] += 1
-                        status_icon = "❌"
-                    
-                    # Прогресс каждые 10 потоков
-                    if progress_callback and (tested_count % 10 == 0 or tested_count == len(all_streams)):
-                        progress = (tested_count / len(all_streams)) * 100
-                        progress_callback(
-                            f"{status_icon} Протестировано: {tested_count}/{len(all_streams)} ({progress:.1f}%) | "
-                            f"Рабочих: {self.stats['streams_working']}"
-                        )
+                # Обрабатываем результат
+                if result.status == 'working':
+                    buckets.add(result)
+                    status_icon = "✅"
+                else:
+                    status_icon = "❌"
+                
+                # Прогресс каждые 10 потоков (процент - когда все файлы прочитаны)
+                if progress_callback and tested_count % 10 == 0:
+                    to_test = stats['total_streams_found'] - stats['streams_reused']
+                    progress = f" ({tested_count / max(1, to_test) * 100:.1f}%)" if run.extracted else ""
+                    progress_callback(
+                        f"{status_icon} Протестировано: {tested_count}/{to_test}{progress} | "
+                        f"Рабочих: {stats['streams_working']}"
+                    )
+            timings['test'] = time.perf_counter() - test_started
+            
+            if stats['total_streams_found'] == 0:
+                return None, {"error": "Нет потоков для тестирования"}
+            
+            if self._cancelled():
+                stats['cancelled'] = True
+                if progress_callback:
+                    progress_callback("⛔ Тестирование отменено, сохранены уже проверенные потоки")
+            
+            if delta_runs:
+                stats['delta'] = {'added': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'expired': 0}
+                with profiler.stage('delta'):
+                    for delta in delta_runs.values():
+                        for key, value in delta.commit().items():
+                            stats['delta'][key] += value
+            
+            # Формируем выходной M3U файл
+            header = [
+                "#EXTM3U\n",
+                f"# Сгенерировано: {datetime.now().isoformat()}\n",
+                f"# Всего протестировано: {stats['streams_tested']}\n",
+                f"# Рабочих потоков: {buckets.count}\n",
+                f"# Дубликатов удалено: {stats['streams_duplicate']}\n",
+                "#" + "="*60 + "\n\n",
+            ]
+            with profiler.stage('write'), open_playlist(output_file, 'w', output_codec) as f:
+                buckets.write(f, header)
         
         except KeyboardInterrupt:
             if progress_callback:
                 progress_callback("⚠️ Прервано пользователем!")
             raise
+        finally:
+            buckets.close()
+            self.close()
+            profiler.add('extract', timings['extract'])
+            if timings['test'] is None:
+                timings['test'] = time.perf_counter() - test_started
+            profiler.add('test', timings['test'] - timings['extract'], tested_count)
         
-        # Формируем выходной M3U файл
-        output_lines = ["#EXTM3U\n"]
-        output_lines.append(f"# Сгенерировано: {datetime.now().isoformat()}\n")
-        output_lines.append(f"# Всего протестировано: {self.stats['streams_tested']}\n")
-        output_lines.append(f"# Рабочих потоков: {len(self.working_streams)}\n")
-        output_lines.append(f"# Дубликатов удалено: {self.stats['streams_duplicate']}\n")
-        output_lines.append("#" + "="*60 + "\n\n")
-        
-        # Сортируем по исходному файлу
-        current_source = None
-        for stream in sorted(self.working_streams, key=lambda x: x.get('source_file', '')):
-            # Добавляем разделитель между источниками
-            if stream.get('source_file') != current_source:
-                current_source = stream.get('source_file')
-                if current_source:
-                    output_lines.append(f"\n# ИСТОЧНИК: {current_source}\n")
-                    output_lines.append("#" + "-"*50 + "\n")
-            
-            output_lines.append(f"{stream['info']}\n")
-            output_lines.append(f"{stream['url']}\n")
-        
-        return output_lines, self.stats
+        if progress_callback:
+            progress_callback(f"✅ Протестировано: {tested_count} | Рабочих: {stats['streams_working']}")
+        stats['stages'] = profiler.to_dict()['stages']
+        return output_file, stats
@@ -0,0 +1,116 @@
+"""Векторный analyze_playlists против прямого подсчета по fastscan.iter_entries"""
+import gzip
+import random
+from collections import Counter
+
+import pytest
+
+from modules.analytics import analyze_playlists, ATTRIBUTES, NO_GROUP
+from modules.fastscan import iter_entries, attribute
+
+EDGE_PLAYLIST = (
+    "#EXTM3U\n"
+    '#EXTINF:-1 tvg-id="a" group-title="Новости",A\nhttp://a.example/1\n'
+    '#EXTINF:-1 group-title="  Новости ",A copy\n  http://a.example/1  \n'
+    '#EXTINF:-1 group-title="",Empty\nhttp://b.example/2\n'
+    '#EXTINF:-1 group-title=Кино,Unquoted\nhttp://b.example/3\n'
+    '#EXTINF:-1 group-title="Спорт,No close\nrtmp://c.example/4\n'
+    '#EXTINF:-1 group-title="Кино" group-title="Спорт",Twice\nudp://@239.0.0.1:1234\n'
+    "#EXTINF:-1,Option\n#EXTVLCOPT:http-user-agent=x\nhttps://d.example/5\n"
+    "http://bare.example/6\n"
+    "\r\n#EXTINF:-1 catchup=\"default\",CRLF\r\nrtsp://e.example/7\r\n"
+    "#EXTINF:-1 tvg-logo=\"http://logo.example/x.png\",Trailing\n"
+)
+
+
+def reference_counts(paths):
+    """Те же показатели простым циклом по записям fastscan"""
+    urls = set()
+    groups = Counter()
+    attributes = Counter()
+    entries = with_extinf = 0
+    for path in paths:
+        for extinf, url in iter_entries(path):
+            entries += 1
+            urls.add(url)
+            groups[(attribute(extinf, b'group-title') if extinf else None) or NO_GROUP] += 1
+            if extinf:
+                with_extinf += 1
+                attributes.update(name for name in ATTRIBUTES if (name + '=').encode() in extinf)
+    return {
+        'entries': entries,
+        'with_extinf': with_extinf,
+        'unique_urls': len(urls),
+        'groups': dict(groups),
+        'attributes': {name: attributes[name] for name in ATTRIBUTES},
+    }
+
+
+def report_counts(paths):
+    report = analyze_playlists(paths, top=0)
+    assert report['groups_total'] == len(report['groups'])
+    return {
+        'entries': report['entries'],
+        'with_extinf': report['with_extinf'],
+        'unique_urls': report['unique_urls'],
+        'groups': {row['value']: row['count'] for row in report['groups']},
+        'attributes': {name: row['count'] for name, row in report['attributes'].items()},
+    }
+
+
+def random_playlist(seed, entries=400):
+    """Плейлист с разнобоем: пробелы, CRLF, опции, URL без #EXTINF, длинные поля, повторы"""
+    rnd = random.Random(seed)
+    groups = ["Новости", "Sport", "Кино HD", "", "  Пробелы  ", "Очень длинная группа " * 6]
+    schemes = ["http://", "https://", "rtmp://", "rtsp://", "udp://", "rtp://"]
+    lines = ["#EXTM3U"]
+    urls = []
+    for n in range(entries):
+        if rnd.random() < 0.85:
+            attrs = [f'{name}="{n}"' for name in ATTRIBUTES[:-1] if rnd.random() < 0.5]
+            if rnd.random() < 0.7:
+                attrs.append(f'group-title="{rnd.choice(groups)}"')
+            name = rnd.choice(["", f"Канал {n}", f" Channel, {n} "])
+            lines.append(rnd.choice(["", "  ", "\t"]) + " ".join(["#EXTINF:-1"] + attrs) + "," + name)
+        if rnd.random() < 0.1:
+            lines.append("#EXTVLCOPT:http-referrer=http://ref.example/")
+        if rnd.random() < 0.05:
+            lines.append("")
+        if urls and rnd.random() < 0.25:
+            url = rnd.choice(urls)
+        else:
+            path = "/" + "x" * rnd.choice([1, 60, 200])
+            url = f"{rnd.choice(schemes)}host{rnd.randrange(20)}.example:{rnd.randrange(1, 9)}{path}/{n}?t={n}"
+            urls.append(url)
+        lines.append(url + rnd.choice(["", " ", "\r"]))
+        if rnd.random() < 0.03:
+            lines.append("ftp://not.a.stream/file")
+    return "\n".join(lines) + rnd.choice(["", "\n"])
+
+
+def test_edge_playlist_matches_fastscan(tmp_path):
+    path = tmp_path / "edge.m3u"
+    path.write_bytes(EDGE_PLAYLIST.encode('utf-8'))
+    expected = reference_counts([path])
+    assert expected['groups'] == {"Новости": 2, NO_GROUP: 6, "Кино": 1}
+    assert report_counts([path]) == expected
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_random_playlists_match_fastscan(tmp_path, seed):
+    paths = []
+    for index in range(2):
+        path = tmp_path / f"p{index}.m3u"
+        path.write_bytes(random_playlist(seed * 10 + index).encode('utf-8'))
+        paths.append(path)
+    # Сжатый файл разбирается через временную копию - результат тот же
+    gz_path = tmp_path / "p0.m3u.gz"
+    gz_path.write_bytes(gzip.compress(paths[0].read_bytes()))
+    paths.append(gz_path)
+    assert report_counts(paths) == reference_counts(paths)
+
+
+def test_empty_playlist(tmp_path):
+    path = tmp_path / "empty.m3u"
+    path.write_bytes(b"")
+    assert report_counts([path]) == reference_counts([path])
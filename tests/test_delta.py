@@ -0,0 +1,97 @@
+"""DeltaIndex: ключи источников, повторные URL, срок годности и удаленные записи"""
+import pytest
+
+import modules.delta as delta_module
+import modules.tester as tester_module
+from modules.delta import DeltaIndex, entry_fingerprint
+
+
+def run_source(index, source, entries, verdict='working'):
+    """Один запуск: записи (url, extinf) → (lookup_many, stats)"""
+    run = index.begin(source)
+    keys = [(url, entry_fingerprint(extinf, url)) for url, extinf in entries]
+    records = run.lookup_many(keys)
+    for (url, fingerprint), record in zip(keys, records):
+        if record is None:
+            run.record(url, fingerprint, verdict)
+        else:
+            run.carry(url, fingerprint, record)
+    return records, run.commit()
+
+
+def test_second_run_reuses_verdicts(tmp_path):
+    index = DeltaIndex("tester", tmp_path / "delta.sqlite")
+    entries = [("http://a/1", "#EXTINF:-1,A"), ("http://a/1", "#EXTINF:-1,A copy"), ("http://a/2", "#EXTINF:-1,B")]
+    source = tmp_path / "a.m3u"
+    _, stats = run_source(index, source, entries)
+    assert stats == {'added': 3, 'changed': 0, 'unchanged': 0, 'removed': 0, 'expired': 0}
+    records, stats = run_source(index, source, entries)
+    assert [record[0] for record in records] == ['working'] * 3
+    assert stats['unchanged'] == 3
+
+
+def test_changed_and_removed_entries(tmp_path):
+    index = DeltaIndex("tester", tmp_path / "delta.sqlite")
+    source = tmp_path / "a.m3u"
+    run_source(index, source, [("http://a/1", "#EXTINF:-1,A"), ("http://a/2", "#EXTINF:-1,B")])
+    records, stats = run_source(index, source, [("http://a/1", "#EXTINF:-1,A renamed"), ("http://a/3", "#EXTINF:-1,C")])
+    assert records == [None, None]
+    assert stats == {'added': 1, 'changed': 1, 'unchanged': 0, 'removed': 1, 'expired': 0}
+    _, stats = run_source(index, source, [("http://a/1", "#EXTINF:-1,A renamed")])
+    assert stats['unchanged'] == 1 and stats['removed'] == 1
+
+
+def test_sources_with_same_name_are_separate(tmp_path):
+    index = DeltaIndex("tester", tmp_path / "delta.sqlite")
+    for folder in ("p1", "p2"):
+        (tmp_path / folder).mkdir()
+    run_source(index, tmp_path / "p1" / "playlist.m3u", [("http://a/1", "#EXTINF:-1,A")])
+    _, stats = run_source(index, tmp_path / "p2" / "playlist.m3u", [("http://b/1", "#EXTINF:-1,B")])
+    assert stats['added'] == 1 and stats['removed'] == 0
+    _, stats = run_source(index, tmp_path / "p1" / "playlist.m3u", [("http://a/1", "#EXTINF:-1,A")])
+    assert stats['unchanged'] == 1
+
+
+def test_expired_verdicts_are_not_reused(tmp_path, monkeypatch):
+    source = tmp_path / "a.m3u"
+    entries = [("http://a/1", "#EXTINF:-1,A")]
+    run_source(DeltaIndex("tester", tmp_path / "delta.sqlite", max_age=60), source, entries)
+    now = delta_module.time.time()
+    monkeypatch.setattr(delta_module.time, 'time', lambda: now + 3600)
+    records, stats = run_source(DeltaIndex("tester", tmp_path / "delta.sqlite", max_age=60), source, entries)
+    assert records == [None] and stats['expired'] == 1
+    # Перенесенный вердикт сохраняет время проверки, а не получает новое
+    records, stats = run_source(DeltaIndex("tester", tmp_path / "delta.sqlite", max_age=None), source, entries)
+    assert records[0][2] == pytest.approx(now + 3600)
+
+
+def test_batches_span_many_urls(tmp_path, monkeypatch):
+    monkeypatch.setattr(delta_module, 'BATCH_SIZE', 7)
+    index = DeltaIndex("tester", tmp_path / "delta.sqlite")
+    entries = [(f"http://a/{i}", f"#EXTINF:-1,{i}") for i in range(50)]
+    run_source(index, tmp_path / "a.m3u", entries)
+    records, stats = run_source(index, tmp_path / "a.m3u", entries[10:])
+    assert all(record is not None for record in records)
+    assert stats['unchanged'] == 40 and stats['removed'] == 10
+
+
+def test_tester_delta_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(tester_module, 'probe_ffmpeg', lambda: {'version': 'test', 'protocols': frozenset()})
+    playlist = tmp_path / "a.m3u"
+    playlist.write_text("#EXTM3U\n#EXTINF:-1,A\nhttp://a/1\n#EXTINF:-1,B\nhttp://a/missing\n")
+    probed = []
+
+    def probe(url):
+        probed.append(url)
+        return ('failed', 'HTTP 404') if 'missing' in url else ('working', None)
+
+    for expected_probes in (2, 0):
+        probed.clear()
+        tester = tester_module.M3UTester(timeout=1)
+        tester._probe_url = probe
+        _, stats = tester.test_playlists([str(playlist)], tmp_path / "out.m3u",
+                                         delta_index=DeltaIndex("tester", tmp_path / "delta.sqlite"))
+        assert len(probed) == expected_probes
+        assert stats['streams_working'] == 1 and stats['streams_failed'] == 1
+    assert stats['streams_reused'] == 2
+    assert "http://a/1" in (tmp_path / "out.m3u").read_text()
@@ -0,0 +1,52 @@
+"""iter_entries(strict=True) против прежнего построчного парсера Merger"""
+import pytest
+
+from modules.fastscan import iter_entries, decode
+from modules.merger import M3UMerger
+
+
+def legacy_merger_entries(path):
+    """Разбор Merger до fastscan: URL берется только строкой сразу после #EXTINF"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = f.readlines()
+    entries = []
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if line.startswith('#EXTINF:'):
+            if i + 1 < len(lines):
+                url = lines[i + 1].strip()
+                if url and not url.startswith('#') and url.startswith(('http://', 'https://')):
+                    entries.append((line, url))
+            i += 2
+        else:
+            i += 1
+    return entries
+
+
+PLAYLISTS = {
+    'plain': "#EXTM3U\n#EXTINF:-1,A\nhttp://a/1\n#EXTINF:-1,B\nhttps://b/2\n",
+    'option_line': "#EXTM3U\n#EXTINF:-1,A\n#EXTVLCOPT:http-user-agent=x\nhttp://a/1\n#EXTINF:-1,B\nhttp://b/2\n",
+    'bare_url': "#EXTM3U\nhttp://bare/0\n#EXTINF:-1,A\nhttp://a/1\nhttp://bare/2\n",
+    'blank_after_extinf': "#EXTM3U\n#EXTINF:-1,A\n\nhttp://a/1\n#EXTINF:-1,B\nhttp://b/2\n",
+    'extinf_twice': "#EXTINF:-1,A\n#EXTINF:-1,B\nhttp://b/1\n#EXTINF:-1,C\nhttp://c/2\n",
+    'indented_crlf': "#EXTM3U\r\n  #EXTINF:-1,A\r\n  http://a/1  \r\n#EXTINF:-1,B\r\nrtmp://b/2\r\n",
+    'trailing_extinf': "#EXTM3U\n#EXTINF:-1,A\nhttp://a/1\n#EXTINF:-1,B",
+    'no_name': "#EXTINF:-1\nhttp://a/1\n",
+}
+
+
+@pytest.mark.parametrize('name', sorted(PLAYLISTS))
+def test_strict_matches_legacy_merger_parser(tmp_path, name):
+    path = tmp_path / f"{name}.m3u"
+    path.write_bytes(PLAYLISTS[name].encode('utf-8'))
+    fast = [(decode(extinf), decode(url))
+            for extinf, url in iter_entries(path, schemes=(b'http://', b'https://'), strict=True)]
+    assert fast == legacy_merger_entries(path)
+
+
+def test_merger_skips_urls_without_extinf(tmp_path):
+    path = tmp_path / "t.m3u"
+    path.write_bytes(PLAYLISTS['option_line'].encode('utf-8') + PLAYLISTS['bare_url'].encode('utf-8'))
+    url_to_entry = M3UMerger().parse_m3u_files([str(path)], {})
+    assert set(url_to_entry) == {'http://b/2', 'http://a/1'}
@@ -0,0 +1,62 @@
+"""GroupIndex: точное, нормализованное, префиксное и нечеткое сопоставление канал → группа"""
+import pytest
+
+import modules.groupindex as groupindex
+from modules.groupindex import GroupIndex, DEFAULT_GROUP
+
+
+@pytest.fixture
+def index():
+    return GroupIndex.from_groups({
+        "Эфир": ["Первый", "Россия", "НТВ"],
+        "Новости": ["Россия 24", "RT News"],
+        "Кино": ["Кинопремьера"],
+    })
+
+
+@pytest.mark.parametrize('name, group', [
+    ("Первый", "Эфир"),
+    ("  россия  ", "Эфир"),
+    ("«НТВ»", "Эфир"),
+    ("Россия HD", "Эфир"),
+    ("Россия [FHD] orig", "Эфир"),
+    ("Россия 24 HD", "Новости"),
+    ("RT  news", "Новости"),
+    ("RT Nwes", "Новости"),
+])
+def test_lookup_matches(index, name, group):
+    assert index.lookup(name) == group
+
+
+@pytest.mark.parametrize('name', [
+    "Россия 1",
+    "Первый Балтийский",
+    "НТВ Сериал",
+    "Кинопремьера 2",
+    "",
+])
+def test_lookup_does_not_guess(index, name):
+    assert index.lookup(name) == DEFAULT_GROUP
+
+
+def test_lookup_without_fuzzy(index):
+    assert index.lookup("Россия HD", fuzzy=False) == DEFAULT_GROUP
+    assert index.lookup("россия", fuzzy=False) == "Эфир"
+
+
+def test_first_entry_wins_and_round_trip(index, tmp_path):
+    index.add("Россия", "Другое")
+    assert index.lookup("Россия") == "Эфир"
+    path = tmp_path / "groups.json"
+    index.save(path)
+    assert GroupIndex.load(path).to_groups() == index.to_groups()
+
+
+def test_lookup_cache_is_bounded(index, monkeypatch):
+    monkeypatch.setattr(groupindex, 'LOOKUP_CACHE_SIZE', 100)
+    for i in range(1000):
+        index.lookup(f"Неизвестный канал {i}")
+    assert len(index._cache) == 100
+    # Добавление канала сбрасывает кэш промахов
+    index.add("Неизвестный канал 999", "Новая")
+    assert index.lookup("Неизвестный канал 999") == "Новая"
@@ -0,0 +1,96 @@
+"""Разбор master-плейлистов HLS и реакция Tester на ответы сервера"""
+import httpx
+import pytest
+
+import modules.tester as tester_module
+from modules.hls import (HLSResolver, MasterPlaylistCache, parse_master_playlist, cheapest_variant,
+                         dump_variants, load_variants, format_variants_comment, HLS_CHEAPEST)
+
+MASTER = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=2500000,AVERAGE-BANDWIDTH=2000000,RESOLUTION=1280x720,CODECS="avc1.4d401f,mp4a.40.2"
+720/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360
+/abs/360.m3u8?token=1
+#EXT-X-STREAM-INF:BANDWIDTH=64000,CODECS="mp4a.40.2"
+audio.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=900000,RESOLUTION=640x360,AUDIO="b"
+/abs/360.m3u8?token=1
+"""
+
+
+def test_parse_master_playlist():
+    variants = parse_master_playlist(MASTER, "http://cdn.example/live/ch1/master.m3u8")
+    assert [variant.uri for variant in variants] == [
+        "http://cdn.example/live/ch1/audio.m3u8",
+        "http://cdn.example/abs/360.m3u8?token=1",
+        "http://cdn.example/live/ch1/720/index.m3u8",
+    ]
+    # AVERAGE-BANDWIDTH важнее пикового BANDWIDTH
+    assert [variant.bandwidth for variant in variants] == [64000, 800000, 2000000]
+    assert variants[2].codecs == "avc1.4d401f,mp4a.40.2"
+    assert variants[0].resolution is None
+
+
+@pytest.mark.parametrize('text', [
+    "#EXTM3U\n#EXT-X-TARGETDURATION:6\n#EXTINF:6,\nseg1.ts\n",
+    "not a playlist",
+    "",
+])
+def test_media_playlist_is_not_master(text):
+    assert parse_master_playlist(text, "http://cdn.example/x.m3u8") is None
+
+
+def test_cheapest_variant_prefers_video():
+    variants = parse_master_playlist(MASTER, "http://cdn.example/master.m3u8")
+    assert cheapest_variant(variants).resolution == "640x360"
+    audio_only = parse_master_playlist(
+        "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=128000\nhi.m3u8\n#EXT-X-STREAM-INF:BANDWIDTH=64000\nlo.m3u8\n",
+        "http://cdn.example/master.m3u8",
+    )
+    assert cheapest_variant(audio_only).uri == "http://cdn.example/lo.m3u8"
+
+
+def test_variant_labels_survive_delta_round_trip():
+    variants = parse_master_playlist(MASTER, "http://cdn.example/master.m3u8")
+    assert format_variants_comment(load_variants(dump_variants(variants))) == format_variants_comment(variants)
+    assert load_variants("broken") == []
+
+
+def mock_resolver(handler):
+    resolver = HLSResolver(cache=MasterPlaylistCache())
+    resolver.client = httpx.Client(transport=httpx.MockTransport(handler), follow_redirects=True)
+    return resolver
+
+
+def test_resolver_uses_final_url_for_relative_uris():
+    def handler(request):
+        if request.url.path == "/old/master.m3u8":
+            return httpx.Response(302, headers={'Location': "http://edge.example/new/master.m3u8"})
+        return httpx.Response(200, text=MASTER)
+
+    variants = mock_resolver(handler).resolve("http://cdn.example/old/master.m3u8")
+    assert variants[0].uri == "http://edge.example/new/audio.m3u8"
+
+
+@pytest.fixture
+def tester(monkeypatch):
+    monkeypatch.setattr(tester_module, 'probe_ffmpeg', lambda: {'version': 'test', 'protocols': frozenset()})
+    return tester_module.M3UTester(timeout=1, hls_variants=HLS_CHEAPEST)
+
+
+@pytest.mark.parametrize('status, expected', [
+    (404, ('failed', 'HTTP 404')),
+    (410, ('failed', 'HTTP 410')),
+    (401, ('working', None)),
+    (403, ('working', None)),
+    (503, ('working', None)),
+])
+def test_master_fetch_errors(tester, status, expected):
+    probed = []
+    tester._hls = mock_resolver(lambda request: httpx.Response(status))
+    tester._probe_url = lambda url: probed.append(url) or ('working', None)
+    stream = tester.new_stream("http://cdn.example/live.m3u8", "#EXTINF:-1,A", "a.m3u")
+    result = tester._test_hls(stream)
+    assert (result.status, result.error) == expected
+    # Кроме 404/410 решает FFmpeg по самому master
+    assert probed == ([] if status in (404, 410) else ["http://cdn.example/live.m3u8"])
@@ -0,0 +1,104 @@
+"""Ключи имен, кластеры похожих каналов и решения Merger по ним"""
+import pytest
+
+from modules.neardup import channel_key, find_near_duplicates, NEARDUP_COLLAPSE, NEARDUP_TAG
+from modules.merger import M3UMerger
+
+
+@pytest.mark.parametrize('first, second', [
+    ("Первый канал HD", "Perviy Kanal [HD]"),
+    ("Телеканал Звезда", "Zvezda HD"),
+    ("Первый Балтийский", "1 Baltiyskiy"),
+    ("Россия 24 FHD", "Rossiya 24"),
+])
+def test_channel_key_same(first, second):
+    assert channel_key(first) == channel_key(second)
+
+
+@pytest.mark.parametrize('first, second', [
+    ("Россия 1", "Россия 24"),
+    ("Россия", "Россия К"),
+    ("Первый", "Первый Балтийский"),
+])
+def test_channel_key_different(first, second):
+    assert channel_key(first) != channel_key(second)
+
+
+def test_near_duplicates_merge_spelling_variants():
+    canonical, stats = find_near_duplicates(["Телеканал Звезда", "Звезда", "Zvezda HD", "Звезда"])
+    assert set(canonical.values()) == {"Звезда"}
+    assert stats['clusters'] == 1
+
+
+@pytest.mark.parametrize('names', [
+    ["Россия 1", "Россия 24"],
+    ["Россия", "Россия 24"],
+    ["Первый", "Первый Балтийский"],
+    ["Channel 5", "Пятый канал", "5 канал", "Канал 5"],
+    ["1TV", "Первый канал"],
+    ["HD", "4K", "SD", "📺", "---"],
+])
+def test_near_duplicates_keep_different_channels_apart(names):
+    canonical, stats = find_near_duplicates(names)
+    assert all(canonical[name] == name for name in canonical)
+    assert stats['clusters'] == 0
+
+
+def test_near_duplicates_skip_number_and_empty_keys():
+    canonical, stats = find_near_duplicates(["Channel 5", "5 канал", "HD", "Звезда"])
+    assert set(canonical) == {"Звезда"}
+    assert stats['skipped_names'] == 3
+
+
+def grouped_playlist():
+    return {
+        "Россия": [("Zvezda", "http://a/1"), ("Звезда HD", "http://a/2"), ("Звезда HD", "http://a/3")],
+        "Мусор": [("Звезда HD", "http://b/1")],
+        "Запас": [("Пятница", "http://c/1"), ("Пятница", "http://c/2")],
+    }
+
+
+def test_collapse_keeps_alternate_urls_and_other_groups():
+    grouped, tags, stats = M3UMerger().collapse_near_duplicates(grouped_playlist(), NEARDUP_COLLAPSE)
+    assert grouped["Россия"] == [("Звезда HD", "http://a/2"), ("Звезда HD", "http://a/3")]
+    assert grouped["Мусор"] == [("Звезда HD", "http://b/1")]
+    assert grouped["Запас"] == [("Пятница", "http://c/1"), ("Пятница", "http://c/2")]
+    assert stats['removed'] == 1 and stats['clusters'] == 1
+
+
+def test_collapse_after_deleting_group_keeps_channel():
+    merger = M3UMerger()
+    grouped = merger.delete_groups({
+        "Мусор": [("Звезда HD", "http://b/1")],
+        "Россия": [("Zvezda", "http://a/1")],
+    }, ["Мусор"])
+    grouped, _, stats = merger.collapse_near_duplicates(grouped, NEARDUP_COLLAPSE)
+    assert grouped == {"Россия": [("Zvezda", "http://a/1")]}
+    assert stats['removed'] == 0
+
+
+def test_collapse_renames_first_variant_when_canonical_is_elsewhere():
+    grouped = {"Россия": [("Zvezda", "http://a/1"), ("Телеканал Звезда", "http://a/2")],
+               "Эфир": [("Звезда", "http://b/1"), ("Звезда", "http://b/2"), ("Звезда", "http://b/3")]}
+    grouped, _, stats = M3UMerger().collapse_near_duplicates(grouped, NEARDUP_COLLAPSE)
+    assert grouped["Россия"] == [("Звезда", "http://a/1")]
+    assert stats['renamed'] == 1 and stats['removed'] == 1
+
+
+def test_tag_marks_whole_cluster_only():
+    grouped, tags, stats = M3UMerger().collapse_near_duplicates(grouped_playlist(), NEARDUP_TAG)
+    assert tags == {url: "Звезда HD" for url in ("http://a/1", "http://a/2", "http://a/3", "http://b/1")}
+    assert sum(len(channels) for channels in grouped.values()) == 6
+
+
+def test_store_collapse_matches_memory():
+    from modules.mergestore import SQLiteMergeStore
+    merger = M3UMerger()
+    with SQLiteMergeStore() as store:
+        store.add_entries((url, name, group) for group, channels in grouped_playlist().items()
+                          for name, url in channels)
+        stats = merger.collapse_near_duplicates_in_store(store, NEARDUP_COLLAPSE)
+        rows = sorted((group, name, url) for group, name, url, _ in store.iter_grouped())
+    grouped, _, _ = merger.collapse_near_duplicates(grouped_playlist(), NEARDUP_COLLAPSE)
+    assert rows == sorted((group, name, url) for group, channels in grouped.items() for name, url in channels)
+    assert stats['removed'] == 1
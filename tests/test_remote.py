@@ -0,0 +1,90 @@
+"""PlaylistFetcher: кэш с ETag, безопасные имена в кэше и отчет о незагруженных URL"""
+import gzip
+
+import httpx
+import pytest
+
+from modules.delta import source_key
+from modules.fastscan import iter_entries
+from modules.remote import PlaylistFetcher, parse_url_list
+
+PLAYLIST = "#EXTM3U\n#EXTINF:-1,Канал\nhttp://stream.example/1\n"
+
+
+def streamed(data, **kwargs):
+    """Ответ с потоковым телом: fetch читает его через iter_raw"""
+    return httpx.Response(200, content=iter([data]), **kwargs)
+
+
+def mock_fetcher(tmp_path, handler):
+    fetcher = PlaylistFetcher(cache_dir=tmp_path / "cache")
+    fetcher.client.close()
+    fetcher.client = httpx.Client(transport=httpx.MockTransport(handler), follow_redirects=True)
+    return fetcher
+
+
+def test_etag_revalidation_uses_cache(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304)
+        return streamed(PLAYLIST.encode('utf-8'), headers={'ETag': '"v1"'})
+
+    with mock_fetcher(tmp_path, handler) as fetcher:
+        first, from_cache = fetcher.fetch("http://lists.example/tv.m3u")
+        assert not from_cache
+        second, from_cache = fetcher.fetch("http://lists.example/tv.m3u")
+    assert from_cache and second == first
+    assert requests == [None, '"v1"']
+    assert first.read_text(encoding='utf-8') == PLAYLIST
+    assert source_key(first) == "http://lists.example/tv.m3u"
+
+
+def test_gzip_body_is_cached_raw(tmp_path):
+    def handler(request):
+        return streamed(gzip.compress(PLAYLIST.encode('utf-8')), headers={'Content-Encoding': 'gzip'})
+
+    with mock_fetcher(tmp_path, handler) as fetcher:
+        path, _ = fetcher.fetch("http://lists.example/tv.m3u")
+    assert [url for _, url in iter_entries(path)] == [b"http://stream.example/1"]
+
+
+@pytest.mark.parametrize('url', [
+    "http://lists.example/a/..",
+    "http://lists.example/%2e%2e",
+    "http://lists.example/%2e%2e%2f%2e%2e%2fescape.m3u",
+    "http://lists.example/" + "x" * 400 + ".m3u",
+    "http://lists.example/",
+])
+def test_cache_name_does_not_depend_on_url_path(tmp_path, url):
+    fetcher = PlaylistFetcher(cache_dir=tmp_path / "cache")
+    body_path, meta_path = fetcher.cache_paths(url)
+    fetcher.close()
+    assert body_path.parent == meta_path.parent
+    assert body_path.parent.parent == tmp_path / "cache"
+    assert len(body_path.name) < 64
+
+
+def test_failed_urls_are_reported(tmp_path):
+    def handler(request):
+        if request.url.path == "/missing.m3u":
+            return httpx.Response(404)
+        if request.url.host == "down.example":
+            raise httpx.ConnectTimeout("timed out", request=request)
+        return streamed(PLAYLIST.encode('utf-8'))
+
+    urls = ["http://lists.example/ok.m3u", "http://lists.example/missing.m3u", "http://down.example/tv.m3u"]
+    messages = []
+    with mock_fetcher(tmp_path, handler) as fetcher:
+        paths, failed = fetcher.fetch_all(urls, messages.append)
+    assert paths == [str(fetcher.cache_paths(urls[0])[0])]
+    assert [url for url, _ in failed] == urls[1:]
+    assert "404" in failed[0][1] and "timed out" in failed[1][1]
+    assert sum(message.startswith("Ошибка загрузки") for message in messages) == 2
+
+
+def test_parse_url_list():
+    text = "# мои списки\nhttp://a.example/1.m3u\n\n  https://b.example/2.m3u  \nftp://c.example/3.m3u\n"
+    assert parse_url_list(text) == ["http://a.example/1.m3u", "https://b.example/2.m3u"]
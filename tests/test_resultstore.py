@@ -0,0 +1,66 @@
+"""ResultStore: параллельные put/fetch/evict одного ключа"""
+import threading
+
+from modules.resultstore import ResultStore
+
+
+def run_threads(count, target):
+    errors = []
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_fetch_returns_stored_files(tmp_path):
+    store = ResultStore(tmp_path / "store")
+    result = tmp_path / "out.m3u"
+    result.write_text("#EXTM3U\n")
+    store.put("ab" * 32, [result], {'count': 1})
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    paths, meta = store.fetch("ab" * 32, dest)
+    assert [p.read_text() for p in paths] == ["#EXTM3U\n"] and meta == {'count': 1}
+    assert store.fetch("cd" * 32, dest) is None
+
+
+def test_concurrent_put_same_key(tmp_path):
+    store = ResultStore(tmp_path / "store")
+    results = []
+    for i in range(8):
+        result = tmp_path / str(i) / "out.m3u"
+        result.parent.mkdir()
+        result.write_text("#EXTM3U\n")
+        results.append(result)
+    for trial in range(20):
+        key = f"{trial:02d}" * 32
+        assert run_threads(8, lambda i: store.put(key, [results[i]], {})) == []
+        entry = tmp_path / "store" / key[:2]
+        assert [p.name for p in entry.iterdir()] == [key]
+
+
+def test_fetch_during_evict_is_a_miss(tmp_path):
+    store = ResultStore(tmp_path / "store", max_bytes=0)
+    result = tmp_path / "out.m3u"
+    result.write_text("#EXTM3U\n")
+    for trial in range(100):
+        key = f"{trial:02d}" * 32
+        ResultStore(tmp_path / "store").put(key, [result], {})
+        dest = tmp_path / f"dest{trial}"
+        dest.mkdir()
+        outcomes = []
+        errors = run_threads(6, lambda i: store.evict() if i % 2 else outcomes.append(store.fetch(key, dest)))
+        assert errors == []
+        for outcome in outcomes:
+            assert outcome is None or outcome[0][0].read_text() == "#EXTM3U\n"